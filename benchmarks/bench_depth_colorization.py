@@ -0,0 +1,78 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    bench_depth_colorization.py                        :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 12:20:55 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 12:20:55 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+"""
+Micro-benchmark: depth colorization (frame_utils.depth_colormap, lookup table
+up to LUT_MAX_PIXELS, cv2 above) against the former cv2.convertScaleAbs +
+cv2.applyColorMap path.
+
+Run from the plugin folder:
+    python benchmarks/bench_depth_colorization.py
+"""
+
+import pathlib
+import sys
+import timeit
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from frame_utils.depth_colormap import colorize_depth, depth_colormap_lut
+
+SIZES = [(424, 240), (640, 480), (1280, 720), (1920, 1080)]
+REPEAT = 200
+
+
+def synthetic_depth(width, height) -> np.ndarray:
+    """
+    Smooth depth surface with sensor like noise and holes (z16, mm).
+    """
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:height, :width]
+    depth = 500 + 3000 * (1 + np.sin(xx / 80.0) * np.cos(yy / 60.0))
+    depth += rng.normal(0, 20, depth.shape)
+    depth[rng.random(depth.shape) < 0.05] = 0
+    return depth.astype(np.uint16)
+
+
+def colorize_cv2(depth) -> np.ndarray:
+    return cv2.applyColorMap(cv2.convertScaleAbs(depth, alpha=0.03), cv2.COLORMAP_JET)
+
+
+def bench(func) -> float:
+    # best of 5 runs, in ms per call
+    runs = timeit.repeat(func, number=REPEAT, repeat=5)
+    return min(runs) / REPEAT * 1e3
+
+
+def main() -> None:
+    lut = depth_colormap_lut()
+    print("{:>10} {:>12} {:>12} {:>8}".format("size", "cv2 [ms]", "ours [ms]", "equal"))
+    for width, height in SIZES:
+        depth = synthetic_depth(width, height)
+        out = np.empty((height, width, 3), dtype=np.uint8)
+        scratch = np.empty((height, width), dtype=np.uint32)
+        equal = np.array_equal(
+            colorize_cv2(depth), colorize_depth(depth, lut, out, scratch)
+        )
+        t_cv2 = bench(lambda: colorize_cv2(depth))
+        t_lut = bench(lambda: colorize_depth(depth, lut, out, scratch))
+        print(
+            "{:>10} {:>12.3f} {:>12.3f} {:>8}".format(
+                "{}x{}".format(width, height), t_cv2, t_lut, str(equal)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
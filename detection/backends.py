@@ -0,0 +1,390 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    backends.py                                        :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 18:14:09 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 18:14:09 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import json
+import pathlib
+
+import cv2
+import numpy as np
+
+# optional inference backends
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+try:
+    import openvino
+except ImportError:
+    openvino = None
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("ultralytics", "onnxruntime", "openvino")
+# ultralytics' predict defaults, so all backends detect the same objects
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+LETTERBOX_COLOR = 114
+# exported/quantized models, next to the .pt files
+CACHE_DIR_NAME = "cache"
+# input size of the exports (batch and image size are dynamic axes, so tiles
+# can run as one batch, images are letterboxed to this size)
+EXPORT_IMGSZ = 640
+# INT8 calibration: frames in <models>/calibration (e.g. saved scene camera
+# frames), ultralytics' sample images if there are none
+CALIBRATION_DIR_NAME = "calibration"
+CALIBRATION_FRAMES = 32
+
+
+def available_backends() -> list:
+    """
+    Return the inference backends that can be used with the installed packages.
+    """
+    available = ["ultralytics"]
+    if onnxruntime is not None:
+        available.append("onnxruntime")
+    if openvino is not None:
+        available.append("openvino")
+    return available
+
+
+def empty_detections() -> tuple:
+    return (
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros(0, dtype=np.float32),
+        np.zeros(0, dtype=np.int32),
+    )
+
+
+#     ____                                 _     ____                 _ _
+#    / ___|___  _ __ ___  _ __   __ _  ___| |_  |  _ \ ___  ___ _   _| | |_ ___
+#   | |   / _ \| '_ ` _ \| '_ \ / _` |/ __| __| | |_) / _ \/ __| | | | | __/ __|
+#   | |__| (_) | | | | | | |_) | (_| | (__| |_  |  _ <  __/\__ \ |_| | | |_\__ \
+#    \____\___/|_| |_| |_| .__/ \__,_|\___|\__| |_| \_\___||___/\__,_|_|\__|___/
+#                        |_|
+def compact_detections(results) -> tuple:
+    """
+    Convert ultralytics Results (of one image) into compact arrays:
+    xyxy (n, 4) float32, conf (n,) float32 and cls (n,) int32.
+
+    Small enough to be pickled through a pipe every frame.
+    """
+    if not results:
+        return empty_detections()
+    boxes = results[0].boxes.numpy()
+    return (
+        boxes.xyxy.astype(np.float32),
+        boxes.conf.astype(np.float32),
+        boxes.cls.astype(np.int32),
+    )
+
+
+#    ____             ____                              _
+#   |  _ \ _ __ ___  |  _ \ _ __ ___   ___ ___  ___ ___(_)_ __   __ _
+#   | |_) | '__/ _ \ | |_) | '__/ _ \ / __/ _ \/ __/ __| | '_ \ / _` |
+#   |  __/| | |  __/ |  __/| | | (_) | (_|  __/\__ \__ \ | | | | (_| |
+#   |_|   |_|  \___| |_|   |_|  \___/ \___\___||___/___/_|_| |_|\__, |
+#                                                               |___/
+def letterbox(image: np.ndarray, size) -> tuple:
+    """
+    Resize a BGR image into (height, width) = `size` keeping its aspect
+    ratio, pad with gray like ultralytics does. Returns the 1x3xHxW float32
+    RGB blob, the scale and the (left, top) padding.
+    """
+    height, width = image.shape[:2]
+    scale = min(size[0] / height, size[1] / width)
+    new_height, new_width = round(height * scale), round(width * scale)
+    top = (size[0] - new_height) // 2
+    left = (size[1] - new_width) // 2
+    canvas = np.full((size[0], size[1], 3), LETTERBOX_COLOR, dtype=np.uint8)
+    canvas[top : top + new_height, left : left + new_width] = cv2.resize(
+        image, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+    )
+    blob = cv2.dnn.blobFromImage(canvas, 1 / 255.0, swapRB=True)
+    return blob, scale, (left, top)
+
+
+#    ____           _     ____                              _
+#   |  _ \ ___  ___| |_  |  _ \ _ __ ___   ___ ___  ___ ___(_)_ __   __ _
+#   | |_) / _ \/ __| __| | |_) | '__/ _ \ / __/ _ \/ __/ __| | '_ \ / _` |
+#   |  __/ (_) \__ \ |_  |  __/| | | (_) | (_|  __/\__ \__ \ | | | | (_| |
+#   |_|   \___/|___/\__| |_|   |_|  \___/ \___\___||___/___/_|_| |_|\__, |
+#                                                                   |___/
+def non_max_suppression(xyxy, scores, classes, iou_threshold=IOU_THRESHOLD):
+    """
+    Class aware NMS. Returns the indices of the kept boxes, best first.
+    """
+    # shift the boxes of every class into their own region -> one pass for all
+    boxes = xyxy + (classes * (xyxy.max() + 1))[:, None]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size and len(keep) < MAX_DETECTIONS:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        top_left = np.maximum(boxes[best, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[best, 2:], boxes[rest, 2:])
+        overlap = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        iou = overlap / (areas[best] + areas[rest] - overlap)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(
+    output, scale, pad, image_shape, conf_threshold=CONF_THRESHOLD
+) -> tuple:
+    """
+    Decode a raw YOLOv8 detection output (1, 4 + classes, anchors) of a
+    letterboxed input into compact (xyxy, conf, cls) arrays in image pixels.
+    Shared by all backends that do not run ultralytics' own post-processing.
+    """
+    predictions = output[0].T
+    class_scores = predictions[:, 4:]
+    cls = class_scores.argmax(axis=1)
+    conf = class_scores[np.arange(len(cls)), cls]
+    mask = conf >= conf_threshold
+    if not mask.any():
+        return empty_detections()
+    cx, cy, w, h = predictions[mask, :4].T
+    xyxy = np.stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), axis=1)
+    conf, cls = conf[mask], cls[mask]
+    keep = non_max_suppression(xyxy, conf, cls)
+    xyxy = xyxy[keep]
+    # undo the letterbox
+    xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / scale
+    xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / scale
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, image_shape[1])
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, image_shape[0])
+    return (
+        xyxy.astype(np.float32),
+        conf[keep].astype(np.float32),
+        cls[keep].astype(np.int32),
+    )
+
+
+#    _____                       _      ____           _
+#   | ____|_  ___ __   ___  _ __| |_   / ___|__ _  ___| |__   ___
+#   |  _| \ \/ / '_ \ / _ \| '__| __| | |   / _` |/ __| '_ \ / _ \
+#   | |___ >  <| |_) | (_) | |  | |_  | |__| (_| | (__| | | |  __/
+#   |_____/_/\_\ .__/ \___/|_|   \__|  \____\__,_|\___|_| |_|\___|
+#              |_|
+def exported_model(model_path, fmt, int8=False) -> tuple:
+    """
+    Return (path, names) of `model_path` (.pt) exported to `fmt` ("onnx" or
+    "openvino"), optionally INT8 quantized. Exports on first use and caches
+    the result in <models>/cache, later calls (and sessions) skip PyTorch.
+    Nothing is left next to the .pt file.
+    """
+    model_path = pathlib.Path(model_path)
+    cache_dir = model_path.parent / CACHE_DIR_NAME
+    # "dynamic": batch and image size axes, older static exports are not reused
+    fp32_stem = model_path.stem + "_dynamic"
+    # "_qdq": static quantization, older dynamic INT8 exports are not reused
+    stem = fp32_stem + ("_int8_qdq" if int8 else "")
+    if fmt == "onnx":
+        path = cache_dir / (stem + ".onnx")
+    else:
+        path = cache_dir / (stem + "_openvino_model")
+    names_path = cache_dir / (stem + "_names.json")
+
+    if not path.exists() or not names_path.exists():
+        logger.info("Exporting {} to {} (once) ...".format(model_path.name, path))
+        from ultralytics import YOLO
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        model = YOLO(model_path)
+        if fmt == "onnx":
+            # the fp32 export doubles as the quantization input
+            fp32_path = cache_dir / (fp32_stem + ".onnx")
+            if not fp32_path.exists():
+                exported = model.export(format="onnx", imgsz=EXPORT_IMGSZ, dynamic=True)
+                pathlib.Path(exported).replace(fp32_path)
+            if int8:
+                quantize_onnx(fp32_path, path, model_path.parent)
+        else:
+            # ultralytics quantizes with NNCF (needs its calibration dataset)
+            exported = model.export(
+                format="openvino", imgsz=EXPORT_IMGSZ, dynamic=True, int8=int8
+            )
+            pathlib.Path(exported).replace(path)
+        names_path.write_text(json.dumps({int(k): v for k, v in model.names.items()}))
+
+    names = {int(k): v for k, v in json.loads(names_path.read_text()).items()}
+    return path, names
+
+
+def calibration_images(models_dir) -> list:
+    """
+    Return up to CALIBRATION_FRAMES BGR images for INT8 calibration.
+    """
+    calibration_dir = pathlib.Path(models_dir) / CALIBRATION_DIR_NAME
+    paths = sorted(p for p in calibration_dir.glob("*") if p.suffix in (".jpg", ".png"))
+    if not paths:
+        from ultralytics.utils import ASSETS
+
+        paths = sorted(ASSETS.glob("*.jpg"))
+    images = [cv2.imread(str(p)) for p in paths[:CALIBRATION_FRAMES]]
+    return [image for image in images if image is not None]
+
+
+def quantize_onnx(fp32_path, int8_path, models_dir) -> None:
+    """
+    Static INT8 quantization (QDQ, per channel weights) of an ONNX export.
+    ORT fuses QDQ pairs into integer convolutions, unlike dynamic (weight
+    only) quantization which runs ConvInteger, often slower than FP32.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    input_name = onnxruntime.InferenceSession(
+        str(fp32_path), providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+    blobs = [
+        letterbox(image, (EXPORT_IMGSZ, EXPORT_IMGSZ))[0]
+        for image in calibration_images(models_dir)
+    ]
+
+    class Frames(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(blobs)
+
+        def get_next(self):
+            blob = next(self.frames, None)
+            return None if blob is None else {input_name: blob}
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        Frames(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+#    ____             _                  _
+#   | __ )  __ _  ___| | _____ _ __   __| |___
+#   |  _ \ / _` |/ __| |/ / _ \ '_ \ / _` / __|
+#   | |_) | (_| | (__|   <  __/ | | | (_| \__ \
+#   |____/ \__,_|\___|_|\_\___|_| |_|\__,_|___/
+class UltralyticsBackend():
+    """
+    The original path: ultralytics YOLO on PyTorch (incl. its own NMS).
+    """
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+
+    def predict(self, image) -> tuple:
+        return compact_detections(self.model.predict(image, verbose=False))
+
+    def predict_batch(self, images) -> list:
+        # one forward pass for all images
+        results = self.model.predict(list(images), verbose=False)
+        return [compact_detections([r]) for r in results]
+
+
+class OnnxRuntimeBackend():
+    """
+    Exported ONNX model on the ONNX Runtime CPU provider.
+    """
+
+    def __init__(self, model_path, int8=False):
+        path, self.names = exported_model(model_path, "onnx", int8)
+        self.session = onnxruntime.InferenceSession(
+            str(path), providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # dynamic axes are named (str), those exports take any batch size
+        self.input_size = tuple(
+            d if isinstance(d, int) else EXPORT_IMGSZ for d in model_input.shape[2:4]
+        )
+        self.batched = model_input.shape[0] != 1
+
+    def predict(self, image) -> tuple:
+        blob, scale, pad = letterbox(image, self.input_size)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return postprocess(output, scale, pad, image.shape)
+
+    def predict_batch(self, images) -> list:
+        if not self.batched:
+            return [self.predict(image) for image in images]
+        letterboxed = [letterbox(image, self.input_size) for image in images]
+        blob = np.concatenate([blob for blob, _, _ in letterboxed])
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return [
+            postprocess(output[i : i + 1], scale, pad, image.shape)
+            for i, (image, (_, scale, pad)) in enumerate(zip(images, letterboxed))
+        ]
+
+
+class OpenVinoBackend():
+    """
+    Exported OpenVINO IR model on the CPU plugin.
+    """
+
+    def __init__(self, model_path, int8=False):
+        path, self.names = exported_model(model_path, "openvino", int8)
+        core = openvino.Core()
+        xml = next(path.glob("*.xml"))
+        model = core.read_model(xml)
+        # only the batch stays dynamic, a static image size compiles faster
+        shape = model.input(0).get_partial_shape()
+        self.batched = shape[0].is_dynamic or shape[0].get_length() != 1
+        self.input_size = tuple(
+            d.get_length() if d.is_static else EXPORT_IMGSZ for d in list(shape)[2:4]
+        )
+        batch = -1 if self.batched else 1
+        model.reshape([batch, 3, self.input_size[0], self.input_size[1]])
+        self.model = core.compile_model(model, "CPU")
+
+    def predict(self, image) -> tuple:
+        blob, scale, pad = letterbox(image, self.input_size)
+        output = self.model(blob)[self.model.output(0)]
+        return postprocess(output, scale, pad, image.shape)
+
+    def predict_batch(self, images) -> list:
+        if not self.batched:
+            return [self.predict(image) for image in images]
+        letterboxed = [letterbox(image, self.input_size) for image in images]
+        blob = np.concatenate([blob for blob, _, _ in letterboxed])
+        output = self.model(blob)[self.model.output(0)]
+        return [
+            postprocess(output[i : i + 1], scale, pad, image.shape)
+            for i, (image, (_, scale, pad)) in enumerate(zip(images, letterboxed))
+        ]
+
+
+def create_backend(backend, model_path, int8=False) -> any:
+    """
+    Load `model_path` (.pt) with the given backend. Every backend offers
+    `names` ({class id: name}), `predict(bgr_image) -> (xyxy, conf, cls)` and
+    `predict_batch(bgr_images) -> [(xyxy, conf, cls), ...]`.
+    """
+    if backend == "onnxruntime":
+        return OnnxRuntimeBackend(model_path, int8)
+    if backend == "openvino":
+        return OpenVinoBackend(model_path, int8)
+    if int8:
+        logger.warning("INT8 is only supported by the ONNX Runtime/OpenVINO backends.")
+    return UltralyticsBackend(model_path)
@@ -0,0 +1,125 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    batch.py                                           :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 20:02:41 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 20:02:41 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import numpy as np
+
+
+#     ____ _                 _____     _     _
+#    / ___| | __ _ ___ ___  |_   _|_ _| |__ | | ___
+#   | |   | |/ _` / __/ __|   | |/ _` | '_ \| |/ _ \
+#   | |___| | (_| \__ \__ \   | | (_| | |_) | |  __/
+#    \____|_|\__,_|___/___/   |_|\__,_|_.__/|_|\___|
+class ClassTable():
+    """
+    Class names and display colors of a model, built once when the model
+    is loaded and shared by every batch it produces.
+    """
+    def __init__(self, names, colors):
+        # model.names is a {class id: name} dict
+        self.names = np.array([str(names[k]) for k in sorted(names)], dtype=object)
+        self.colors = np.asarray(colors, dtype=np.float32).reshape(len(self.names), -1)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+#    ____       _            _   _               ____        _       _
+#   |  _ \  ___| |_ ___  ___| |_(_) ___  _ __   | __ )  __ _| |_ ___| |__
+#   | | | |/ _ \ __/ _ \/ __| __| |/ _ \| '_ \  |  _ \ / _` | __/ __| '_ \
+#   | |_| |  __/ ||  __/ (__| |_| | (_) | | | | | |_) | (_| | || (__| | | |
+#   |____/ \___|\__\___|\___|\__|_|\___/|_| |_| |____/ \__,_|\__\___|_| |_|
+class DetectionBatch():
+    """
+    All detections of one frame as parallel numpy arrays (struct of arrays)
+    instead of one dict per box. Consumers use the arrays directly; iterating
+    or indexing the batch yields the old per-object dicts, built lazily on
+    first use, so code written against the list of dicts keeps working.
+    """
+    __slots__ = (
+        "xyxy", "conf", "cls", "track_ids", "classes", "frame_index", "timestamp",
+        "_dicts",
+    )
+    topic = "/object_detection"
+
+    def __init__(
+        self, xyxy, conf, cls, classes, frame_index, timestamp, track_ids=None
+    ):
+        self.xyxy = xyxy  # (n, 4) float32
+        self.conf = conf  # (n,) float32
+        self.cls = cls  # (n,) int, index into classes
+        self.track_ids = track_ids  # (n,) int64 or None without tracking
+        self.classes = classes
+        self.frame_index = frame_index
+        self.timestamp = timestamp
+        self._dicts = None
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    @property
+    def xywh(self) -> np.ndarray:
+        """
+        Boxes as (center x, center y, width, height).
+        """
+        wh = self.xyxy[:, 2:] - self.xyxy[:, :2]
+        return np.concatenate((self.xyxy[:, :2] + wh / 2, wh), axis=1)
+
+    @property
+    def names(self) -> np.ndarray:
+        return self.classes.names[self.cls]
+
+    @property
+    def colors(self) -> np.ndarray:
+        return self.classes.colors[self.cls]
+
+    #    ____  _      _    __     ___
+    #   |  _ \(_) ___| |_  \ \   / (_) _____      __
+    #   | | | | |/ __| __|  \ \ / /| |/ _ \ \ /\ / /
+    #   | |_| | | (__| |_    \ V / | |  __/\ V  V /
+    #   |____/|_|\___|\__|    \_/  |_|\___| \_/\_/
+    def dicts(self) -> list:
+        """
+        The detections as the per-object dicts the plugins used to pass around.
+        """
+        if self._dicts is None:
+            if self.track_ids is None:
+                track_ids = [None] * len(self)
+            else:
+                track_ids = self.track_ids.tolist()
+            self._dicts = [
+                {
+                    "topic": self.topic,
+                    "xyxy": xyxy,
+                    "xywh": xywh,
+                    "color": tuple(color),
+                    "cls": name,
+                    "conf": conf,
+                    "track_id": track_id,
+                    "frame_index": self.frame_index,
+                    "timestamp": self.timestamp,
+                }
+                for xyxy, xywh, color, name, conf, track_id in zip(
+                    self.xyxy.tolist(),
+                    self.xywh.tolist(),
+                    self.colors.tolist(),
+                    self.names.tolist(),
+                    self.conf.tolist(),
+                    track_ids,
+                )
+            ]
+        return self._dicts
+
+    def __iter__(self):
+        return iter(self.dicts())
+
+    def __getitem__(self, i) -> dict:
+        return self.dicts()[i]
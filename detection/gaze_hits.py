@@ -0,0 +1,110 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    gaze_hits.py                                       :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 21:31:55 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 21:31:55 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import numpy as np
+
+# gaps between gaze samples longer than this do not count as dwell time
+MAX_GAZE_GAP = 0.1  # [s]
+# dwell restarts once an object was not looked at for this long
+DWELL_GRACE = 0.25  # [s]
+
+
+#    _   _ _ _     _____         _   _
+#   | | | (_) |_  |_   _|__  ___| |_(_)_ __   __ _
+#   | |_| | | __|   | |/ _ \/ __| __| | '_ \ / _` |
+#   |  _  | | |_    | |  __/\__ \ |_| | | | | (_| |
+#   |_| |_|_|\__|   |_|\___||___/\__|_|_| |_|\__, |
+#                                            |___/
+def points_in_boxes(points, xyxy) -> np.ndarray:
+    """
+    Return the (m, n) matrix telling which of the m (x, y) points lie in
+    which of the n xyxy boxes.
+    """
+    x = points[:, None, 0]
+    y = points[:, None, 1]
+    return (
+        (x >= xyxy[None, :, 0])
+        & (x <= xyxy[None, :, 2])
+        & (y >= xyxy[None, :, 1])
+        & (y <= xyxy[None, :, 3])
+    )
+
+
+def gaze_hits(points, xyxy) -> np.ndarray:
+    """
+    Return for every point the index of the box it hits, -1 for none. Where
+    boxes are nested or overlap the smallest one wins (the object in front
+    of / on top of a larger one).
+    """
+    if len(points) == 0 or len(xyxy) == 0:
+        return np.full(len(points), -1, dtype=np.int64)
+    inside = points_in_boxes(points, xyxy)
+    areas = np.prod(xyxy[:, 2:] - xyxy[:, :2], axis=1)
+    masked = np.where(inside, areas[None, :], np.inf)
+    hits = masked.argmin(axis=1)
+    hits[~inside.any(axis=1)] = -1
+    return hits
+
+
+#    ____               _ _   _____ _
+#   |  _ \__      _____| | | |_   _(_)_ __ ___   ___
+#   | | | \ \ /\ / / _ \ | |   | | | | '_ ` _ \ / _ \
+#   | |_| |\ V  V /  __/ | |   | | | | | | | | |  __/
+#   |____/  \_/\_/ \___|_|_|   |_| |_|_| |_| |_|\___|
+class DwellAccumulator():
+    """
+    Accumulates how long each object (track id, or class without tracking)
+    has been looked at without interruption. Every gaze sample on an object
+    adds the time to the next sample (capped at MAX_GAZE_GAP), objects not
+    looked at for DWELL_GRACE start over.
+    """
+    def __init__(self, grace=DWELL_GRACE):
+        self.grace = grace
+        self.reset()
+
+    def reset(self) -> None:
+        self.dwell = {}  # key -> [s]
+        self.last_hit = {}  # key -> timestamp
+        self._last_timestamp = None
+
+    def update(self, hits, timestamps, keys) -> np.ndarray:
+        """
+        Add the gaze samples of one tick: `hits` (box index per sample, -1
+        for none), their `timestamps` and the dwell `keys` of the boxes.
+        Returns the dwell time per box.
+        """
+        if len(timestamps):
+            # every sample stands for the time since the previous one
+            previous = self._last_timestamp
+            if previous is None:
+                previous = timestamps[0]
+            dt = np.clip(np.diff(timestamps, prepend=previous), 0, MAX_GAZE_GAP)
+            self._last_timestamp = timestamps[-1]
+            on_box = hits >= 0
+            # per box sums and first/last hit, one pass over all samples
+            added = np.bincount(hits[on_box], weights=dt[on_box], minlength=len(keys))
+            first = np.full(len(keys), np.inf)
+            last = np.full(len(keys), -np.inf)
+            np.minimum.at(first, hits[on_box], timestamps[on_box])
+            np.maximum.at(last, hits[on_box], timestamps[on_box])
+            for i in np.flatnonzero(np.isfinite(last)).tolist():
+                key = keys[i]
+                if first[i] - self.last_hit.get(key, -np.inf) > self.grace:
+                    # looked away for too long (or new), start over
+                    self.dwell[key] = 0.0
+                self.dwell[key] += added[i]
+                self.last_hit[key] = max(last[i], self.last_hit.get(key, -np.inf))
+            # forget objects that have not been looked at for a while
+            cutoff = timestamps[-1] - self.grace
+            for key in [k for k, t in self.last_hit.items() if t < cutoff]:
+                del self.dwell[key], self.last_hit[key]
+        return np.array([self.dwell.get(key, 0.0) for key in keys])
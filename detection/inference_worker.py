@@ -0,0 +1,128 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    inference_worker.py                                :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 17:31:05 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 17:31:05 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import threading
+import time
+
+import numpy as np
+
+from frame_utils.buffer_pool import BufferPool
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+
+# EWMA weight of the newest inference time
+TIMING_SMOOTHING = 0.1
+
+
+#    ___        __                               __        __         _
+#   |_ _|_ __  / _| ___ _ __ ___ _ __   ___ ___  \ \      / /__  _ __| | _____ _ __
+#    | || '_ \| |_ / _ \ '__/ _ \ '_ \ / __/ _ \  \ \ /\ / / _ \| '__| |/ / _ \ '__|
+#    | || | | |  _|  __/ | |  __/ | | | (_|  __/   \ V  V / (_) | |  |   <  __/ |
+#   |___|_| |_|_|  \___|_|  \___|_| |_|\___\___|    \_/\_/ \___/|_|  |_|\_\___|_|
+class InferenceWorker():
+    """
+    Runs a (slow) inference function on a background thread, so the Pupil
+    world loop never waits for it.
+
+    Frames are handed over through a single slot: if the worker is still busy
+    when the next frame arrives, the pending one is replaced ("latest frame
+    wins") and counted in `skipped`. Results are tagged with the index and
+    timestamp of the frame they were computed on and picked up with `poll`.
+
+    Frames are copied into buffers owned by the worker on `submit`: plugins
+    that run later in the same world loop (e.g. the gaze visualizers) draw
+    into the frame in place while inference is still reading it.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, infer, name="Inference worker"):
+        self.infer = infer
+        # statistics
+        self.skipped = 0
+        self.inference_time = 0.0  # [ms], moving average
+
+        self._buffers = BufferPool(max_free=2)
+        self._input = None
+        self._output = None
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    #    ___       _             __
+    #   |_ _|_ __ | |_ ___ _ __ / _| __ _  ___ ___
+    #    | || '_ \| __/ _ \ '__| |_ / _` |/ __/ _ \
+    #    | || | | | ||  __/ |  |  _| (_| | (_|  __/
+    #   |___|_| |_|\__\___|_|  |_|  \__,_|\___\___|
+    def submit(self, image, index, timestamp) -> None:
+        """
+        Hand over a frame (copied), never blocks.
+        """
+        buffer = self._buffers.acquire(image.shape, image.dtype)
+        np.copyto(buffer, image)
+        with self._cond:
+            replaced, self._input = self._input, (buffer, index, timestamp)
+            self._cond.notify()
+        if replaced is not None:
+            self.skipped += 1
+            self._buffers.release(replaced[0])
+
+    def poll(self) -> any:
+        """
+        Return (result, index, timestamp) of the newest finished inference,
+        or None if nothing new finished since the last call.
+        """
+        with self._cond:
+            output, self._output = self._output, None
+        return output
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join()
+
+    #   __        __         _
+    #   \ \      / /__  _ __| | _____ _ __
+    #    \ \ /\ / / _ \| '__| |/ / _ \ '__|
+    #     \ V  V / (_) | |  |   <  __/ |
+    #      \_/\_/ \___/|_|  |_|\_\___|_|
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._input is None and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                (image, index, timestamp), self._input = self._input, None
+
+            t0 = time.perf_counter()
+            try:
+                result = self.infer(image)
+            except Exception:
+                # keep the worker alive, the next frame may work again
+                logger.exception("Inference failed on frame {}".format(index))
+                continue
+            finally:
+                self._buffers.release(image)
+                del image
+            elapsed = (time.perf_counter() - t0) * 1000
+            self.inference_time += TIMING_SMOOTHING * (elapsed - self.inference_time)
+
+            with self._cond:
+                self._output = (result, index, timestamp)
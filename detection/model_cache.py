@@ -0,0 +1,131 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    model_cache.py                                     :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 18:47:33 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 18:47:33 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import collections
+import threading
+
+import numpy as np
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+
+# loaded models kept around for switching back without reloading
+MODEL_CACHE_SIZE = 3
+# frame used for the warm-up inference if the camera's frame size is unknown
+WARMUP_SHAPE = (480, 640, 3)
+
+
+#    __  __           _      _   _                    _
+#   |  \/  | ___   __| | ___| | | |    ___   __ _  __| | ___ _ __
+#   | |\/| |/ _ \ / _` |/ _ \ | | |   / _ \ / _` |/ _` |/ _ \ '__|
+#   | |  | | (_) | (_| |  __/ | | |__| (_) | (_| | (_| |  __/ |
+#   |_|  |_|\___/ \__,_|\___|_| |_____\___/ \__,_|\__,_|\___|_|
+class ModelLoader():
+    """
+    LRU cache of loaded models plus background loading.
+
+    `request(key)` returns immediately: a cached model is ready on the next
+    `poll`, anything else is loaded and warmed up (one dummy inference, which
+    allocates buffers and triggers lazy initialization) on a daemon thread.
+    Meanwhile the caller keeps using its current model, `poll` hands over the
+    new one once it is ready, so it can be swapped in with one assignment.
+
+    Only the most recent request is delivered, results of superseded
+    requests are cached but not handed over.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, load, capacity=MODEL_CACHE_SIZE):
+        """
+        `load(key)` creates a model offering `predict(bgr_image)`.
+        """
+        self.load = load
+        self.capacity = capacity
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._requested = None
+        self._finished = {}  # key -> (model, error) of background loads
+        self._loading = set()
+
+    #    ___       _             __
+    #   |_ _|_ __ | |_ ___ _ __ / _| __ _  ___ ___
+    #    | || '_ \| __/ _ \ '__| |_ / _` |/ __/ _ \
+    #    | || | | | ||  __/ |  |  _| (_| | (_|  __/
+    #   |___|_| |_|\__\___|_|  |_|  \__,_|\___\___|
+    def request(self, key, warmup_shape=WARMUP_SHAPE) -> None:
+        self._requested = key
+        if key in self._cache or key in self._loading:
+            return
+        self._loading.add(key)
+        threading.Thread(
+            target=self._load,
+            args=(key, warmup_shape),
+            name="Model loader",
+            daemon=True,
+        ).start()
+
+    def poll(self) -> any:
+        """
+        Return (key, model, error) once the requested model is ready (model
+        None and the exception in `error` if loading failed), else None.
+        Never blocks.
+        """
+        with self._lock:
+            finished, self._finished = self._finished, {}
+        for key, (model, error) in finished.items():
+            self._loading.discard(key)
+            if error is None:
+                self._cache_put(key, model)
+            elif key == self._requested:
+                self._requested = None
+                return key, None, error
+        key = self._requested
+        if key is None or key not in self._cache:
+            return None
+        self._requested = None
+        self._cache.move_to_end(key)
+        return key, self._cache[key], None
+
+    @property
+    def loading(self) -> bool:
+        return bool(self._loading)
+
+    #    ___       _                        _
+    #   |_ _|_ __ | |_ ___ _ __ _ __   __ _| |___
+    #    | || '_ \| __/ _ \ '__| '_ \ / _` | / __|
+    #    | || | | | ||  __/ |  | | | | (_| | \__ \
+    #   |___|_| |_|\__\___|_|  |_| |_|\__,_|_|___/
+    def _cache_put(self, key, model) -> None:
+        self._cache[key] = model
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.capacity:
+            evicted, _ = self._cache.popitem(last=False)
+            logger.debug("Evicted model {} from the cache.".format(evicted))
+
+    def _load(self, key, warmup_shape) -> None:
+        # runs on the loader thread
+        try:
+            model = self.load(key)
+            model.predict(np.zeros(warmup_shape, dtype=np.uint8))
+        except Exception as e:
+            logger.exception("Loading model {} failed.".format(key))
+            result = (None, e)
+        else:
+            logger.debug("Model {} loaded and warmed up.".format(key))
+            result = (model, None)
+        with self._lock:
+            self._finished[key] = result
@@ -0,0 +1,376 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    process_pool.py                                    :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 17:52:40 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 17:52:40 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detection.backends import create_backend
+from detection.model_cache import WARMUP_SHAPE
+from detection.tiles import TileBatching, predict_tiled
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+
+# EWMA weight of the newest inference time
+TIMING_SMOOTHING = 0.1
+# how long a stopped worker gets to exit before it is terminated
+WORKER_JOIN_TIMEOUT = 5.0  # s
+
+
+#   __        __         _               ____
+#   \ \      / /__  _ __| | _____ _ __  |  _ \ _ __ ___   ___ ___  ___ ___
+#    \ \ /\ / / _ \| '__| |/ / _ \ '__| | |_) | '__/ _ \ / __/ _ \/ __/ __|
+#     \ V  V / (_) | |  |   <  __/ |    |  __/| | | (_) | (_|  __/\__ \__ \
+#      \_/\_/ \___/|_|  |_|\_\___|_|    |_|   |_|  \___/ \___\___||___/___/
+def _worker_main(model_key, tasks, results):
+    """
+    Entry point of an inference process: loads its own model, then runs
+    inference on the frames referenced by the descriptors in `tasks` until it
+    receives None. Every descriptor names the shared memory ring its frame is
+    in and the model to run (a grown ring is attached, a new model loaded on
+    the first frame that needs it). The class names of a loaded model are
+    reported before its first detections.
+    """
+    generation, key = 0, model_key
+    model = create_backend(*key)
+    batching = TileBatching()
+    results.put((None, None, None, generation, None, model.names))
+    ring, shm, frames = None, None, None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, index, timestamp, height, width, tiling, task_ring, task_model = task
+            if task_model[0] != generation:
+                generation, key = task_model
+                del model
+                model = create_backend(*key)
+                batching = TileBatching()
+                results.put((None, None, None, generation, None, model.names))
+            if task_ring != ring:
+                if shm is not None:
+                    del frames
+                    shm.close()
+                ring = task_ring
+                shm_name, slot_shape = ring
+                shm = shared_memory.SharedMemory(name=shm_name)
+                frames = np.ndarray(slot_shape, dtype=np.uint8, buffer=shm.buf)
+            t0 = time.perf_counter()
+            try:
+                image = frames[slot, :height, :width]
+                if tiling is not None:
+                    detections = predict_tiled(model, image, *tiling, batching=batching)
+                else:
+                    detections = model.predict(image)
+            except Exception as e:
+                results.put((slot, index, timestamp, generation, None, repr(e)))
+                continue
+            elapsed = (time.perf_counter() - t0) * 1000
+            results.put((slot, index, timestamp, generation, detections, elapsed))
+    finally:
+        if shm is not None:
+            del frames
+            shm.close()
+
+
+def _reap(processes, tasks, results) -> None:
+    """
+    Wait for stopped workers to exit (terminate them after
+    WORKER_JOIN_TIMEOUT) and release their queues. Runs on its own thread,
+    a worker busy with a slow inference must not block the world loop.
+    """
+    for process in processes:
+        process.join(WORKER_JOIN_TIMEOUT)
+        if process.is_alive():
+            logger.warning("Terminating {}.".format(process.name))
+            process.terminate()
+            process.join()
+    for q in (tasks, results):
+        # a terminated worker may have left data behind, don't wait for it
+        q.cancel_join_thread()
+        q.close()
+
+
+#    ____                                ___        __
+#   |  _ \ _ __ ___   ___ ___  ___ ___  |_ _|_ __  / _| ___ _ __ ___ _ __   ___ ___
+#   | |_) | '__/ _ \ / __/ _ \/ __/ __|  | || '_ \| |_ / _ \ '__/ _ \ '_ \ / __/ _ \
+#   |  __/| | | (_) | (_|  __/\__ \__ \  | || | | |  _|  __/ | |  __/ | | | (_|  __/
+#   |_|   |_|  \___/ \___\___||___/___/ |___|_| |_|_|  \___|_|  \___|_| |_|\___\___|
+class ProcessInference():
+    """
+    Runs YOLO inference in `workers` separate processes, so ultralytics'
+    pre/post-processing does not compete with Pupil for the GIL.
+
+    Frames are copied into a shared memory ring with one slot per worker,
+    only small descriptors (slot, index, timestamp, size) go through the task
+    queue and detections come back as compact (xyxy, conf, cls) arrays. Any
+    backend of `detection.backends` can be used.
+
+    The slots are sized for `frame_shape` (the full world frame, crops use
+    the top left part of a slot). A larger frame gets a new, larger ring, the
+    workers attach to it on their next frame, they are not restarted. Stopping
+    never blocks either, the workers are joined on a background thread.
+
+    Same interface as InferenceWorker: frames that arrive while all workers
+    are busy wait in a single pending slot (latest frame wins, replaced ones
+    are counted in `skipped`), `poll` returns the newest result. Results that
+    are older than an already delivered one (workers finish out of order) are
+    dropped.
+
+    `set_model` switches the running workers to another model, the main
+    process never loads one. Results of the previous model are dropped and
+    `poll_model` hands over the class names once a worker loaded the new one.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(
+        self,
+        model_path,
+        workers=2,
+        backend="ultralytics",
+        int8=False,
+        tiling=None,
+        frame_shape=WARMUP_SHAPE,
+    ):
+        self.workers = max(1, int(workers))
+        # (backend, model path, int8), numbered so workers notice a change
+        self.generation = 0
+        self.model_key = (backend, str(model_path), int8)
+        self.names = None  # class names of the current model, once loaded
+        self._names_ready = False
+        # (tile size, overlap) for tiled inference or None, sent with every frame
+        self.tiling = tiling
+        # statistics
+        self.skipped = 0
+        self.inference_time = 0.0  # [ms], moving average
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shm = None
+        self._frames = None
+        self._slot_rings = {}  # slot -> shared memory of the frame it is busy with
+        self._retired = []  # outgrown rings still read by a worker
+        self._processes = []
+        self._free_slots = []
+        self._pending = None
+        self._newest_index = -1
+        # set if a worker died (e.g. the model failed to load), no restarts
+        self.failed = False
+        self._start(frame_shape)
+
+    def _start(self, frame_shape) -> None:
+        """
+        Allocate the shared ring for frames up to `frame_shape` and spawn the
+        workers.
+        """
+        self._allocate(frame_shape)
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._processes = [
+            self._ctx.Process(
+                target=_worker_main,
+                args=(self.model_key, self._tasks, self._results),
+                name="YOLO inference {}".format(i),
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        self._free_slots = list(range(self.workers))
+        self._newest_index = -1
+        logger.debug("Started {} inference processes.".format(self.workers))
+
+    def _allocate(self, frame_shape) -> None:
+        """
+        Switch to a new ring for frames up to `frame_shape`. The previous one
+        is released once no worker reads from it anymore.
+        """
+        if self._shm is not None:
+            self._frames = None
+            self._retire(self._shm)
+        slot_shape = (self.workers,) + tuple(int(size) for size in frame_shape)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(slot_shape))
+        )
+        self._frames = np.ndarray(slot_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._pending_frame = np.empty(slot_shape[1:], dtype=np.uint8)
+        self._ring = (self._shm.name, slot_shape)
+
+    #    ___       _             __
+    #   |_ _|_ __ | |_ ___ _ __ / _| __ _  ___ ___
+    #    | || '_ \| __/ _ \ '__| |_ / _` |/ __/ _ \
+    #    | || | | | ||  __/ |  |  _| (_| | (_|  __/
+    #   |___|_| |_|\__\___|_|  |_|  \__,_|\___\___|
+    def submit(self, image, index, timestamp) -> None:
+        """
+        Hand over a frame, never blocks. The frame is copied right away, into
+        shared memory if a worker is free, else into the pending buffer (it is
+        drawn on later in the world loop, e.g. by the gaze visualizers).
+        """
+        if self.failed:
+            return
+        slot_shape = self._frames.shape[1:]
+        if any(size > slot_size for size, slot_size in zip(image.shape, slot_shape)):
+            # e.g. the camera resolution changed
+            self._allocate(np.maximum(image.shape, slot_shape))
+        if self._pending is not None:
+            self.skipped += 1
+            self._pending = None
+        if self._free_slots:
+            self._send(image, index, timestamp)
+            return
+        height, width = image.shape[:2]
+        pending = self._pending_frame[:height, :width]
+        np.copyto(pending, image)
+        self._pending = (pending, index, timestamp)
+
+    def set_model(self, model_path, backend="ultralytics", int8=False) -> None:
+        """
+        Switch the workers to another model, each loads it before its next
+        frame. Never blocks, no processes are restarted.
+        """
+        self.generation += 1
+        self.model_key = (backend, str(model_path), int8)
+        self.names = None
+        self._names_ready = False
+
+    def poll_model(self) -> any:
+        """
+        Return the class names once the current model is loaded (only once
+        per model), else None.
+        """
+        if not self._names_ready:
+            return None
+        self._names_ready = False
+        return self.names
+
+    def poll(self) -> any:
+        """
+        Return (detections, index, timestamp) of the newest finished frame,
+        or None if nothing new finished since the last call.
+        """
+        if self.failed:
+            return None
+        newest = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            slot, index, timestamp, generation, detections, info = result
+            if slot is None:
+                # a worker loaded a model, `info` are its class names
+                if generation == self.generation and self.names is None:
+                    self.names = info
+                    self._names_ready = True
+                continue
+            self._free_slot(slot)
+            if generation != self.generation:
+                # computed by the previous model
+                continue
+            if detections is None:
+                logger.error("Inference failed on frame {}: {}".format(index, info))
+                continue
+            self.inference_time += TIMING_SMOOTHING * (info - self.inference_time)
+            if index > self._newest_index:
+                self._newest_index = index
+                newest = (detections, index, timestamp)
+        dead = [p for p in self._processes if not p.is_alive()]
+        if dead:
+            logger.error(
+                "{} died (exit code {}), stopping inference.".format(
+                    dead[0].name, dead[0].exitcode
+                )
+            )
+            self.failed = True
+            self._shutdown()
+            return newest
+        self._dispatch()
+        return newest
+
+    def stop(self) -> None:
+        """
+        Stop the workers, never blocks (see `_reap`).
+        """
+        self._shutdown()
+
+    #    ___       _                        _
+    #   |_ _|_ __ | |_ ___ _ __ _ __   __ _| |___
+    #    | || '_ \| __/ _ \ '__| '_ \ / _` | / __|
+    #    | || | | | ||  __/ |  | | | | (_| | \__ \
+    #   |___|_| |_|\__\___|_|  |_| |_|\__,_|_|___/
+    def _dispatch(self) -> None:
+        if self._pending is None or not self._free_slots:
+            return
+        (image, index, timestamp), self._pending = self._pending, None
+        self._send(image, index, timestamp)
+
+    def _send(self, image, index, timestamp) -> None:
+        slot = self._free_slots.pop()
+        height, width = image.shape[:2]
+        self._frames[slot, :height, :width] = image
+        self._slot_rings[slot] = self._shm
+        model = (self.generation, self.model_key)
+        self._tasks.put(
+            (slot, index, timestamp, height, width, self.tiling, self._ring, model)
+        )
+
+    def _free_slot(self, slot) -> None:
+        self._free_slots.append(slot)
+        shm = self._slot_rings.pop(slot, None)
+        if shm in self._retired and shm not in self._slot_rings.values():
+            self._retired.remove(shm)
+            self._release(shm)
+
+    def _retire(self, shm) -> None:
+        if shm in self._slot_rings.values():
+            self._retired.append(shm)
+        else:
+            self._release(shm)
+
+    @staticmethod
+    def _release(shm) -> None:
+        # workers that still have it attached keep their mapping
+        shm.close()
+        shm.unlink()
+
+    def _shutdown(self) -> None:
+        if not self._processes:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        threading.Thread(
+            target=_reap,
+            args=(self._processes, self._tasks, self._results),
+            name="Inference shutdown",
+            daemon=True,
+        ).start()
+        self._processes = []
+        self._frames = None
+        for shm in self._retired + [self._shm]:
+            self._release(shm)
+        self._shm = None
+        self._retired = []
+        self._slot_rings = {}
+        self._pending = None
+        self._free_slots = []
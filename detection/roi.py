@@ -0,0 +1,44 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    roi.py                                             :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 19:10:52 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 19:10:52 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+# gaze below this confidence does not steer the region of interest
+MIN_GAZE_CONFIDENCE = 0.6
+
+
+#     ____                 ____   ___ ___
+#    / ___| __ _ _______  |  _ \ / _ \_ _|
+#   | |  _ / _` |_  / _ \ | |_) | | | | |
+#   | |_| | (_| |/ /  __/ |  _ <| |_| | |
+#    \____|\__,_/___\___| |_| \_\\___/___|
+def gaze_roi(center, roi_size, frame_size) -> tuple:
+    """
+    Return the (x0, y0, x1, y1) pixel window of `roi_size` (width, height)
+    centered on `center` (x, y). The window is shifted (not shrunk) to stay
+    inside `frame_size` (width, height), only frames smaller than the window
+    clip it.
+    """
+    width = min(int(roi_size[0]), frame_size[0])
+    height = min(int(roi_size[1]), frame_size[1])
+    x0 = int(round(center[0] - width / 2))
+    y0 = int(round(center[1] - height / 2))
+    x0 = min(max(x0, 0), frame_size[0] - width)
+    y0 = min(max(y0, 0), frame_size[1] - height)
+    return x0, y0, x0 + width, y0 + height
+
+
+def roi_to_frame(xyxy, roi) -> None:
+    """
+    Shift (n, 4) boxes detected in the crop `roi` into frame coordinates
+    (in place).
+    """
+    xyxy[:, [0, 2]] += roi[0]
+    xyxy[:, [1, 3]] += roi[1]
@@ -0,0 +1,88 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    scene_gate.py                                      :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 20:21:07 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 20:21:07 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import cv2
+import numpy as np
+
+# frames are compared as tiny grayscale thumbnails
+THUMBNAIL_SIZE = (64, 36)  # (width, height)
+# mean absolute thumbnail difference (0-255) below which the scene counts as static
+CHANGE_THRESHOLD = 4.0
+# detections are reused at most this long, then inference runs regardless
+MAX_REUSE_AGE = 2.0  # [s]
+
+
+#    ____                         ____       _
+#   / ___|  ___ ___ _ __   ___   / ___| __ _| |_ ___
+#   \___ \ / __/ _ \ '_ \ / _ \ | |  _ / _` | __/ _ \
+#    ___) | (_|  __/ | | |  __/ | |_| | (_| | ||  __/
+#   |____/ \___\___|_| |_|\___|  \____|\__,_|\__\___|
+class SceneGate():
+    """
+    Cheap change detector deciding whether a frame needs a new inference.
+
+    Every frame is shrunk to a small grayscale thumbnail (~0.1 ms even
+    for full HD) and compared to the thumbnail of the last
+    frame that went to inference. As long as the mean absolute difference
+    stays below `threshold` and the reference is younger than `max_age`,
+    the previous detections can be reused.
+    """
+    def __init__(self, threshold=CHANGE_THRESHOLD, max_age=MAX_REUSE_AGE):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.checked = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget the reference, the next frame always counts as changed.
+        """
+        self.reference = None
+        self.reference_timestamp = None
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def thumbnail(self, image) -> np.ndarray:
+        """
+        Shrink the frame to THUMBNAIL_SIZE. A strided view of the green channel
+        (close enough to luma) cuts the pixels to ~4x the thumbnail first, area
+        averaging the whole frame would cost milliseconds.
+        """
+        width, height = THUMBNAIL_SIZE
+        step = min(image.shape[0] // (4 * height), image.shape[1] // (4 * width))
+        step = max(step, 1)
+        sampled = image[::step, ::step, 1] if image.ndim == 3 else image[::step, ::step]
+        return cv2.resize(
+            np.ascontiguousarray(sampled), THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA
+        )
+
+    def changed(self, image, timestamp) -> bool:
+        """
+        Return True if `image` needs a new inference; it then becomes the new
+        reference. False means the previous detections are still valid.
+        """
+        self.checked += 1
+        thumb = self.thumbnail(image)
+        if (
+            self.reference is not None
+            and thumb.shape == self.reference.shape
+            and timestamp - self.reference_timestamp < self.max_age
+            and cv2.absdiff(thumb, self.reference).mean() < self.threshold
+        ):
+            self.skipped += 1
+            return False
+        self.reference = thumb
+        self.reference_timestamp = timestamp
+        return True
@@ -0,0 +1,185 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    scheduler.py                                       :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 20:44:30 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 20:44:30 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import math
+import time
+from collections import deque
+
+from frame_utils.stream_stats import StreamStats
+
+# world loop time the plugin may use per frame, 0: the camera frame period
+LOOP_BUDGET = 0.0  # [ms]
+# stride is lowered again once the work would stay this far below the budget
+BUDGET_HEADROOM = 0.8
+# the stride only stays raised while the last step saves this fraction of the work
+MIN_SAVING = 0.1
+# keeps a detection at least every ~0.5 s at 30 fps (tracks expire after 1 s)
+MAX_STRIDE = 15
+# EWMA weight of the newest world loop time, work time and frame period
+LOOP_SMOOTHING = 0.05
+# detections per second are measured over this many results
+RATE_WINDOW = 30
+
+
+def _smooth(average, value) -> float:
+    # EWMA, starting at the first value
+    if average == 0.0:
+        return value
+    return average + LOOP_SMOOTHING * (value - average)
+
+
+#    ___        __                                ____       _              _       _
+#   |_ _|_ __  / _| ___ _ __ ___ _ __   ___ ___  / ___|  ___| |__   ___  __| |_   _| | ___ _ __
+#    | || '_ \| |_ / _ \ '__/ _ \ '_ \ / __/ _ \ \___ \ / __| '_ \ / _ \/ _` | | | | |/ _ \ '__|
+#    | || | | |  _|  __/ | |  __/ | | | (_|  __/  ___) | (__| | | |  __/ (_| | |_| | |  __/ |
+#   |___|_| |_|_|  \___|_|  \___|_| |_|\___\___| |____/ \___|_| |_|\___|\__,_|\__,_|_|\___|_|
+class InferenceScheduler():
+    """
+    Decides on which frames inference runs, to keep the plugin's share of
+    the world loop within a time budget instead of dragging it down on
+    weaker machines.
+
+    The plugin reports the time it spent in each `recent_events` call
+    (`done`), so the wait for the next camera frame is not counted. Work on
+    frames that went to inference and on the others is averaged separately,
+    their difference is what inference costs the world loop (handing the
+    frame over, and the GIL while a thread worker runs).
+
+    Inference is submitted every `stride`-th frame. Whenever a result arrives
+    the stride is adapted: it goes up while the work is over `budget` (the
+    camera frame period if 0) and a higher stride would save a noticeable
+    part of it, so work that has nothing to do with inference never raises
+    it. It goes down again once the work would stay within the budget, but
+    never below what the end-to-end inference latency (p95) allows,
+    submitting faster than results come back only burns frames.
+    """
+    def __init__(self, budget=LOOP_BUDGET, max_stride=MAX_STRIDE):
+        self.budget = budget
+        self.max_stride = max_stride
+        self.latency_stats = StreamStats("inference")
+        self.reset()
+
+    def reset(self) -> None:
+        self.stride = 1
+        self.loop_time = 0.0  # [ms], moving average of the time between ticks
+        self.frame_period = 0.0  # [ms], moving average
+        self.work_time = 0.0  # [ms], moving average of the plugin's work per tick
+        self.base_time = 0.0  # [ms], the same on frames without inference
+        self.submit_time = 0.0  # [ms], and on frames that went to inference
+        self.latency_stats.reset()
+        self._frames = 0
+        self._last_tick = None
+        self._last_frame = None
+        self._results = deque(maxlen=RATE_WINDOW)
+
+    #    ____       _              _       _
+    #   / ___|  ___| |__   ___  __| |_   _| | ___
+    #   \___ \ / __| '_ \ / _ \/ _` | | | | |/ _ \
+    #    ___) | (__| | | |  __/ (_| | |_| | |  __/
+    #   |____/ \___|_| |_|\___|\__,_|\__,_|_|\___|
+    def tick(self, frame_index, timestamp) -> bool:
+        """
+        Call once per world frame (index and capture timestamp in seconds).
+        Returns True if this frame goes to inference.
+        """
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            elapsed = (now - self._last_tick) * 1000
+            self.loop_time = _smooth(self.loop_time, elapsed)
+            last_index, last_timestamp = self._last_frame
+            if frame_index > last_index:
+                steps = frame_index - last_index
+                period = (timestamp - last_timestamp) * 1000 / steps
+                self.frame_period = _smooth(self.frame_period, period)
+        self._last_tick = now
+        self._last_frame = frame_index, timestamp
+        self._frames += 1
+        if self._frames < self.stride:
+            return False
+        self._frames = 0
+        return True
+
+    def done(self, work, submitted) -> None:
+        """
+        Call at the end of every ticked world frame with the plugin's own work
+        time in ms and whether the frame went to inference.
+        """
+        self.work_time = _smooth(self.work_time, work)
+        if submitted:
+            self.submit_time = _smooth(self.submit_time, work)
+        else:
+            self.base_time = _smooth(self.base_time, work)
+
+    def record(self, frame_index, latency) -> None:
+        """
+        Record a finished inference, `latency` from frame capture to result in ms.
+        """
+        self.latency_stats.record(frame_index, latency)
+        self._results.append(time.perf_counter())
+        budget = self.loop_budget
+        if budget <= 0:
+            # frame rate not known yet
+            return
+        # the inference cost is spread over the frames in between, work at
+        # stride n is base + cost / n
+        cost = max(self.submit_time - self.base_time, 0.0)
+        stride = self.stride
+        if self.work_time > budget and cost / (stride * (stride + 1)) >= (
+            MIN_SAVING * self.work_time
+        ):
+            stride += 1
+        elif stride > 1 and (
+            self.base_time + cost / (stride - 1) < BUDGET_HEADROOM * budget
+            or cost / ((stride - 1) * stride) < MIN_SAVING * self.work_time
+        ):
+            stride -= 1
+        if self.loop_time > 0:
+            stride = max(stride, math.ceil(self.latency_p95 / self.loop_time))
+        self.stride = min(max(stride, 1), self.max_stride)
+
+    #    ____  _        _   _     _   _
+    #   / ___|| |_ __ _| |_(_)___| |_(_) ___ ___
+    #   \___ \| __/ _` | __| / __| __| |/ __/ __|
+    #    ___) | || (_| | |_| \__ \ |_| | (__\__ \
+    #   |____/ \__\__,_|\__|_|___/\__|_|\___|___/
+    @property
+    def loop_budget(self) -> float:
+        """
+        Work time budget in ms, the user set one or else one camera frame.
+        """
+        return self.budget if self.budget > 0 else self.frame_period
+
+    @property
+    def latency_p95(self) -> float:
+        p95 = self.latency_stats.latency_percentiles((95,))[0]
+        return 0.0 if math.isnan(p95) else p95
+
+    @property
+    def detection_rate(self) -> float:
+        """
+        Achieved detections per second.
+        """
+        if len(self._results) < 2:
+            return 0.0
+        return (len(self._results) - 1) / (self._results[-1] - self._results[0])
+
+    def summary(self) -> str:
+        """Stride, rate and latency in one line, for the menu."""
+        return (
+            "every {}. frame, {:.1f} Hz, p95 {:.0f} ms, work {:.1f}/{:.1f} ms"
+        ).format(
+            self.stride,
+            self.detection_rate,
+            self.latency_p95,
+            self.work_time,
+            self.loop_budget,
+        )
@@ -0,0 +1,152 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    tiles.py                                           :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 21:06:12 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 21:06:12 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import math
+import time
+
+import numpy as np
+
+from detection.backends import empty_detections, non_max_suppression
+from detection.roi import roi_to_frame
+
+TILE_SIZE = 640  # [px], square tiles
+TILE_OVERLAP = 0.2  # fraction of the tile size shared with the neighbour
+# duplicates of one object from overlapping tiles are (nearly) the same box
+TILE_IOU_THRESHOLD = 0.5
+# calls timed per mode (batched / per tile) before the faster one is picked
+BATCHING_PROBES = 3
+# afterwards the other mode is timed again every n-th call
+BATCHING_REPROBE = 100
+# EWMA weight of the newest time per crop
+BATCHING_SMOOTHING = 0.2
+
+
+#    _____ _ _
+#   |_   _(_) | ___  ___
+#     | | | | |/ _ \/ __|
+#     | | | | |  __/\__ \
+#     |_| |_|_|\___||___/
+def tile_windows(frame_size, tile_size=TILE_SIZE, overlap=TILE_OVERLAP) -> np.ndarray:
+    """
+    Return the (n, 4) x0, y0, x1, y1 windows of overlapping square tiles
+    covering a frame of `frame_size` (width, height). Tiles are spread evenly,
+    so the overlap is at least `overlap` (of the tile size).
+    """
+    starts = []
+    for length in frame_size:
+        size = min(int(tile_size), length)
+        stride = max(size * (1 - overlap), 1)
+        count = math.ceil((length - size) / stride) + 1
+        starts.append(np.linspace(0, length - size, count).round().astype(np.int64))
+    x0, y0 = np.meshgrid(*starts)
+    x0, y0 = x0.ravel(), y0.ravel()
+    width, height = (min(int(tile_size), length) for length in frame_size)
+    return np.stack((x0, y0, x0 + width, y0 + height), axis=1)
+
+
+#    ____        _       _     _
+#   | __ )  __ _| |_ ___| |__ (_)_ __   __ _
+#   |  _ \ / _` | __/ __| '_ \| | '_ \ / _` |
+#   | |_) | (_| | || (__| | | | | | | | (_| |
+#   |____/ \__,_|\__\___|_| |_|_|_| |_|\__, |
+#                                     |___/
+class TileBatching():
+    """
+    Decides per model whether the crops go through one `predict_batch` call
+    or one `predict` call each, by timing both.
+
+    A batch is not always cheaper: on a single CPU core one batch of 7 crops
+    took as long as 7 separate calls with OpenVINO and ONNX Runtime INT8 and
+    was 20% slower with ONNX Runtime FP32, the gain depends on the cores the
+    runtime can spread the batch over. Both modes are timed for
+    BATCHING_PROBES calls, then the faster one (per crop) is used, the other
+    one is timed again every BATCHING_REPROBE calls.
+    """
+    def __init__(self):
+        self.per_crop = {True: 0.0, False: 0.0}  # [ms], batched / per tile
+        self.probes = {True: 0, False: 0}
+        self.calls = 0
+
+    @property
+    def batched(self) -> bool:
+        """The currently faster mode."""
+        return self.per_crop[True] <= self.per_crop[False]
+
+    def choose(self) -> bool:
+        """
+        Return True if the next call goes through `predict_batch`.
+        """
+        self.calls += 1
+        for mode in (True, False):
+            if self.probes[mode] < BATCHING_PROBES:
+                return mode
+        if self.calls % BATCHING_REPROBE == 0:
+            return not self.batched
+        return self.batched
+
+    def record(self, batched, elapsed, crops) -> None:
+        """
+        Record one call of `crops` crops that took `elapsed` ms.
+        """
+        per_crop = elapsed / max(crops, 1)
+        if self.probes[batched] == 0:
+            self.per_crop[batched] = per_crop
+        else:
+            self.per_crop[batched] += BATCHING_SMOOTHING * (
+                per_crop - self.per_crop[batched]
+            )
+        self.probes[batched] += 1
+
+
+#    _____ _ _          _
+#   |_   _(_) | ___  __| |
+#     | | | | |/ _ \/ _` |
+#     | | | | |  __/ (_| |
+#     |_| |_|_|\___|\__,_|
+def predict_tiled(
+    model,
+    image,
+    tile_size=TILE_SIZE,
+    overlap=TILE_OVERLAP,
+    full_frame=True,
+    batching=None,
+) -> tuple:
+    """
+    Detect on overlapping tiles of `image` (plus the whole image for objects
+    larger than a tile, if `full_frame`) and merge the detections with one
+    global NMS. Returns compact (xyxy, conf, cls) arrays in image pixels.
+
+    The crops go through one `predict_batch` call, or through the faster of
+    batched and per tile calls if a `TileBatching` is given.
+    """
+    height, width = image.shape[:2]
+    windows = tile_windows((width, height), tile_size, overlap)
+    crops = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in windows.tolist()]
+    if full_frame and len(windows) > 1:
+        crops.append(image)
+        windows = np.concatenate((windows, [[0, 0, width, height]]))
+
+    batched = True if batching is None else batching.choose()
+    t0 = time.perf_counter()
+    if batched:
+        detections = model.predict_batch(crops)
+    else:
+        detections = [model.predict(crop) for crop in crops]
+    if batching is not None:
+        batching.record(batched, (time.perf_counter() - t0) * 1000, len(crops))
+    for (xyxy, _, _), window in zip(detections, windows.tolist()):
+        roi_to_frame(xyxy, window)
+    xyxy, conf, cls = (np.concatenate(column) for column in zip(*detections))
+    if len(conf) == 0:
+        return empty_detections()
+    keep = non_max_suppression(xyxy, conf, cls, TILE_IOU_THRESHOLD)
+    return xyxy[keep], conf[keep], cls[keep]
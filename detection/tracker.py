@@ -0,0 +1,215 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    tracker.py                                         :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 19:34:18 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 19:34:18 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import numpy as np
+
+# detections need this overlap with a track's predicted box to continue it
+IOU_THRESHOLD = 0.3
+# tracks without a matching detection for this long are dropped
+MAX_AGE = 1.0  # [s]
+# tracks are only shown after this many matched detections
+MIN_HITS = 2
+# and only while they missed at most this many of the latest inference results
+MAX_MISSES = 1
+# alpha-beta filter gains (position, velocity)
+ALPHA = 0.6
+BETA = 0.2
+
+
+def _xyxy_to_cxcywh(xyxy) -> np.ndarray:
+    wh = xyxy[:, 2:] - xyxy[:, :2]
+    return np.concatenate((xyxy[:, :2] + wh / 2, wh), axis=1)
+
+
+def _cxcywh_to_xyxy(cxcywh) -> np.ndarray:
+    half = np.maximum(cxcywh[:, 2:], 0) / 2
+    return np.concatenate((cxcywh[:, :2] - half, cxcywh[:, :2] + half), axis=1)
+
+
+def iou_matrix(a, b) -> np.ndarray:
+    """
+    Pairwise IoU of (n, 4) and (m, 4) xyxy boxes as an (n, m) matrix.
+    """
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    overlap = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - overlap
+    return overlap / np.maximum(union, 1e-9)
+
+
+def greedy_match(iou, threshold) -> tuple:
+    """
+    Match rows to columns, highest IoU first. Returns the matched (rows, cols).
+    """
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    row_used = np.zeros(iou.shape[0], dtype=bool)
+    col_used = np.zeros(iou.shape[1], dtype=bool)
+    matched_rows, matched_cols = [], []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if row_used[r] or col_used[c]:
+            continue
+        row_used[r] = col_used[c] = True
+        matched_rows.append(r)
+        matched_cols.append(c)
+    return (
+        np.array(matched_rows, dtype=np.int64),
+        np.array(matched_cols, dtype=np.int64),
+    )
+
+
+#    _____               _
+#   |_   _| __ __ _  ___| | _____ _ __
+#     | || '__/ _` |/ __| |/ / _ \ '__|
+#     | || | | (_| | (__|   <  __/ |
+#     |_||_|  \__,_|\___|_|\_\___|_|
+class Tracker():
+    """
+    Lightweight multi-object tracker that carries detections from the
+    (slow) inference frames over to every camera frame.
+
+    All tracks live in a few numpy arrays. Each one is a box (center, size)
+    with a constant velocity model, corrected by an alpha-beta filter (a
+    Kalman filter with fixed gains) whenever a detection of the same class
+    overlaps its prediction. Association is one batched IoU matrix plus a
+    greedy match. Every track keeps its id for as long as it lives.
+
+    Only confirmed tracks (MIN_HITS matches) that were matched by one of the
+    latest inference results are returned by predict. Tracks that lost their
+    object stay internal until MAX_AGE, so the object can be picked up again
+    under the same id, but they are not drawn as ghost boxes.
+
+    Detections are fed with the timestamp of the frame they were computed
+    on and tracks are predicted to the timestamp of the frame being shown,
+    which also hides the inference latency.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(
+        self,
+        iou_threshold=IOU_THRESHOLD,
+        max_age=MAX_AGE,
+        min_hits=MIN_HITS,
+        max_misses=MAX_MISSES,
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self._next_id = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop all tracks (e.g. when the model and with it the classes change).
+        """
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4))  # cx, cy, w, h
+        self.velocity = np.zeros((0, 4))  # per second
+        self.timestamps = np.zeros(0)  # of the last matched detection
+        self.conf = np.zeros(0, dtype=np.float32)
+        self.cls = np.zeros(0, dtype=np.int32)
+        self.hits = np.zeros(0, dtype=np.int32)  # matched detections
+        self.misses = np.zeros(0, dtype=np.int32)  # updates since the last match
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    #    _   _           _       _
+    #   | | | |_ __   __| | __ _| |_ ___
+    #   | | | | '_ \ / _` |/ _` | __/ _ \
+    #   | |_| | |_) | (_| | (_| | ||  __/
+    #    \___/| .__/ \__,_|\__,_|\__\___|
+    #         |_|
+    def update(self, xyxy, conf, cls, timestamp) -> None:
+        """
+        Correct the tracks with the detections of the frame at `timestamp`,
+        start tracks for unmatched detections and drop outdated tracks.
+        """
+        measured = _xyxy_to_cxcywh(np.asarray(xyxy, dtype=np.float64))
+        dt = timestamp - self.timestamps
+        predicted = self.boxes + self.velocity * dt[:, None]
+
+        iou = iou_matrix(_cxcywh_to_xyxy(predicted), _cxcywh_to_xyxy(measured))
+        iou[self.cls[:, None] != cls[None, :]] = 0
+        tracks, detections = greedy_match(iou, self.iou_threshold)
+
+        # alpha-beta correction of the matched tracks
+        residual = measured[detections] - predicted[tracks]
+        self.boxes[tracks] = predicted[tracks] + ALPHA * residual
+        self.velocity[tracks] += (
+            BETA * residual / np.maximum(dt[tracks], 1e-3)[:, None]
+        )
+        self.timestamps[tracks] = timestamp
+        self.conf[tracks] = conf[detections]
+        self.misses += 1
+        self.misses[tracks] = 0
+        self.hits[tracks] += 1
+
+        # new tracks, at rest
+        new = np.ones(len(measured), dtype=bool)
+        new[detections] = False
+        count = int(new.sum())
+        self.ids = np.concatenate(
+            (self.ids, np.arange(self._next_id, self._next_id + count))
+        )
+        self._next_id += count
+        self.boxes = np.concatenate((self.boxes, measured[new]))
+        self.velocity = np.concatenate((self.velocity, np.zeros((count, 4))))
+        self.timestamps = np.concatenate((self.timestamps, np.full(count, timestamp)))
+        self.conf = np.concatenate((self.conf, conf[new].astype(np.float32)))
+        self.cls = np.concatenate((self.cls, cls[new].astype(np.int32)))
+        self.hits = np.concatenate((self.hits, np.ones(count, dtype=np.int32)))
+        self.misses = np.concatenate((self.misses, np.zeros(count, dtype=np.int32)))
+
+        self._drop(timestamp - self.timestamps <= self.max_age)
+
+    #    ____               _ _      _
+    #   |  _ \ _ __ ___  __| (_) ___| |_
+    #   | |_) | '__/ _ \/ _` | |/ __| __|
+    #   |  __/| | |  __/ (_| | | (__| |_
+    #   |_|   |_|  \___|\__,_|_|\___|\__|
+    def predict(self, timestamp) -> tuple:
+        """
+        Return (ids, xyxy, conf, cls) of the confirmed tracks matched by the
+        latest inference results, extrapolated to `timestamp` (does not modify
+        the tracks).
+        """
+        dt = timestamp - self.timestamps
+        alive = (
+            (dt <= self.max_age)
+            & (self.hits >= self.min_hits)
+            & (self.misses <= self.max_misses)
+        )
+        boxes = self.boxes[alive] + self.velocity[alive] * dt[alive, None]
+        return (
+            self.ids[alive],
+            _cxcywh_to_xyxy(boxes).astype(np.float32),
+            self.conf[alive],
+            self.cls[alive],
+        )
+
+    def _drop(self, keep) -> None:
+        self.ids = self.ids[keep]
+        self.boxes = self.boxes[keep]
+        self.velocity = self.velocity[keep]
+        self.timestamps = self.timestamps[keep]
+        self.conf = self.conf[keep]
+        self.cls = self.cls[keep]
+        self.hits = self.hits[keep]
+        self.misses = self.misses[keep]
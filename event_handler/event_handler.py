@@ -55,6 +55,26 @@ class EventHandler():
         self.depth_frame_size = depth_frame.img.shape[:-1][::-1]
         return depth_frame.img                                                                          
 
+    def get_point_cloud(self, events, voxel_size=0.0) -> np.array:
+        """
+        Return the point cloud (n x 3, float32, meters) of the depth frame.
+        Only applicable if the depth source knows its intrinsics
+        (e.g. Realsense2_Source). voxel_size > 0 averages the points per voxel.
+        """
+        depth_frame = events.get("depth_frame")
+        if not depth_frame or not hasattr(depth_frame, "point_cloud"):
+            return
+        return depth_frame.point_cloud(voxel_size)
+
+    def get_depth_timestamp(self, events) -> float:
+        """
+        Return the capture time (pupil time) of the depth frame.
+        """
+        depth_frame = events.get("depth_frame")
+        if not depth_frame:
+            return
+        return depth_frame.timestamp
+
     def get_highest_conf_gaze(self, events) -> np.array:
         """
         Return the gaze data with highest confidence.
@@ -85,24 +105,50 @@ class EventHandler():
 
         return gaze
 
-    def get_imu(self, events) -> np.array:
+    def get_gazed_objects(self, events) -> list:
+        """
+        Return the detected objects the gaze fell on during the tick (see
+        Object_Detection.detect_gazed_objects), most gaze samples first.
+        """
+        return events.get("gazed_objects")
+
+    def get_gaze_points(self, events, min_confidence=0.0) -> tuple:
         """
-        Return the data from the IMU. 
+        Return all gaze samples of the tick with at least `min_confidence` as
+        arrays: denormalized positions (n x 2, frame pixels), confidences and
+        timestamps, sorted by timestamp.
         For information on the events data type contact pupillabs ...
-        TODO: figure out how to get IMU data ... officially not supported
-                by PupilLabs lads.
+        """
+        gaze = events.get("gaze")
+        if not gaze or self.frame_size is None:
+            return
+        norm_pos = np.array([g["norm_pos"] for g in gaze], dtype=np.float64)
+        confidence = np.array([g["confidence"] for g in gaze], dtype=np.float64)
+        timestamps = np.array([g["timestamp"] for g in gaze], dtype=np.float64)
+        keep = confidence >= min_confidence
+        order = np.argsort(timestamps[keep], kind="stable")
+        # same as methods.denormalize(..., flip_y=True), for all samples at once
+        points = norm_pos.reshape(-1, 2)[keep][order] * self.frame_size
+        points[:, 1] = self.frame_size[1] - points[:, 1]
+        return points, confidence[keep][order], timestamps[keep][order]
+
+    def get_imu(self, events) -> np.array:
+        """
+        Return the IMU samples that arrived since the last world frame.
+        Only applicable if a capture source with IMU support (e.g.
+        Realsense2_Source) sends data on the "imu" event channel.
+        The samples are a structured array (see frame_utils.imu.IMU_DTYPE):
+        timestamp (pupil time), kind (accel/gyro) and xyz.
         """
         imu = events.get("imu")
-        if not imu:
-            print("No imu data available.")
+        if imu is None or not len(imu):
             return
-        print(imu)
         return imu
     
     def get_objects(self, events) -> np.array:
         """
-        Return the detected objects in the scene.
-        For information on the events data type contact pupillabs ...
+        Return the detected objects in the scene as a DetectionBatch
+        (see detection/batch.py, iterating it yields one dict per object).
         """
         objects = events.get("objects")
         if not objects:
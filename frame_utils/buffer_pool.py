@@ -0,0 +1,84 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    buffer_pool.py                                     :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 11:03:27 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 11:03:27 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import sys
+import threading
+
+import numpy as np
+
+
+#    ____         __  __             ____             _
+#   | __ ) _   _ / _|/ _| ___ _ __  |  _ \ ___   ___ | |
+#   |  _ \| | | | |_| |_ / _ \ '__| | |_) / _ \ / _ \| |
+#   | |_) | |_| |  _|  _|  __/ |    |  __/ (_) | (_) | |
+#   |____/ \__,_|_| |_|  \___|_|    |_|   \___/ \___/|_|
+class BufferPool():
+    """
+    Pool of reusable numpy buffers keyed by (shape, dtype).
+
+    Frame wrappers acquire their scratch buffers here and hand them back once
+    they are garbage collected. This keeps per frame allocations (several MB/s
+    at 1280x720@30) off the allocator and the GC on the world thread.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, max_free=4):
+        # number of idle buffers kept per key
+        self.max_free = max_free
+        self._free = {}
+        self._lock = threading.Lock()
+
+    #       _                   _               __  ____      _
+    #      / \   ___ __ _ _   _(_)_ __ ___     / / |  _ \ ___| | ___  __ _ ___  ___
+    #     / _ \ / __/ _` | | | | | '__/ _ \   / /  | |_) / _ \ |/ _ \/ _` / __|/ _ \
+    #    / ___ \ (_| (_| | |_| | | | |  __/  / /   |  _ <  __/ |  __/ (_| \__ \  __/
+    #   /_/   \_\___\__, |\__,_|_|_|  \___| /_/    |_| \_\___|_|\___|\__,_|___/\___|
+    #                  |_|
+    def acquire(self, shape, dtype=np.uint8) -> np.ndarray:
+        """
+        Return an uninitialized buffer of the requested shape and dtype.
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                return free.pop()
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer: np.ndarray) -> None:
+        """
+        Hand a buffer back to the pool.
+
+        Buffers that are still referenced somewhere else (e.g. a view that was
+        handed out to a plugin) are left to the GC, so reusing them can never
+        overwrite data somebody still looks at.
+        """
+        # references: caller, argument and getrefcount itself
+        if buffer.base is not None or sys.getrefcount(buffer) > 3:
+            return
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_free:
+                free.append(buffer)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._free.clear()
+
+
+# shared by all frame wrappers
+frame_buffer_pool = BufferPool()
@@ -0,0 +1,161 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    depth_alignment.py                                 :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 15:26:40 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 15:26:40 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import collections
+
+import cv2
+import numpy as np
+
+# pinhole model of one stream, distortion is ignored
+# (D4xx depth streams are undistorted, the color distortion is negligible here)
+Intrinsics = collections.namedtuple(
+    "Intrinsics", ["width", "height", "fx", "fy", "ppx", "ppy"]
+)
+
+
+def scale_intrinsics(intrinsics: Intrinsics, width, height) -> Intrinsics:
+    """
+    Return the intrinsics of the same stream resampled to (width, height),
+    e.g. after a decimation filter.
+    """
+    sx = width / intrinsics.width
+    sy = height / intrinsics.height
+    return Intrinsics(
+        width,
+        height,
+        intrinsics.fx * sx,
+        intrinsics.fy * sy,
+        (intrinsics.ppx + 0.5) * sx - 0.5,
+        (intrinsics.ppy + 0.5) * sy - 0.5,
+    )
+
+
+#    ____             _   _          _    _ _
+#   |  _ \  ___ _ __ | |_| |__      / \  | (_) __ _ _ __   ___ _ __
+#   | | | |/ _ \ '_ \| __| '_ \    / _ \ | | |/ _` | '_ \ / _ \ '__|
+#   | |_| |  __/ |_) | |_| | | |  / ___ \| | | (_| | | | |  __/ |
+#   |____/ \___| .__/ \__|_| |_| /_/   \_\_|_|\__, |_| |_|\___|_|
+#              |_|                            |___/
+class DepthAligner():
+    """
+    Registers z16 depth images to the color camera, i.e. produces a depth
+    image with the color stream's resolution and geometry.
+
+    Everything that only depends on the stream geometry (the per-pixel viewing
+    rays of the depth camera, rotated into the color camera frame) is computed
+    once in the constructor. Aligning a frame is then a handful of vectorized
+    multiply-adds, a projection and one z-buffered scatter:
+
+        p_color = z * (R @ ray) + t  ->  (u, v) = project(p_color)
+
+    The scatter targets a grid with about one cell per depth pixel, which is
+    then upscaled (nearest neighbour) to the color resolution. That way the
+    sparser depth image leaves no holes in the denser color geometry.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(
+        self,
+        depth_intrinsics: Intrinsics,
+        color_intrinsics: Intrinsics,
+        rotation,
+        translation,
+        depth_scale,
+    ):
+        self.depth_intrinsics = depth_intrinsics
+        self.color_intrinsics = color_intrinsics
+
+        d = depth_intrinsics
+        u, v = np.meshgrid(
+            np.arange(d.width, dtype=np.float32), np.arange(d.height, dtype=np.float32)
+        )
+        rays = np.stack(
+            [(u - d.ppx) / d.fx, (v - d.ppy) / d.fy, np.ones_like(u)], axis=-1
+        )
+        # librealsense extrinsics are column major
+        rotation = np.asarray(rotation, dtype=np.float32).reshape(3, 3).T
+        rotated = rays @ rotation.T
+        # translation in depth units, so z16 values can be used directly
+        t = np.asarray(translation, dtype=np.float32) / depth_scale
+
+        # scatter grid: color geometry at (about) depth resolution
+        c = color_intrinsics
+        scale = max(c.fx / d.fx, c.fy / d.fy, 1.0)
+        self._grid_size = (
+            int(np.ceil(c.width / scale)),
+            int(np.ceil(c.height / scale)),
+        )
+        g = scale_intrinsics(c, *self._grid_size)
+
+        # fold the grid projection into the maps:
+        #   u = (z * a_u + b_u) / (z * a_z + b_z)
+        rx, ry, rz = rotated[..., 0], rotated[..., 1], rotated[..., 2]
+        self._a_u = np.ascontiguousarray(g.fx * rx + g.ppx * rz)
+        self._a_v = np.ascontiguousarray(g.fy * ry + g.ppy * rz)
+        self._a_z = np.ascontiguousarray(rz)
+        self._b_u = np.float32(g.fx * t[0] + g.ppx * t[2])
+        self._b_v = np.float32(g.fy * t[1] + g.ppy * t[2])
+        self._b_z = np.float32(t[2])
+
+    @property
+    def shape(self) -> tuple:
+        """
+        Depth image shape this aligner was built for.
+        """
+        return self.depth_intrinsics.height, self.depth_intrinsics.width
+
+    #       _    _ _
+    #      / \  | (_) __ _ _ __
+    #     / _ \ | | |/ _` | '_ \
+    #    / ___ \| | | (_| | | | |
+    #   /_/   \_\_|_|\__, |_| |_|
+    #                |___/
+    def align(self, depth: np.ndarray, out=None) -> np.ndarray:
+        """
+        Return `depth` registered to the color image (uint16, zeros where no
+        depth is known). Pass `out` to reuse a (color h, color w) uint16 buffer.
+        """
+        c = self.color_intrinsics
+        if out is None:
+            out = np.empty((c.height, c.width), dtype=np.uint16)
+
+        # temporaries are per call, so one aligner can serve several threads
+        z = depth.astype(np.float32)
+        den = z * self._a_z
+        den += self._b_z
+        u = z * self._a_u
+        u += self._b_u
+        v = z * self._a_v
+        v += self._b_v
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u /= den
+            v /= den
+
+        grid_w, grid_h = self._grid_size
+        valid = (depth > 0) & (den > 0) & (u >= 0) & (v >= 0)
+        valid &= (u < grid_w) & (v < grid_h)
+        # truncation == floor, all remaining coordinates are positive
+        index = v[valid].astype(np.intp) * grid_w + u[valid].astype(np.intp)
+
+        # z-buffer: the closest depth wins where several pixels collide.
+        # minimum.at beats sorting (argsort / lexsort / unique) on every numpy
+        # measured, including the slow unbuffered ufunc.at of numpy < 1.25
+        empty = np.iinfo(np.uint16).max
+        grid = np.full(self._grid_size[::-1], empty, dtype=np.uint16)
+        np.minimum.at(grid.reshape(-1), index, depth[valid])
+        grid[grid == empty] = 0
+        cv2.resize(grid, (c.width, c.height), dst=out, interpolation=cv2.INTER_NEAREST)
+        return out
@@ -0,0 +1,107 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    depth_colormap.py                                  :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 11:41:09 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 11:41:09 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import functools
+
+import cv2
+import numpy as np
+
+# z16 -> 8 bit scaling used before the lookup table existed
+# (cv2.convertScaleAbs(depth, alpha=0.03) saturates at 255 / 0.03 = 8500)
+DEFAULT_DEPTH_NEAR = 0
+DEFAULT_DEPTH_FAR = 8500
+DEFAULT_DEPTH_COLORMAP = cv2.COLORMAP_JET
+# above this size cv2 is faster than the table gather (~640x480, measured)
+LUT_MAX_PIXELS = 640 * 480
+
+
+#    _                _                  _____     _     _
+#   | |    ___   ___ | | ___   _ _ __   |_   _|_ _| |__ | | ___
+#   | |   / _ \ / _ \| |/ / | | | '_ \    | |/ _` | '_ \| |/ _ \
+#   | |__| (_) | (_) |   <| |_| | |_) |   | | (_| | |_) | |  __/
+#   |_____\___/ \___/|_|\_\\__,_| .__/    |_|\__,_|_.__/|_|\___|
+#                               |_|
+class DepthColormap():
+    """
+    A (near, far, colormap) setting with its z16 lookup table. Small frames
+    are colorized by gathering from the table, large ones by cv2 (scale to
+    8 bit + applyColorMap), whichever is faster (see
+    benchmarks/bench_depth_colorization.py). Both give identical pixels.
+    """
+
+    def __init__(self, near, far, colormap, table):
+        self.near = near
+        self.far = far
+        self.colormap = colormap
+        # BGRA pixels packed into uint32, 65536 entries (256 KiB)
+        self.table = table
+
+
+@functools.lru_cache(maxsize=8)
+def depth_colormap_lut(
+    near=DEFAULT_DEPTH_NEAR, far=DEFAULT_DEPTH_FAR, colormap=DEFAULT_DEPTH_COLORMAP
+) -> DepthColormap:
+    """
+    Return the colormap mapping every z16 value to a color. Values below
+    `near` get the first, values above `far` the last color of the colormap.
+    Built once per (near, far, colormap) setting.
+
+    Each table entry is a BGRA pixel packed into one uint32, so the whole
+    table stays in cache and the gather moves one word per pixel.
+    """
+    near = int(near)
+    far = max(int(far), near + 1)
+    values = np.arange(65536, dtype=np.float32)
+    scaled = (values - near) * (255.0 / (far - near))
+    scaled = np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+    bgr = cv2.applyColorMap(scaled.reshape(-1, 1), colormap).reshape(65536, 3)
+    table = np.zeros((65536, 4), dtype=np.uint8)
+    table[:, :3] = bgr
+    table = table.view(np.uint32).ravel()
+    table.setflags(write=False)
+    return DepthColormap(near, far, colormap, table)
+
+
+#     ____      _            _
+#    / ___|___ | | ___  _ __(_)_______
+#   | |   / _ \| |/ _ \| '__| |_  / _ \
+#   | |__| (_) | | (_) | |  | |/ /  __/
+#    \____\___/|_|\___/|_|  |_/___\___|
+def colorize_depth(
+    depth: np.ndarray, lut: DepthColormap, out=None, scratch=None
+) -> np.ndarray:
+    """
+    Colorize a z16 depth image with a colormap from `depth_colormap_lut`.
+
+    `out` is an optional (h, w, 3) uint8 result buffer, `scratch` an optional
+    (h, w) uint32 buffer for intermediate results. Pass pooled buffers to
+    avoid any allocation per frame.
+    """
+    if out is None:
+        out = np.empty(depth.shape + (3,), dtype=np.uint8)
+    if scratch is None:
+        scratch = np.empty(depth.shape, dtype=np.uint32)
+    if depth.size > LUT_MAX_PIXELS:
+        # the random gather falls behind cv2's streaming passes on large frames
+        pixels = depth.size
+        scaled = scratch.view(np.uint8).reshape(-1)[:pixels].reshape(depth.shape)
+        if lut.near > 0:
+            # saturating, convertScaleAbs would mirror values below near
+            shifted = scratch.view(np.uint16).reshape(-1)[pixels:].reshape(depth.shape)
+            depth = cv2.subtract(depth, lut.near, dst=shifted)
+        cv2.convertScaleAbs(depth, dst=scaled, alpha=255.0 / (lut.far - lut.near))
+        return cv2.applyColorMap(scaled, lut.colormap, dst=out)
+    # indices are uint16, so they can never be out of bounds -> skip the checks
+    np.take(lut.table, depth, out=scratch, mode="clip")
+    bgra = scratch.view(np.uint8).reshape(depth.shape + (4,))
+    cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+    return out
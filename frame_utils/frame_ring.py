@@ -0,0 +1,88 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    frame_ring.py                                      :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 10:12:41 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 10:12:41 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import collections
+import threading
+
+
+#    _____                           ____  _
+#   |  ___| __ __ _ _ __ ___   ___  |  _ \(_)_ __   __ _
+#   | |_ | '__/ _` | '_ ` _ \ / _ \ | |_) | | '_ \ / _` |
+#   |  _|| | | (_| | | | | | |  __/ |  _ <| | | | | (_| |
+#   |_|  |_|  \__,_|_| |_| |_|\___| |_| \_\_|_| |_|\__, |
+#                                                  |___/
+class FrameRing():
+    """
+    Small thread safe ring buffer between a producer thread (e.g. a camera
+    capture loop) and the Pupil world loop.
+
+    The producer pushes items as fast as they arrive, the consumer only ever
+    picks up the newest one. Every item that is replaced by a newer one before
+    the consumer got to it is counted in `overwritten`.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, size=3):
+        self.size = size
+        self._slots = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+        # statistics
+        self.pushed = 0
+        self.overwritten = 0
+
+    #    ____                _
+    #   |  _ \ _ __ ___   __| |_   _  ___ ___ _ __
+    #   | |_) | '__/ _ \ / _` | | | |/ __/ _ \ '__|
+    #   |  __/| | | (_) | (_| | |_| | (_|  __/ |
+    #   |_|   |_|  \___/ \__,_|\__,_|\___\___|_|
+    def push(self, item) -> None:
+        """
+        Add an item. If the ring is full the oldest item is dropped.
+        """
+        with self._lock:
+            if len(self._slots) == self.size:
+                self.overwritten += 1
+            self._slots.append(item)
+            self.pushed += 1
+
+    #     ____
+    #    / ___|___  _ __  ___ _   _ _ __ ___   ___ _ __
+    #   | |   / _ \| '_ \/ __| | | | '_ ` _ \ / _ \ '__|
+    #   | |__| (_) | | | \__ \ |_| | | | | | |  __/ |
+    #    \____\___/|_| |_|___/\__,_|_| |_| |_|\___|_|
+    def pop_latest(self) -> any:
+        """
+        Return the newest item (or None if nothing new arrived) without
+        blocking. Older items that were never picked up are discarded.
+        """
+        with self._lock:
+            if not self._slots:
+                return None
+            item = self._slots.pop()
+            self.overwritten += len(self._slots)
+            self._slots.clear()
+            return item
+
+    def clear(self) -> None:
+        """
+        Drop all pending items (e.g. when the pipeline is restarted).
+        """
+        with self._lock:
+            self._slots.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
@@ -0,0 +1,169 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    imu.py                                             :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 17:02:26 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 17:02:26 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import threading
+
+import numpy as np
+
+# sample kinds, the IMU streams of a D435i/D455 arrive separately
+IMU_ACCEL = 0
+IMU_GYRO = 1
+
+# one motion sample: Pupil time, kind and x/y/z
+# (accel in m/s^2, gyro in rad/s, camera axes: x right, y down, z forward)
+IMU_DTYPE = np.dtype(
+    [("timestamp", np.float64), ("kind", np.uint8), ("xyz", np.float32, 3)]
+)
+
+
+#    ___ __  __ _   _   ____  _
+#   |_ _|  \/  | | | | |  _ \(_)_ __   __ _
+#    | || |\/| | | | | | |_) | | '_ \ / _` |
+#    | || |  | | |_| | |  _ <| | | | | (_| |
+#   |___|_|  |_|\___/  |_| \_\_|_| |_|\__, |
+#                                     |___/
+class ImuRing():
+    """
+    Preallocated, thread safe ring of IMU samples.
+
+    A sensor callback pushes single samples at their native rate (200-400 Hz),
+    the world loop drains everything that arrived since the last tick as one
+    structured array (IMU_DTYPE). If the consumer falls behind by more than
+    `capacity` samples the oldest ones are lost and counted in `overwritten`.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, capacity=4096):
+        self._samples = np.zeros(capacity, dtype=IMU_DTYPE)
+        self._lock = threading.Lock()
+        self._head = 0  # total number of pushed samples
+        self._tail = 0  # total number of drained samples
+        # statistics
+        self.overwritten = 0
+
+    #    ____                _
+    #   |  _ \ _ __ ___   __| |_   _  ___ ___ _ __
+    #   | |_) | '__/ _ \ / _` | | | |/ __/ _ \ '__|
+    #   |  __/| | | (_) | (_| | |_| | (_|  __/ |
+    #   |_|   |_|  \___/ \__,_|\__,_|\___\___|_|
+    def push(self, timestamp, kind, x, y, z) -> None:
+        with self._lock:
+            sample = self._samples[self._head % len(self._samples)]
+            sample["timestamp"] = timestamp
+            sample["kind"] = kind
+            sample["xyz"] = (x, y, z)
+            self._head += 1
+
+    #     ____
+    #    / ___|___  _ __  ___ _   _ _ __ ___   ___ _ __
+    #   | |   / _ \| '_ \/ __| | | | '_ ` _ \ / _ \ '__|
+    #   | |__| (_) | | | \__ \ |_| | | | | | |  __/ |
+    #    \____\___/|_| |_|___/\__,_|_| |_| |_|\___|_|
+    def drain(self) -> np.ndarray:
+        """
+        Return all samples pushed since the last call (oldest first) as a new
+        array, possibly empty. Never blocks on the producer for long.
+        """
+        with self._lock:
+            capacity = len(self._samples)
+            if self._head - self._tail > capacity:
+                self.overwritten += self._head - self._tail - capacity
+                self._tail = self._head - capacity
+            start = self._tail % capacity
+            count = self._head - self._tail
+            self._tail = self._head
+            if start + count <= capacity:
+                return self._samples[start : start + count].copy()
+            return np.concatenate(
+                (self._samples[start:], self._samples[: start + count - capacity])
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tail = self._head
+
+    def __len__(self) -> int:
+        with self._lock:
+            return min(self._head - self._tail, len(self._samples))
+
+
+#    ____              _   _          _   _        ___ __  __ _   _
+#   / ___| _   _ _ __ | |_| |__   ___| |_(_) ___  |_ _|  \/  | | | |
+#   \___ \| | | | '_ \| __| '_ \ / _ \ __| |/ __|  | || |\/| | | | |
+#    ___) | |_| | | | | |_| | | |  __/ |_| | (__   | || |  | | |_| |
+#   |____/ \__, |_| |_|\__|_| |_|\___|\__|_|\___| |___|_|  |_|\___/
+#          |___/
+class SyntheticImu():
+    """
+    Fills an ImuRing with generated samples at realistic rates, for testing
+    the IMU path (events, ROS publishing) without a camera.
+
+    The simulated camera sways slowly around its x axis: gravity rotates
+    accordingly in the accel samples, the gyro reports the matching rate.
+    Both get white noise.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, ring, get_timestamp, accel_rate=250, gyro_rate=400, noise=0.01):
+        self.ring = ring
+        self.get_timestamp = get_timestamp
+        self.accel_rate = accel_rate
+        self.gyro_rate = gyro_rate
+        self.noise = noise
+        self._rng = np.random.default_rng()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="Synthetic IMU", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+
+    #     ____                           _
+    #    / ___| ___ _ __   ___ _ __ __ _| |_ ___  _ __
+    #   | |  _ / _ \ '_ \ / _ \ '__/ _` | __/ _ \| '__|
+    #   | |_| |  __/ | | |  __/ | | (_| | || (_) | |
+    #    \____|\___|_| |_|\___|_|  \__,_|\__\___/|_|
+    def _run(self) -> None:
+        start = self.get_timestamp()
+        next_accel = next_gyro = start
+        while not self._stop_event.is_set():
+            now = self.get_timestamp()
+            while next_accel <= now:
+                self._push(next_accel - start, next_accel, IMU_ACCEL)
+                next_accel += 1.0 / self.accel_rate
+            while next_gyro <= now:
+                self._push(next_gyro - start, next_gyro, IMU_GYRO)
+                next_gyro += 1.0 / self.gyro_rate
+            self._stop_event.wait(max(min(next_accel, next_gyro) - now, 0.0))
+
+    def _push(self, t, timestamp, kind) -> None:
+        # +-0.3 rad sway around the x axis with a period of 4 s
+        omega = 2 * np.pi / 4.0
+        angle = 0.3 * np.sin(omega * t)
+        if kind == IMU_ACCEL:
+            # gravity in camera coordinates (y points down)
+            x, y, z = 0.0, 9.81 * np.cos(angle), -9.81 * np.sin(angle)
+        else:
+            x, y, z = 0.3 * omega * np.cos(omega * t), 0.0, 0.0
+        x, y, z = np.array((x, y, z)) + self._rng.normal(0, self.noise, 3)
+        self.ring.push(timestamp, kind, x, y, z)
@@ -0,0 +1,82 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    point_cloud.py                                     :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 16:05:12 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 16:05:12 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import functools
+
+import numpy as np
+
+from frame_utils.depth_alignment import Intrinsics
+
+
+#    ____               _____     _     _
+#   |  _ \ __ _ _   _  |_   _|_ _| |__ | | ___
+#   | |_) / _` | | | |   | |/ _` | '_ \| |/ _ \
+#   |  _ < (_| | |_| |   | | (_| | |_) | |  __/
+#   |_| \_\__,_|\__, |   |_|\__,_|_.__/|_|\___|
+#               |___/
+@functools.lru_cache(maxsize=8)
+def depth_ray_table(intrinsics: Intrinsics, depth_scale) -> np.ndarray:
+    """
+    Return a read only (h, w, 3) float32 table with the viewing ray of every
+    depth pixel, scaled such that multiplying it with the raw z16 value gives
+    the point in meters (depth camera frame, x right, y down, z forward).
+    Built once per (intrinsics, depth_scale) setting.
+    """
+    u = np.arange(intrinsics.width, dtype=np.float32)
+    v = np.arange(intrinsics.height, dtype=np.float32)
+    rays = np.empty((intrinsics.height, intrinsics.width, 3), dtype=np.float32)
+    rays[:, :, 0] = ((u - intrinsics.ppx) * (depth_scale / intrinsics.fx))[None, :]
+    rays[:, :, 1] = ((v - intrinsics.ppy) * (depth_scale / intrinsics.fy))[:, None]
+    rays[:, :, 2] = depth_scale
+    rays.setflags(write=False)
+    return rays
+
+
+#    ____       _       _      ____ _                 _
+#   |  _ \ ___ (_)_ __ | |_   / ___| | ___  _   _  __| |
+#   | |_) / _ \| | '_ \| __| | |   | |/ _ \| | | |/ _` |
+#   |  __/ (_) | | | | | |_  | |___| | (_) | |_| | (_| |
+#   |_|   \___/|_|_| |_|\__|  \____|_|\___/ \__,_|\__,_|
+def depth_to_points(depth: np.ndarray, rays: np.ndarray, out=None) -> np.ndarray:
+    """
+    Deproject a z16 depth image with a table from `depth_ray_table`.
+
+    Returns an (n, 3) float32 array with one point per valid (non zero) depth
+    pixel. `out` is an optional (h, w, 3) float32 scratch buffer.
+    """
+    if out is None:
+        out = np.empty(rays.shape, dtype=np.float32)
+    np.multiply(depth[:, :, None], rays, out=out)
+    # np.compress is several times faster than boolean indexing on rows
+    return np.compress(depth.ravel() != 0, out.reshape(-1, 3), axis=0)
+
+
+def voxel_downsample(points: np.ndarray, voxel_size) -> np.ndarray:
+    """
+    Replace all points that fall into the same cube of `voxel_size` meters
+    by their centroid.
+    """
+    if len(points) == 0 or voxel_size <= 0:
+        return points
+    cells = np.floor(points * (1.0 / voxel_size)).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # fold the three cell coordinates into one key, so grouping is a 1d sort
+    extent = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * extent[1] + cells[:, 1]) * extent[2] + cells[:, 2]
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    downsampled = np.empty((len(counts), 3), dtype=np.float32)
+    for axis in range(3):
+        downsampled[:, axis] = (
+            np.bincount(inverse, weights=points[:, axis], minlength=len(counts))
+            / counts
+        )
+    return downsampled
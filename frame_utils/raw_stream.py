@@ -0,0 +1,389 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    raw_stream.py                                      :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 13:02:16 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 13:02:16 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import json
+import logging
+import os
+import queue
+import threading
+
+import numpy as np
+
+# optional compression backends
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# logging
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ("none", "lz4", "zstd")
+INDEX_DTYPE = np.dtype(
+    [
+        ("timestamp", np.float64),
+        ("chunk", np.uint32),
+        ("offset", np.uint64),
+        ("nbytes", np.uint64),
+    ]
+)
+
+
+#     ____                                        _
+#    / ___|___  _ __ ___  _ __  _ __ ___  ___ ___(_) ___  _ __
+#   | |   / _ \| '_ ` _ \| '_ \| '__/ _ \/ __/ __| |/ _ \| '_ \
+#   | |__| (_) | | | | | | |_) | | |  __/\__ \__ \ | (_) | | | |
+#    \____\___/|_| |_| |_| .__/|_|  \___||___/___/_|\___/|_| |_|
+#                        |_|
+def available_compressions() -> list:
+    """
+    Return the compressions that can be used with the installed packages.
+    """
+    available = ["none"]
+    if lz4 is not None:
+        available.append("lz4")
+    if zstandard is not None:
+        available.append("zstd")
+    return available
+
+
+def _get_decompressor(compression) -> any:
+    if compression == "lz4":
+        if lz4 is None:
+            raise RuntimeError("Recording is lz4 compressed, but lz4 is not installed.")
+        return lz4.frame.decompress
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(
+                "Recording is zstd compressed, but zstandard is not installed."
+            )
+        return zstandard.ZstdDecompressor().decompress
+    return None
+
+
+def _get_compressor(compression) -> any:
+    if compression == "lz4" and lz4 is not None:
+        return lambda data: lz4.frame.compress(data)
+    if compression == "zstd" and zstandard is not None:
+        # level 1 keeps up with 1280x720@30 on a single core
+        return zstandard.ZstdCompressor(level=1).compress
+    return None
+
+
+#    ____                  ____  _                             __        __    _ _
+#   |  _ \ __ ___      __ / ___|| |_ _ __ ___  __ _ _ __ ___   \ \      / / __(_) |_ ___ _ __
+#   | |_) / _` \ \ /\ / / \___ \| __| '__/ _ \/ _` | '_ ` _ \   \ \ /\ / / '__| | __/ _ \ '__|
+#   |  _ < (_| |\ V  V /   ___) | |_| | |  __/ (_| | | | | | |   \ V  V /| |  | | ||  __/ |
+#   |_| \_\__,_| \_/\_/   |____/ \__|_|  \___|\__,_|_| |_| |_|    \_/\_/ |_|  |_|\__\___|_|
+class RawStreamWriter():
+    """
+    Lossless recorder for fixed shape numpy frames (e.g. z16 depth).
+
+    Frames are written by a background thread into chunk files
+    `<name>_raw_<chunk>.bin`. Every frame is compressed on its own, so the
+    index `<name>_raw_index.npy` (timestamp, chunk, offset, nbytes) allows
+    random access to any frame. Timestamps are additionally stored as
+    `<name>_raw_timestamps.npy` like all other Pupil recordings.
+
+    `write` never blocks: if the queue is full the frame is dropped and
+    counted in `dropped`.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(
+        self,
+        directory,
+        name,
+        compression="none",
+        chunk_size=300,
+        queue_size=64,
+    ):
+        if compression not in available_compressions():
+            logger.warning(
+                "Compression '{}' not available. Recording uncompressed.".format(
+                    compression
+                )
+            )
+            compression = "none"
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.name = name
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self._compress = _get_compressor(compression)
+
+        # statistics
+        self.written = 0
+        self.dropped = 0
+
+        self._shape = None
+        self._dtype = None
+        self._index = []
+        self._chunk = 0
+        self._chunk_file = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="RawStreamWriter " + name, daemon=True
+        )
+        self._thread.start()
+
+    def write(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        Queue a frame for writing. Returns False if it had to be dropped.
+        """
+        if self._shape is None:
+            self._shape = frame.shape
+            self._dtype = frame.dtype
+        elif frame.shape != self._shape or frame.dtype != self._dtype:
+            logger.error("RawStreamWriter: frame format changed, frame dropped.")
+            self.dropped += 1
+            return False
+        try:
+            # copy, so the capture buffer can be reused right away
+            self._queue.put_nowait((np.array(frame, copy=True), timestamp))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self) -> None:
+        """
+        Flush all queued frames and write the index.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        logger.debug(
+            "RawStreamWriter {}: {} frames written, {} dropped.".format(
+                self.name, self.written, self.dropped
+            )
+        )
+
+    #   __        __    _ _              _____ _                        _
+    #   \ \      / / __(_) |_ ___ _ __  |_   _| |__  _ __ ___  __ _  __| |
+    #    \ \ /\ / / '__| | __/ _ \ '__|   | | | '_ \| '__/ _ \/ _` |/ _` |
+    #     \ V  V /| |  | | ||  __/ |      | | | | | | | |  __/ (_| | (_| |
+    #      \_/\_/ |_|  |_|\__\___|_|      |_| |_| |_|_|  \___|\__,_|\__,_|
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, timestamp = item
+            try:
+                self._write_frame(frame, timestamp)
+            except OSError as e:
+                logger.error("RawStreamWriter: cannot write frame: {}".format(e))
+                self.dropped += 1
+        self._close_chunk()
+
+    def _write_frame(self, frame, timestamp) -> None:
+        if self._chunk_file is None:
+            self._open_chunk()
+        data = frame.tobytes()
+        if self._compress is not None:
+            data = self._compress(data)
+        offset = self._chunk_file.tell()
+        self._chunk_file.write(data)
+        self._index.append((timestamp, self._chunk, offset, len(data)))
+        self.written += 1
+        if self.written % self.chunk_size == 0:
+            self._close_chunk()
+            self._chunk += 1
+
+    def _open_chunk(self) -> None:
+        path = os.path.join(
+            self.directory, "{}_raw_{:04d}.bin".format(self.name, self._chunk)
+        )
+        self._chunk_file = open(path, "wb")
+
+    def _close_chunk(self) -> None:
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+        # rewrite the index after every chunk, so a crash loses one chunk at most
+        self._save_index()
+
+    def _save_index(self) -> None:
+        if self._shape is None:
+            return
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        np.save(os.path.join(self.directory, self.name + "_raw_index.npy"), index)
+        np.save(
+            os.path.join(self.directory, self.name + "_raw_timestamps.npy"),
+            index["timestamp"],
+        )
+        info = {
+            "shape": list(self._shape),
+            "dtype": np.dtype(self._dtype).str,
+            "compression": self.compression,
+            "chunk_size": self.chunk_size,
+        }
+        with open(os.path.join(self.directory, self.name + "_raw_info.json"), "w") as f:
+            json.dump(info, f, indent=4)
+
+
+#    ____                  ____  _                              ____                _
+#   |  _ \ __ ___      __ / ___|| |_ _ __ ___  __ _ _ __ ___   |  _ \ ___  __ _  __| | ___ _ __
+#   | |_) / _` \ \ /\ / / \___ \| __| '__/ _ \/ _` | '_ ` _ \  | |_) / _ \/ _` |/ _` |/ _ \ '__|
+#   |  _ < (_| |\ V  V /   ___) | |_| | |  __/ (_| | | | | | | |  _ <  __/ (_| | (_| |  __/ |
+#   |_| \_\__,_| \_/\_/   |____/ \__|_|  \___|\__,_|_| |_| |_| |_| \_\___|\__,_|\__,_|\___|_|
+class RawStreamReader():
+    """
+    Random access reader for recordings made with `RawStreamWriter`.
+    Reading frame `i` is one seek + one read in the right chunk file.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+        with open(os.path.join(directory, name + "_raw_info.json")) as f:
+            info = json.load(f)
+        self.shape = tuple(info["shape"])
+        self.dtype = np.dtype(info["dtype"])
+        self.compression = info["compression"]
+        self._decompress = _get_decompressor(self.compression)
+        self.index = np.load(os.path.join(directory, name + "_raw_index.npy"))
+        self.timestamps = self.index["timestamp"]
+        self._chunk = None
+        self._chunk_file = None
+
+    @staticmethod
+    def exists(directory, name) -> bool:
+        return os.path.isfile(os.path.join(directory, name + "_raw_info.json"))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def read(self, index) -> np.ndarray:
+        """
+        Return frame `index` as a numpy array.
+        """
+        entry = self.index[index]
+        if entry["chunk"] != self._chunk:
+            self.close()
+            path = os.path.join(
+                self.directory, "{}_raw_{:04d}.bin".format(self.name, entry["chunk"])
+            )
+            self._chunk_file = open(path, "rb")
+            self._chunk = entry["chunk"]
+        self._chunk_file.seek(int(entry["offset"]))
+        data = self._chunk_file.read(int(entry["nbytes"]))
+        if self._decompress is not None:
+            data = self._decompress(data)
+        return np.frombuffer(data, dtype=self.dtype).reshape(self.shape)
+
+    def close(self) -> None:
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+            self._chunk = None
+
+
+#    ____                  ____                        _ _               ____                _
+#   |  _ \ __ ___      __ |  _ \ ___  ___ ___  _ __ __| (_)_ __   __ _  |  _ \ ___  __ _  __| | ___ _ __
+#   | |_) / _` \ \ /\ / / | |_) / _ \/ __/ _ \| '__/ _` | | '_ \ / _` | | |_) / _ \/ _` |/ _` |/ _ \ '__|
+#   |  _ < (_| |\ V  V /  |  _ <  __/ (_| (_) | | | (_| | | | | | (_| | |  _ <  __/ (_| | (_| |  __/ |
+#   |_| \_\__,_| \_/\_/   |_| \_\___|\___\___/|_|  \__,_|_|_| |_|\__, | |_| \_\___|\__,_|\__,_|\___|_|
+#                                                                |___/
+class RawRecordingReader():
+    """
+    Reads a raw color + depth recording (`color_raw_*`, `depth_raw_*`).
+
+    Frames are addressed by the index of the primary stream (color if it was
+    recorded, depth otherwise). The matching frame of the other stream is
+    looked up once for the whole recording, so `read` stays O(1).
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, directory):
+        self.color = None
+        self.depth = None
+        if RawStreamReader.exists(directory, "color"):
+            self.color = RawStreamReader(directory, "color")
+        if RawStreamReader.exists(directory, "depth"):
+            self.depth = RawStreamReader(directory, "depth")
+        # an empty stream (e.g. every frame dropped) counts as not recorded
+        for name in ("color", "depth"):
+            reader = getattr(self, name)
+            if reader is not None and not len(reader):
+                reader.close()
+                setattr(self, name, None)
+        if self.color is None and self.depth is None:
+            raise FileNotFoundError("No raw recording found in " + directory)
+
+        primary = self.color if self.color is not None else self.depth
+        self.timestamps = primary.timestamps
+        self._depth_for_color = None
+        if self.color is not None and self.depth is not None:
+            # closest depth frame for every color frame
+            depth_ts = self.depth.timestamps
+            last = len(depth_ts) - 1
+            right = np.clip(np.searchsorted(depth_ts, self.timestamps), 0, last)
+            left = np.clip(right - 1, 0, last)
+            closer_left = np.abs(self.timestamps - depth_ts[left]) < np.abs(
+                depth_ts[right] - self.timestamps
+            )
+            self._depth_for_color = np.where(closer_left, left, right)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def frame_size(self) -> tuple:
+        primary = self.color if self.color is not None else self.depth
+        return primary.shape[1], primary.shape[0]
+
+    @property
+    def frame_rate(self) -> float:
+        if len(self.timestamps) < 2:
+            return 0.0
+        duration = self.timestamps[-1] - self.timestamps[0]
+        if duration <= 0:
+            return 0.0
+        return (len(self.timestamps) - 1) / duration
+
+    def read(self, index) -> tuple:
+        """
+        Return (color, depth, timestamp) of frame `index`.
+        Streams that were not recorded are None.
+        """
+        color = None
+        depth = None
+        if self.color is not None:
+            color = self.color.read(index)
+            if self.depth is not None:
+                depth = self.depth.read(self._depth_for_color[index])
+        else:
+            depth = self.depth.read(index)
+        return color, depth, self.timestamps[index]
+
+    def close(self) -> None:
+        for reader in (self.color, self.depth):
+            if reader is not None:
+                reader.close()
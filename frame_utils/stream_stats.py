@@ -0,0 +1,144 @@
+# **************************************************************************** #
+#                                                                              #
+#                                                         :::      ::::::::    #
+#    stream_stats.py                                    :+:      :+:    :+:    #
+#                                                     +:+ +:+         +:+      #
+#    By: Paul Joseph <paul.joseph@pbl.ee.ethz.ch    +#+  +:+       +#+         #
+#                                                 +#+#+#+#+#+   +#+            #
+#    Created: 2026/10/18 16:31:47 by Paul Joseph       #+#    #+#              #
+#    Updated: 2026/10/18 16:31:47 by Paul Joseph      ###   ########.fr        #
+#                                                                              #
+# **************************************************************************** #
+
+import csv
+import threading
+
+import numpy as np
+
+# rolling window of latency samples per stream (~10 s at 30 fps)
+LATENCY_WINDOW = 300
+# histogram bin edges in ms, the last bin collects everything above 200 ms
+LATENCY_BINS = (0, 5, 10, 20, 33, 50, 67, 100, 200, np.inf)
+
+
+#    ____  _                              ____  _        _
+#   / ___|| |_ _ __ ___  __ _ _ __ ___   / ___|| |_ __ _| |_ ___
+#   \___ \| __| '__/ _ \/ _` | '_ ` _ \  \___ \| __/ _` | __/ __|
+#    ___) | |_| | |  __/ (_| | | | | | |  ___) | || (_| | |_\__ \
+#   |____/ \__|_|  \___|\__,_|_| |_| |_| |____/ \__\__,_|\__|___/
+class StreamStats():
+    """
+    Delivery statistics of one stream: frame-number gaps, duplicates,
+    timeouts and a rolling window of capture-to-receipt latencies.
+
+    Written by the capture thread, read by the UI, hence the lock.
+    """
+
+    #    ___       _ _
+    #   |_ _|_ __ (_) |_
+    #    | || '_ \| | __|
+    #    | || | | | | |_
+    #   |___|_| |_|_|\__|
+    def __init__(self, name, window=LATENCY_WINDOW):
+        self.name = name
+        self._lock = threading.Lock()
+        self._latencies = np.zeros(window, dtype=np.float64)
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.received = 0
+            self.dropped = 0
+            self.duplicates = 0
+            self.timeouts = 0
+            self._last_number = None
+            self._latency_count = 0
+
+    #    ____                        _
+    #   |  _ \ ___  ___ ___  _ __ __| |
+    #   | |_) / _ \/ __/ _ \| '__/ _` |
+    #   |  _ <  __/ (_| (_) | | | (_| |
+    #   |_| \_\___|\___\___/|_|  \__,_|
+    def record(self, frame_number, latency=None) -> bool:
+        """
+        Count one received frame, `latency` in ms (None if unknown).
+        Returns False if the frame is a duplicate of the previous one.
+        """
+        with self._lock:
+            last, self._last_number = self._last_number, frame_number
+            if last is not None:
+                if frame_number == last:
+                    self.duplicates += 1
+                    return False
+                # a smaller number means the device restarted -> new baseline
+                if frame_number > last + 1:
+                    self.dropped += frame_number - last - 1
+            self.received += 1
+            if latency is not None:
+                window = len(self._latencies)
+                self._latencies[self._latency_count % window] = latency
+                self._latency_count += 1
+            return True
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    #    ____
+    #   / ___| _   _ _ __ ___  _ __ ___   __ _ _ __ _   _
+    #   \___ \| | | | '_ ` _ \| '_ ` _ \ / _` | '__| | | |
+    #    ___) | |_| | | | | | | | | | | | (_| | |  | |_| |
+    #   |____/ \__,_|_| |_| |_|_| |_| |_|\__,_|_|   \__, |
+    #                                               |___/
+    def latencies(self) -> np.ndarray:
+        """Return a copy of the latency samples in the rolling window."""
+        with self._lock:
+            count = min(self._latency_count, len(self._latencies))
+            return self._latencies[:count].copy()
+
+    def latency_histogram(self, bins=LATENCY_BINS) -> np.ndarray:
+        return np.histogram(self.latencies(), bins=bins)[0]
+
+    def latency_percentiles(self, q=(50, 95, 100)) -> np.ndarray:
+        latencies = self.latencies()
+        if len(latencies) == 0:
+            return np.full(len(q), np.nan)
+        return np.percentile(latencies, q)
+
+    def summary(self) -> str:
+        """Counters and latency p50/p95/max in one line, for the menu."""
+        p50, p95, worst = self.latency_percentiles()
+        counters = "{} rx, {} dropped, {} dup, {} timeouts".format(
+            self.received, self.dropped, self.duplicates, self.timeouts
+        )
+        return counters + " | {:.1f}/{:.1f}/{:.1f} ms".format(p50, p95, worst)
+
+
+#     ____ ______     __  _____                       _
+#    / ___/ ___\ \   / / | ____|_  ___ __   ___  _ __| |_
+#   | |   \___ \\ \ / /  |  _| \ \/ / '_ \ / _ \| '__| __|
+#   | |___ ___) |\ V /   | |___ >  <| |_) | (_) | |  | |_
+#    \____|____/  \_/    |_____/_/\_\ .__/ \___/|_|   \__|
+#                                   |_|
+def write_stats_csv(path, stats, bins=LATENCY_BINS) -> None:
+    """
+    Write one row per StreamStats: counters, latency percentiles and the
+    latency histogram (one column per bin).
+    """
+    bin_names = [
+        "latency_{:g}-{:g}ms".format(lo, hi)
+        if np.isfinite(hi)
+        else "latency_{:g}+ms".format(lo)
+        for lo, hi in zip(bins[:-1], bins[1:])
+    ]
+    header = ["stream", "received", "dropped", "duplicates", "timeouts"]
+    header += ["latency_p50_ms", "latency_p95_ms", "latency_max_ms"]
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header + bin_names)
+        for s in stats:
+            writer.writerow(
+                [s.name, s.received, s.dropped, s.duplicates, s.timeouts]
+                + ["{:.3f}".format(p) for p in s.latency_percentiles()]
+                + s.latency_histogram(bins).tolist()
+            )
@@ -17,9 +17,9 @@
 #    | || |  | |  __/| |_| |  _ < | |  ___) |
 #   |___|_|  |_|_|    \___/|_| \_\|_| |____/ 
 import sys
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import pathlib
 import seaborn as sns
 import matplotlib.colors as mcolors
@@ -32,6 +32,17 @@ from pyglui.pyfontstash import fontstash
 
 # custom
 from event_handler.event_handler import EventHandler
+from detection.inference_worker import InferenceWorker
+from detection.model_cache import WARMUP_SHAPE, ModelLoader
+from detection.backends import available_backends, create_backend
+from detection.process_pool import ProcessInference
+from detection.roi import MIN_GAZE_CONFIDENCE, gaze_roi, roi_to_frame
+from detection.tracker import Tracker
+from detection.batch import ClassTable, DetectionBatch
+from detection.scene_gate import SceneGate
+from detection.scheduler import InferenceScheduler
+from detection.tiles import TILE_OVERLAP, TILE_SIZE, TileBatching, predict_tiled
+from detection.gaze_hits import DwellAccumulator, gaze_hits
 
 # logging
 import logging
@@ -45,6 +56,8 @@ logger = logging.getLogger(__name__)
 #    \___/|_.__// |\___|\___|\__| |____/ \___|\__\___|\___|\__|_|\___/|_| |_|
 #             |__/                                                           
 class Object_Detection(Plugin):
+    # ask capture sources (e.g. Realsense2_Source) for BGR frames
+    uses_bgr_frames = True
 
     #    ___       _ _    
     #   |_ _|_ __ (_) |_  
@@ -54,6 +67,50 @@ class Object_Detection(Plugin):
     def __init__(self, g_pool):
         super().__init__(g_pool)
         self.event_handler = EventHandler()
+        self.inference_worker = None
+        # "thread": one background thread, "process": separate processes (no GIL sharing)
+        self.inference_mode = "thread"
+        self.inference_workers = 2
+        self.inference_error = None  # shown in the menu, e.g. after a fallback
+        # "ultralytics" (PyTorch), "onnxruntime" or "openvino" (exported once and cached)
+        self.inference_backend = "ultralytics"
+        self.int8_bool = False
+        # models load in the background, the current one serves until the swap
+        self.model = None
+        self.class_table = None
+        self.model_loader = ModelLoader(self.load_model)
+        self.warmup_shape = WARMUP_SHAPE
+        self.last_frame_index = -1
+        self.model_since_index = 0
+        # gaze guided region of interest: only run inference around the gaze
+        self.roi_bool = False
+        self.roi_size = 480  # [px], square window
+        self.full_frame_interval = 15  # every n-th inference sees the whole frame, 0: never
+        self.frames_since_full = 0  # finished ROI detections since the last full frame
+        self.rois = {}  # frame index -> (x0, y0, x1, y1) of frames in flight
+        # carry detections over to the frames between inferences, with track ids
+        self.tracking_bool = True
+        self.tracker = Tracker()
+        self.detection_index = -1
+        self.object_events = None
+        # reuse the last detections while the scene does not change
+        self.scene_gate_bool = False
+        self.scene_gate = SceneGate()
+        self.last_detections = None  # (xyxy, conf, cls) of the newest inference
+        self.reused_detections = None
+        # only run inference on every n-th frame if the world loop gets too slow
+        self.scheduler_bool = True
+        self.scheduler = InferenceScheduler()
+        # detect on overlapping tiles (small, distant objects)
+        self.tiled_bool = False
+        self.tile_size = TILE_SIZE
+        self.tile_overlap = TILE_OVERLAP
+        self.tile_full_frame_bool = True  # the whole frame as an extra crop (large objects)
+        self.tile_batching = TileBatching()  # batched or per tile calls, whichever is faster
+        # which objects are looked at (and for how long)
+        self.gazed_objects_bool = True
+        self.dwell_bool = True
+        self.dwell = DwellAccumulator()
         self.init_pupil()
         self.init_object_detection()
 
@@ -69,13 +126,164 @@ class Object_Detection(Plugin):
     
     def init_object_detection(self, yolo_version="tinyissimo.pt") -> None:
         """
-        Initialize the object detection model.
+        Initialize the object detection model. Only requests the model, it is
+        loaded (or taken from the cache) in the background and swapped in by
+        `swap_model` once it is ready. Until then the previous model keeps serving.
+
+        In process mode the model is only loaded by the worker processes, the
+        running ones are switched over (see `ProcessInference.set_model`).
         """
         self.yolo_version = yolo_version
         self.yolo_path = pathlib.Path(__file__).parent / "object_detection_models" / self.yolo_version
-        self.model = YOLO(self.yolo_path)  # pretrained YOLO model
-        self.recent_objects = None
-        self.object_events = None
+        if self.inference_mode == "process":
+            if self.inference_worker is None:
+                self.start_inference_worker()
+            else:
+                self.inference_worker.set_model(self.yolo_path, self.inference_backend, self.int8_bool)
+                self.model_since_index = self.last_frame_index + 1
+            return
+        self.model_loader.request(
+            (self.inference_backend, str(self.yolo_path), self.int8_bool), self.warmup_shape
+        )
+
+    def load_model(self, key) -> any:
+        """
+        Load a pretrained YOLO model with the selected backend.
+        Runs on the model loader thread.
+        """
+        backend, yolo_path, int8_bool = key
+        return create_backend(backend, yolo_path, int8_bool)
+
+    def swap_model(self) -> None:
+        """
+        Swap in a newly loaded model (if one is ready). Detections of frames
+        submitted before the swap belong to the previous model and are dropped.
+        """
+        ready = self.model_loader.poll()
+        if ready is None or self.inference_mode == "process":
+            # process workers load their own models
+            return
+        (backend, yolo_path, int8_bool), model, error = ready
+        if error is not None:
+            if backend != "ultralytics":
+                # e.g. the export failed, the original path always works
+                logger.error("Cannot load the model with {}, falling back to ultralytics.".format(backend))
+                self.inference_backend = "ultralytics"
+                self.init_object_detection(self.yolo_version)
+            return
+        self.model = model
+        # timings of the previous model do not apply
+        self.tile_batching = TileBatching()
+        self.set_class_names(self.model.names)
+        self.model_since_index = self.last_frame_index + 1
+        # the thread worker picks up self.model itself
+        if self.inference_worker is None:
+            self.start_inference_worker()
+
+    def set_class_names(self, names) -> None:
+        """
+        Switch to the classes of a new model.
+        """
+        # create an evenly spread color spectrum acording to the classes of the model
+        self.class_table = ClassTable(names, sns.color_palette(None, len(names)))
+        # class ids of the tracks may not match the new model
+        self.tracker.reset()
+        self.scene_gate.reset()
+        self.last_detections = None
+
+    def start_inference_worker(self) -> None:
+        """
+        (Re)start the background inference in the selected mode. Inference runs
+        in the background, the world loop only hands over frames.
+        """
+        self.stop_inference_worker()
+        if self.inference_mode == "process":
+            # every process loads its own copy of the model
+            # frame slots sized for the full world frame, ROI crops fit as well
+            self.inference_worker = ProcessInference(
+                self.yolo_path,
+                self.inference_workers,
+                self.inference_backend,
+                self.int8_bool,
+                self.tiling(),
+                frame_shape=self.warmup_shape,
+            )
+        elif self.model is not None:
+            self.inference_worker = InferenceWorker(self.object_detection, name="YOLO inference")
+
+    def model_status(self) -> str:
+        """
+        One word model state for the menu (or the last inference error).
+        """
+        if self.inference_error is not None:
+            return self.inference_error
+        if isinstance(self.inference_worker, ProcessInference):
+            loading = self.inference_worker.names is None
+        else:
+            loading = self.model_loader.loading
+        return "loading ..." if loading else "ready"
+
+    def set_inference_backend(self, inference_backend) -> None:
+        self.inference_backend = inference_backend
+        self.init_object_detection(self.yolo_version)
+
+    def set_int8(self, int8_bool) -> None:
+        self.int8_bool = int8_bool
+        self.init_object_detection(self.yolo_version)
+
+    def set_tracking(self, tracking_bool) -> None:
+        self.tracking_bool = tracking_bool
+        self.tracker.reset()
+
+    def set_dwell(self, dwell_bool) -> None:
+        self.dwell_bool = dwell_bool
+        self.dwell.reset()
+
+    def tiling(self) -> any:
+        """
+        Return (tile size, overlap, full frame) if tiled inference is enabled, else None.
+        """
+        if not self.tiled_bool:
+            return None
+        return int(self.tile_size), self.tile_overlap, self.tile_full_frame_bool
+
+    def set_tiling(self, **settings) -> None:
+        for name, value in settings.items():
+            setattr(self, name, value)
+        if isinstance(self.inference_worker, ProcessInference):
+            # applies from the next frame on, no restart needed
+            self.inference_worker.tiling = self.tiling()
+
+    def set_scheduler(self, scheduler_bool) -> None:
+        self.scheduler_bool = scheduler_bool
+        self.scheduler.reset()
+
+    def set_scene_gate(self, scene_gate_bool) -> None:
+        self.scene_gate_bool = scene_gate_bool
+        self.scene_gate.reset()
+
+    def set_inference_mode(self, inference_mode) -> None:
+        self.inference_mode = inference_mode
+        self.inference_error = None
+        if inference_mode == "process":
+            self.start_inference_worker()
+        else:
+            # the thread worker starts once the current model is loaded here
+            self.stop_inference_worker()
+            self.init_object_detection(self.yolo_version)
+
+    def set_inference_workers(self, inference_workers) -> None:
+        self.inference_workers = int(inference_workers)
+        if self.inference_mode == "process":
+            self.start_inference_worker()
+
+    def stop_inference_worker(self) -> None:
+        """
+        Stop the background inference (waits for a running inference to finish).
+        """
+        if self.inference_worker is not None:
+            self.inference_worker.stop()
+            self.inference_worker = None
 
     #    ____  _             _         _____                 _   _                 
     #   |  _ \| |_   _  __ _(_)_ __   |  ___|   _ _ __   ___| |_(_) ___  _ __  ___ 
@@ -134,6 +342,250 @@ class Object_Detection(Plugin):
                 )
             )
 
+            # inference backend
+            self.__sub_menu.append(ui.Info_Text('Inference Backend (exported models are cached)'))
+            backends = available_backends()
+            self.__sub_menu.append(
+                ui.Selector(
+                    'inference_backend', 
+                    self, 
+                    selection=backends,
+                    labels=backends,
+                    label='Backend',
+                    setter=self.set_inference_backend,
+                )
+            )
+            self.__sub_menu.append(
+                ui.Switch(
+                    'int8_bool', 
+                    self, 
+                    label='INT8 Model (ONNX/OpenVINO)',
+                    setter=self.set_int8,
+                )
+            )
+
+            # tracking
+            self.__sub_menu.append(
+                ui.Switch(
+                    'tracking_bool', 
+                    self, 
+                    label='Track Objects (every frame)',
+                    setter=self.set_tracking,
+                )
+            )
+
+            # adaptive inference rate
+            self.__sub_menu.append(ui.Info_Text('Lower the inference rate to keep the world loop within budget.'))
+            self.__sub_menu.append(
+                ui.Switch(
+                    'scheduler_bool', 
+                    self, 
+                    label='Adaptive Inference Rate',
+                    setter=self.set_scheduler,
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'budget', 
+                    self.scheduler, 
+                    min=0.0,
+                    step=1.0,
+                    max=100.0,
+                    label='World Loop Budget [ms] (0: frame period)',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Text_Input(
+                    'scheduler_summary', 
+                    self, 
+                    label='Detections',
+                    getter=self.scheduler.summary,
+                    setter=lambda _: None,
+                )
+            )
+
+            # scene change gate
+            self.__sub_menu.append(ui.Info_Text('Skip inference while the scene does not change.'))
+            self.__sub_menu.append(
+                ui.Switch(
+                    'scene_gate_bool', 
+                    self, 
+                    label='Scene Change Gate',
+                    setter=self.set_scene_gate,
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'threshold', 
+                    self.scene_gate, 
+                    min=0.5,
+                    step=0.5,
+                    max=20.0,
+                    label='Change Threshold',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'max_age', 
+                    self.scene_gate, 
+                    min=0.5,
+                    step=0.5,
+                    max=10.0,
+                    label='Max Reuse Age [s]',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Text_Input(
+                    'skip_ratio', 
+                    self, 
+                    label='Skipped by Gate',
+                    getter=lambda: "{:.0%}".format(self.scene_gate.skip_ratio),
+                    setter=lambda _: None,
+                )
+            )
+
+            # gazed objects
+            self.__sub_menu.append(
+                ui.Switch(
+                    'gazed_objects_bool', 
+                    self, 
+                    label='Gazed Objects',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Switch(
+                    'dwell_bool', 
+                    self, 
+                    label='Dwell Time',
+                    setter=self.set_dwell,
+                )
+            )
+
+            # tiled inference
+            self.__sub_menu.append(ui.Info_Text('Detect on overlapping tiles (small objects, slower).'))
+            self.__sub_menu.append(
+                ui.Switch(
+                    'tiled_bool', 
+                    self, 
+                    label='Tiled Inference',
+                    setter=lambda value: self.set_tiling(tiled_bool=value),
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'tile_size', 
+                    self, 
+                    min=160,
+                    step=32,
+                    max=1280,
+                    label='Tile Size [px]',
+                    setter=lambda value: self.set_tiling(tile_size=value),
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'tile_overlap', 
+                    self, 
+                    min=0.0,
+                    step=0.05,
+                    max=0.5,
+                    label='Tile Overlap',
+                    setter=lambda value: self.set_tiling(tile_overlap=value),
+                )
+            )
+            self.__sub_menu.append(
+                ui.Switch(
+                    'tile_full_frame_bool', 
+                    self, 
+                    label='Tiles + Full Frame (large objects)',
+                    setter=lambda value: self.set_tiling(tile_full_frame_bool=value),
+                )
+            )
+
+            # gaze region of interest
+            self.__sub_menu.append(ui.Info_Text('Only detect objects around the gaze (much cheaper).'))
+            self.__sub_menu.append(
+                ui.Switch(
+                    'roi_bool', 
+                    self, 
+                    label='Gaze ROI',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'roi_size', 
+                    self, 
+                    min=160,
+                    step=32,
+                    max=1280,
+                    label='ROI Size [px]',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'full_frame_interval', 
+                    self, 
+                    min=0,
+                    step=1,
+                    max=60,
+                    label='Full Frame Every n-th (0: never)',
+                )
+            )
+
+            # inference mode
+            self.__sub_menu.append(ui.Info_Text('Background Inference'))
+            self.__sub_menu.append(
+                ui.Selector(
+                    'inference_mode', 
+                    self, 
+                    selection=['thread', 'process'],
+                    labels=['Thread', 'Process Pool'],
+                    label='Inference Mode',
+                    setter=self.set_inference_mode,
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'inference_workers', 
+                    self, 
+                    min=1,
+                    step=1,
+                    max=4,
+                    label='Worker Processes',
+                    setter=self.set_inference_workers,
+                )
+            )
+            # inference statistics (read only)
+            self.__sub_menu.append(
+                ui.Text_Input(
+                    'model_status', 
+                    self, 
+                    label='Model',
+                    getter=self.model_status,
+                    setter=lambda _: None,
+                )
+            )
+            self.__sub_menu.append(
+                ui.Text_Input(
+                    'inference_time', 
+                    self, 
+                    label='Inference [ms]',
+                    getter=lambda: "{:.1f}".format(
+                        self.inference_worker.inference_time if self.inference_worker else 0.0
+                    ),
+                    setter=lambda _: None,
+                )
+            )
+            self.__sub_menu.append(
+                ui.Text_Input(
+                    'skipped_frames', 
+                    self, 
+                    label='Skipped Frames',
+                    getter=lambda: str(self.inference_worker.skipped if self.inference_worker else 0),
+                    setter=lambda _: None,
+                )
+            )
+
             self.glfont = fontstash.Context()
             self.glfont.add_font("opensans", ui.get_opensans_font_path())
             self.glfont.set_size(22)
@@ -159,16 +611,55 @@ class Object_Detection(Plugin):
         --> see plugin.py
         --> does not need to be called explicitly)
         """
+        # the scheduler budgets this plugin's own work per frame
+        start = time.perf_counter()
+
+        # swap in a newly loaded model (if any)
+        self.swap_model()
 
         # get the frame(aka world camera data) from the events
-        frame = self.event_handler.get_frame(events)
-        # check if the frame is not None
-        if frame is None:
+        image = self.event_handler.get_frame(events)
+        if image is not None:
+            self.warmup_shape = image.shape
+        if self.inference_worker is None:
+            # first model is still loading
             return
+        # hand the frame over to the inference worker (never blocks)
+        ticked = submitted = False
+        if image is not None:
+            frame = events["frame"]
+            self.last_frame_index = frame.index
+            ticked = self.scheduler_bool
+            if self.scheduler_bool and not self.scheduler.tick(frame.index, frame.timestamp):
+                # not this frame's turn, the tracker carries the objects over
+                pass
+            elif self.scene_gate_bool and not self.scene_gate.changed(image, frame.timestamp):
+                # static scene, the last detections still hold
+                self.reuse_detections(frame)
+            else:
+                roi = self.select_roi(events)
+                if roi is not None:
+                    self.rois[frame.index] = roi
+                    image = image[roi[1]:roi[3], roi[0]:roi[2]]
+                self.inference_worker.submit(image, frame.index, frame.timestamp)
+                submitted = True
 
-        self.object_detection(frame)
-        # append events with detected objects
+        # append events with the newest finished detections (if any)
         events = self.convert_obj_to_events(events)
+        # and the objects the gaze falls on
+        events = self.detect_gazed_objects(events)
+        if ticked:
+            self.scheduler.done((time.perf_counter() - start) * 1000, submitted)
+
+    def cleanup(self) -> None:
+        """
+        Stop the inference worker.
+
+        (This is a function given by the Plugin class 
+        --> see plugin.py
+        --> does not need to be called explicitly)
+        """
+        self.stop_inference_worker()
 
     def gl_display(self):
         """
@@ -189,48 +680,162 @@ class Object_Detection(Plugin):
     #   | |  | | | / __| __/ _ \| '_ ` _ \  | |_ | | | | '_ \ / __| __| |/ _ \| '_ \/ __|    
     #   | |__| |_| \__ \ || (_) | | | | | | |  _|| |_| | | | | (__| |_| | (_) | | | \__ \    
     #    \____\__,_|___/\__\___/|_| |_| |_| |_|   \__,_|_| |_|\___|\__|_|\___/|_| |_|___/    
-    def object_detection(self, image: np.array) -> None:
+    def object_detection(self, image: np.array) -> tuple:
         """
         Perform object detection on a scene camera image using YOLOv8. Taken and modified 
         from: https://docs.ultralytics.com/modes/predict/#key-features-of-predict-mode
-        TODO: return the detected objects and their coordinates in a appropriate format
+
+        Runs on the inference worker thread, must not touch the UI or events.
+        Returns the detections as compact arrays (xyxy, conf, cls), the same format
+        the process pool delivers (see detection/backends.py).
         """
-        # Run batched inference on a list of images
-        self.recent_objects = self.model.predict(image, verbose=False, stream=True)  # return a list of Results objects
-        # self.recent_objects = self.model(image, verbose=False)  # return a list of Results objects
-        # sent as events to the plugin manager
+        tiling = self.tiling()
+        if tiling is not None:
+            return predict_tiled(self.model, image, *tiling, batching=self.tile_batching)
+        return self.model.predict(image)
     
+    def select_roi(self, events) -> any:
+        """
+        Return the (x0, y0, x1, y1) window around the gaze the next inference should
+        run on, or None for the whole frame (ROI disabled, no confident gaze or time
+        for the periodic full frame pass, which catches objects outside the gaze).
+
+        The full frame is requested until its result comes back (see
+        `poll_detections`), a pass replaced in the worker's pending slot by a newer
+        frame would otherwise be lost.
+        """
+        if not self.roi_bool:
+            return None
+        if self.full_frame_interval and self.frames_since_full >= self.full_frame_interval:
+            return None
+        gaze = self.event_handler.get_highest_conf_gaze(events)
+        if not gaze or gaze["confidence"] < MIN_GAZE_CONFIDENCE:
+            return None
+        return gaze_roi(gaze["denorm_pos"], (self.roi_size, self.roi_size), gaze["frame_size"])
+
     def convert_obj_to_events(self, events) -> any:
         """
-        Convert the detected objects into events and append them to the event list.
+        Convert the newest finished detections into events and append them to the
+        event list. Every object is tagged with the index and timestamp of the frame
+        it was detected on, which lags behind the current frame if inference is
+        slower than the camera.
+
+        With tracking enabled the detections only update the tracker instead and
+        every camera frame gets the tracked objects, predicted to that frame and
+        tagged with a persistent "track_id".
         """
+        detections = self.poll_detections()
+        if self.class_table is None:
+            # no model loaded yet
+            return events
+        if self.tracking_bool:
+            frame = events.get("frame")
+            if detections is not None:
+                self.tracker.update(*detections)
+            if frame is None:
+                return events
+            track_ids, xyxy, conf, cls = self.tracker.predict(frame.timestamp)
+            objects = self.make_object_events(
+                xyxy, conf, cls, frame.index, frame.timestamp, track_ids
+            )
+        else:
+            if detections is None:
+                return events
+            xyxy, conf, cls, timestamp = detections
+            objects = self.make_object_events(xyxy, conf, cls, self.detection_index, timestamp)
+        events["objects"] = objects
+        # save for in class usage
+        self.object_events = objects
+        return events
 
-        # TODO: fix this! 
-        if self.recent_objects is not None:
-            # Process results list
-            # ... first convert to numpy array
-            for obj in self.recent_objects:
-                boxes = obj.boxes.numpy()  # Boxes object for bounding box outputs
-                masks = obj.masks  # Masks object for segmentation outputs
-                pobs  = obj.probs  # Probs object for class probabilities
-                cls_dict = obj.names
-                events["objects"] = []
-                # create an evenly spread color spectrum acording to the classes in cls_dict
-                color_palette = sns.color_palette(None, len(cls_dict))           
-                # iterate through the bounding boxes and display them with distinct colors 
-                # for each class
-                for box in boxes:
-                    object_event = {
-                        "topic": "/object_detection", 
-                        "xyxy": box.xyxy[0].tolist(),
-                        "xywh": box.xywh[0].tolist(),
-                        "color": color_palette[int(box.cls[0].item())],
-                        "cls": str(cls_dict[box.cls[0].item()]),
-                        "conf": box.conf.item(),
-                        }
-                    events["objects"].append(object_event)
-                # save for in class usage
-                self.object_events = events["objects"]
+    def poll_detections(self) -> any:
+        """
+        Return the newest finished detections (xyxy, conf, cls, timestamp) in frame
+        coordinates, or None if there are none (or they belong to the previous model).
+        """
+        finished = self.inference_worker.poll()
+        if isinstance(self.inference_worker, ProcessInference) and self.inference_worker.failed:
+            # a worker process died, keep detecting on the background thread
+            logger.error("Inference process failed, falling back to the thread worker.")
+            self.set_inference_mode("thread")
+            self.inference_error = "process failed, using thread"
+            return None
+        if isinstance(self.inference_worker, ProcessInference):
+            names = self.inference_worker.poll_model()
+            if names is not None:
+                self.set_class_names(names)
+        if finished is None:
+            reused, self.reused_detections = self.reused_detections, None
+            return reused
+        (xyxy, conf, cls), frame_index, timestamp = finished
+        self.scheduler.record(frame_index, (self.g_pool.get_timestamp() - timestamp) * 1000)
+        # ROIs of frames that were skipped or are done
+        roi = self.rois.pop(frame_index, None)
+        self.rois = {i: r for i, r in self.rois.items() if i > frame_index}
+        if frame_index < self.model_since_index:
+            # detected by the previous model, class ids may not match
+            return None
+        if roi is not None:
+            # boxes are relative to the crop
+            roi_to_frame(xyxy, roi)
+            self.frames_since_full += 1
+        else:
+            self.frames_since_full = 0
+        self.detection_index = frame_index
+        self.last_detections = xyxy, conf, cls
+        self.reused_detections = None
+        return xyxy, conf, cls, timestamp
+
+    def reuse_detections(self, frame) -> None:
+        """
+        Hand the last detections out again as the detections of `frame` (picked
+        up by `poll_detections` unless a real inference result arrives first).
+        """
+        if self.last_detections is None:
+            return
+        xyxy, conf, cls = self.last_detections
+        self.detection_index = frame.index
+        self.reused_detections = xyxy, conf, cls, frame.timestamp
+
+    def make_object_events(self, xyxy, conf, cls, frame_index, timestamp, track_ids=None) -> DetectionBatch:
+        """
+        Wrap the detection arrays of one frame into a batch (no per-box work,
+        see detection/batch.py).
+        """
+        return DetectionBatch(xyxy, conf, cls, self.class_table, frame_index, timestamp, track_ids)
+
+    def detect_gazed_objects(self, events) -> any:
+        """
+        Test all confident gaze samples of the tick against all current boxes
+        at once and append the objects that were looked at to the event list
+        ("gazed_objects", most gaze samples first). Every gazed object is the
+        object dict plus the number of "gaze_samples" on it and, with dwell
+        enabled, the uninterrupted "dwell" time [s] (per track id, or per class
+        without tracking).
+        """
+        objects = self.object_events
+        if not self.gazed_objects_bool or not objects:
+            return events
+        gaze = self.event_handler.get_gaze_points(events, MIN_GAZE_CONFIDENCE)
+        if gaze is None:
+            return events
+        points, _, timestamps = gaze
+        hits = gaze_hits(points, objects.xyxy)
+        counts = np.bincount(hits[hits >= 0], minlength=len(objects))
+        dwell = None
+        if self.dwell_bool:
+            if objects.track_ids is not None:
+                keys = objects.track_ids.tolist()
+            else:
+                keys = objects.names.tolist()
+            dwell = self.dwell.update(hits, timestamps, keys)
+        gazed = []
+        for i in np.argsort(-counts, kind="stable")[:np.count_nonzero(counts)].tolist():
+            gazed_object = dict(objects[i])
+            gazed_object["gaze_samples"] = int(counts[i])
+            gazed_object["dwell"] = float(dwell[i]) if dwell is not None else None
+            gazed.append(gazed_object)
+        events["gazed_objects"] = gazed
         return events
 
     #     ____          _                   __     ___                 _ _          _   _             
@@ -246,13 +851,18 @@ class Object_Detection(Plugin):
 
         This function should be called in pupillabs "gl_display" method.
         """
-        if self.object_events is not None:
+        objects = self.object_events
+        if objects:
             # Process results list
-            for obj in self.object_events:
+            boxes = zip(
+                objects.xyxy[:, :2].tolist(),
+                objects.xywh[:, 2:].tolist(),
+                objects.colors.tolist(),
+                objects.names.tolist(),
+                objects.conf.tolist(),
+            )
+            for top_left, wh, color, name, conf in boxes:
                 # draw bounding box
-                wh = obj['xywh'][2:]
-                top_left = obj['xyxy'][:2]
-                color = obj['color']
                 draw_rounded_rect(top_left, wh, 2.0, RGBA(color[0], color[1], color[2], 0.5))
                 # draw object label
-                self.glfont.draw_text(top_left[0], top_left[1], obj['cls'] + " (" + str(obj['conf']) + ")" )
\ No newline at end of file
+                self.glfont.draw_text(top_left[0], top_left[1], name + " (" + str(conf) + ")" )
\ No newline at end of file
@@ -1,8 +1,10 @@
 # See the README.md above for instructions on how to use this plugin.
 # https://gist.github.com/pfaion/080ef0d5bc3c556dd0c3cccf93ac2d11#file-readme-md
 
+import datetime
 import logging
 import os
+import threading
 import time
 from ctypes import *
 
@@ -18,6 +20,24 @@ from av_writer import MPEG_Writer
 from camera_models import Camera_Model
 from plugin import Plugin
 
+from frame_utils.buffer_pool import frame_buffer_pool
+from frame_utils.depth_alignment import DepthAligner, Intrinsics, scale_intrinsics
+from frame_utils.depth_colormap import (
+    DEFAULT_DEPTH_FAR,
+    DEFAULT_DEPTH_NEAR,
+    colorize_depth,
+    depth_colormap_lut,
+)
+from frame_utils.frame_ring import FrameRing
+from frame_utils.imu import IMU_ACCEL, IMU_GYRO, ImuRing, SyntheticImu
+from frame_utils.point_cloud import depth_ray_table, depth_to_points, voxel_downsample
+from frame_utils.stream_stats import LATENCY_WINDOW, StreamStats, write_stats_csv
+from frame_utils.raw_stream import (
+    RawRecordingReader,
+    RawStreamWriter,
+    available_compressions,
+)
+
 
 # check versions for our own depedencies as they are fast-changing
 # assert VersionFormat(rs.__version__) >= VersionFormat("2.2") # FIXME
@@ -32,6 +52,34 @@ DEFAULT_COLOR_SIZE = (1280, 720)
 DEFAULT_COLOR_FPS = 30
 DEFAULT_DEPTH_SIZE = (640, 480)
 DEFAULT_DEPTH_FPS = 30
+COLOR_FORMATS = ("auto", "yuyv", "bgr8")
+FRAME_RING_SIZE = 3
+CAPTURE_POLL_TIMEOUT = 100  # ms, keeps the capture thread responsive to stop()
+MAX_PLAYBACK_SLEEP = 0.05  # s, longest the replay source blocks the world loop
+PLAYBACK_MODES = ("real-time", "fixed-rate", "fast")
+BAG_POLL_TIMEOUT = 50  # ms, how often a .bag playback is checked for its end
+BAG_MAX_SKIPPED_FRAMES = 64  # repeated or stale framesets before a read gives up
+
+# device recovery
+STATE_STREAMING = "streaming"
+STATE_RECOVERING = "recovering"
+STATE_FAILED = "failed"
+RECOVERY_BACKOFF_MIN = 0.1  # s
+RECOVERY_BACKOFF_MAX = 5.0  # s
+RECOVERY_MAX_ATTEMPTS = 8  # before the state switches to failed
+RECOVERY_IDLE_SLEEP = 0.005  # s, keeps the world loop from spinning while offline
+
+# depth post-processing, in the order the filters are applied
+DEPTH_FILTERS = ("decimation", "spatial", "temporal", "hole_filling")
+DEPTH_FILTER_LABELS = {
+    "decimation": "Decimation",
+    "spatial": "Spatial (edge preserving)",
+    "temporal": "Temporal",
+    "hole_filling": "Hole Filling",
+}
+FILTER_TIMING_SMOOTHING = 0.1  # EWMA weight of the newest sample
+IMU_MODES = ("off", "device", "synthetic")
+IMU_MODE_LABELS = ["Off", "Device (gyro/accel)", "Synthetic (testing)"]
 
 
 class Old_Base_Source(Plugin):
@@ -76,7 +124,8 @@ class Old_Base_Source(Plugin):
         if self._recent_frame is not None:
             frame = self._recent_frame
             if (
-                frame.yuv_buffer is not None
+                not isinstance(frame, BGRFrame)
+                and frame.yuv_buffer is not None
                 # TODO: Find a better solution than this:
                 and getattr(self.g_pool, "display_mode", "") != "algorithm"
             ):
@@ -119,18 +168,34 @@ class ColorFrame(object):
         self.index = index
 
         self.data = data[:, :, np.newaxis].view(dtype=np.uint8)
-        total_size = self.data.size
-        y_plane = total_size // 2
-        u_plane = y_plane // 2
-        self._yuv = np.empty(total_size, dtype=np.uint8)
-        self._yuv[:y_plane] = self.data[:, :, 0].ravel()
-        self._yuv[y_plane : y_plane + u_plane] = self.data[:, ::2, 1].ravel()
-        self._yuv[y_plane + u_plane :] = self.data[:, 1::2, 1].ravel()
         self._shape = self.data.shape[:2]
 
+        # planar YUV422 is only built when a consumer asks for it
+        self._yuv = None
         self._bgr = None
         self._gray = None
 
+    def __del__(self):
+        if self._yuv is not None:
+            yuv, self._yuv = self._yuv, None
+            self._gray = None
+            frame_buffer_pool.release(yuv)
+
+    def _build_yuv(self):
+        total_size = self.data.size
+        y_plane = total_size // 2
+        u_plane = y_plane // 2
+        yuv = frame_buffer_pool.acquire((total_size,), np.uint8)
+        # write the planes straight into the pooled buffer, no temporaries
+        yuv[:y_plane].reshape(self._shape)[:] = self.data[:, :, 0]
+        yuv[y_plane : y_plane + u_plane].reshape(
+            self._shape[0], self._shape[1] // 2
+        )[:] = self.data[:, ::2, 1]
+        yuv[y_plane + u_plane :].reshape(self._shape[0], self._shape[1] // 2)[
+            :
+        ] = self.data[:, 1::2, 1]
+        self._yuv = yuv
+
     @property
     def height(self):
         return self._shape[0]
@@ -141,13 +206,16 @@ class ColorFrame(object):
 
     @property
     def yuv_buffer(self):
+        if self._yuv is None:
+            self._build_yuv()
         return self._yuv
 
     @property
     def yuv422(self):
-        Y = self._yuv[: self._yuv.size // 2]
-        U = self._yuv[self._yuv.size // 2 : 3 * self._yuv.size // 4]
-        V = self._yuv[3 * self._yuv.size // 4 :]
+        yuv = self.yuv_buffer
+        Y = yuv[: yuv.size // 2]
+        U = yuv[yuv.size // 2 : 3 * yuv.size // 4]
+        V = yuv[3 * yuv.size // 4 :]
 
         Y.shape = self._shape
         U.shape = self._shape[0], self._shape[1] // 2
@@ -168,20 +236,99 @@ class ColorFrame(object):
     @property
     def gray(self):
         if self._gray is None:
-            self._gray = self._yuv[: self._yuv.size // 2]
+            yuv = self.yuv_buffer
+            self._gray = yuv[: yuv.size // 2]
             self._gray.shape = self._shape
         return self._gray
 
 
-class DepthFrame(object):
+class BGRFrame(ColorFrame):
+    """Color frame for streams negotiated as BGR8.
+
+    `bgr` is served zero-copy from the librealsense buffer, planar YUV422 and
+    gray are only derived when a consumer asks for them.
+    """
+
     def __init__(self, data, timestamp, index):
         self.timestamp = timestamp
         self.index = index
 
+        self.data = data
+        self._shape = data.shape[:2]
+
+        self._yuv = None
+        self._bgr = data
+        self._gray = None
+
+    def __del__(self):
+        gray, self._gray = self._gray, None
+        super().__del__()
+        if gray is not None:
+            frame_buffer_pool.release(gray)
+
+    def _build_yuv(self):
+        height, width = self._shape
+        y_plane = height * width
+        u_plane = y_plane // 2
+        yuv444 = frame_buffer_pool.acquire((height, width, 3), np.uint8)
+        cv2.cvtColor(self._bgr, cv2.COLOR_BGR2YUV, dst=yuv444)
+        yuv = frame_buffer_pool.acquire((2 * y_plane,), np.uint8)
+        yuv[:y_plane].reshape(height, width)[:] = yuv444[:, :, 0]
+        yuv[y_plane : y_plane + u_plane].reshape(height, width // 2)[
+            :
+        ] = yuv444[:, ::2, 1]
+        yuv[y_plane + u_plane :].reshape(height, width // 2)[:] = yuv444[:, ::2, 2]
+        frame_buffer_pool.release(yuv444)
+        self._yuv = yuv
+
+    @property
+    def bgr(self):
+        return self._bgr
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(
+                self._bgr,
+                cv2.COLOR_BGR2GRAY,
+                dst=frame_buffer_pool.acquire(self._shape, np.uint8),
+            )
+        return self._gray
+
+
+class DepthFrame(object):
+    def __init__(
+        self,
+        data,
+        timestamp,
+        index,
+        colormap_lut=None,
+        aligner=None,
+        intrinsics=None,
+        depth_scale=None,
+    ):
+        self.timestamp = timestamp
+        self.index = index
+
         self._bgr = None
         self._gray = None
+        self._aligned_depth = None
+        self._points = None
         self.depth = data
         self.yuv_buffer = None
+        self._colormap_lut = colormap_lut
+        self._aligner = aligner
+        self.intrinsics = intrinsics
+        self.depth_scale = depth_scale
+
+    def __del__(self):
+        if self._bgr is not None:
+            bgr, self._bgr = self._bgr, None
+            self._gray = None
+            frame_buffer_pool.release(bgr)
+        if self._aligned_depth is not None:
+            aligned, self._aligned_depth = self._aligned_depth, None
+            frame_buffer_pool.release(aligned)
 
     @property
     def height(self):
@@ -194,11 +341,60 @@ class DepthFrame(object):
     @property
     def bgr(self):
         if self._bgr is None:
-            self._bgr = cv2.applyColorMap(
-                cv2.convertScaleAbs(self.depth, alpha=0.03), cv2.COLORMAP_JET
+            lut = self._colormap_lut
+            if lut is None:
+                lut = depth_colormap_lut()
+            scratch = frame_buffer_pool.acquire(self.depth.shape, np.uint32)
+            self._bgr = colorize_depth(
+                self.depth,
+                lut,
+                out=frame_buffer_pool.acquire(self.depth.shape + (3,), np.uint8),
+                scratch=scratch,
             )
+            frame_buffer_pool.release(scratch)
         return self._bgr
 
+    @property
+    def aligned_depth(self):
+        """Depth registered to the color stream (color resolution, z16).
+
+        None if the source has no depth/color geometry for this frame.
+        """
+        if self._aligned_depth is None:
+            if self._aligner is None or self._aligner.shape != self.depth.shape:
+                return None
+            c = self._aligner.color_intrinsics
+            self._aligned_depth = self._aligner.align(
+                self.depth,
+                out=frame_buffer_pool.acquire((c.height, c.width), np.uint16),
+            )
+        return self._aligned_depth
+
+    @property
+    def points(self):
+        """(n, 3) float32 points in meters, one per valid depth pixel.
+
+        Depth camera frame (x right, y down, z forward). None if the source
+        does not know the depth intrinsics.
+        """
+        if self._points is None:
+            if self.intrinsics is None or self.depth_scale is None:
+                return None
+            rays = depth_ray_table(self.intrinsics, self.depth_scale)
+            if rays.shape[:2] != self.depth.shape:
+                return None
+            scratch = frame_buffer_pool.acquire(rays.shape, np.float32)
+            self._points = depth_to_points(self.depth, rays, out=scratch)
+            frame_buffer_pool.release(scratch)
+        return self._points
+
+    def point_cloud(self, voxel_size=0.0):
+        """Return `points`, averaged per voxel if `voxel_size` (m) is set."""
+        points = self.points
+        if points is None or not voxel_size:
+            return points
+        return voxel_downsample(points, voxel_size)
+
     @property
     def img(self):
         return self.bgr
@@ -210,6 +406,464 @@ class DepthFrame(object):
         return self._gray
 
 
+def _to_intrinsics(rs_intrinsics):
+    return Intrinsics(
+        rs_intrinsics.width,
+        rs_intrinsics.height,
+        rs_intrinsics.fx,
+        rs_intrinsics.fy,
+        rs_intrinsics.ppx,
+        rs_intrinsics.ppy,
+    )
+
+
+def _frame_latency(frame, receipt_time):
+    """Capture to receipt latency of a rs.frame in ms, None if unknown.
+
+    System and global timestamps share the host clock. Hardware clock
+    timestamps do not, so only the host side delivery time (time of arrival
+    metadata to receipt) can be measured for them.
+    """
+    domain = frame.get_frame_timestamp_domain()
+    if domain in (rs.timestamp_domain.system_time, rs.timestamp_domain.global_time):
+        return receipt_time - frame.get_timestamp()
+    if frame.supports_frame_metadata(rs.frame_metadata_value.time_of_arrival):
+        arrival = frame.get_frame_metadata(rs.frame_metadata_value.time_of_arrival)
+        return receipt_time - arrival
+    return None
+
+
+class CaptureThread(threading.Thread):
+    """Drains a librealsense pipeline into a FrameRing.
+
+    `wrap_frames` turns a `rs.composite_frame` into a (color, depth) pair,
+    `on_timeout` is called whenever a poll returns no frames.
+    If the pipeline fails the thread stores the error and exits; the owner
+    is expected to check `error` and restart the device.
+    """
+
+    def __init__(self, pipeline, wrap_frames, ring, on_timeout=None):
+        super().__init__(name="Realsense2 capture", daemon=True)
+        self.pipeline = pipeline
+        self.wrap_frames = wrap_frames
+        self.ring = ring
+        self.on_timeout = on_timeout
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        waited = 0
+        while not self._stop_event.is_set():
+            try:
+                frames = self.pipeline.wait_for_frames(CAPTURE_POLL_TIMEOUT)
+            except RuntimeError as re:
+                waited += CAPTURE_POLL_TIMEOUT
+                if self.on_timeout is not None and not self._stop_event.is_set():
+                    self.on_timeout()
+                if waited >= TIMEOUT and not self._stop_event.is_set():
+                    logger.error("CaptureThread: Timeout!")
+                    self.error = re
+                    return
+                continue
+            waited = 0
+            color, depth = self.wrap_frames(frames)
+            if color is not None or depth is not None:
+                self.ring.push((color, depth))
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(CAPTURE_POLL_TIMEOUT / 1000 + 0.5)
+
+
+class DeviceCaptureThread(CaptureThread):
+    """Captures one additional Realsense device.
+
+    Starts the device's pipeline itself, so neither starting the device nor
+    waiting for its frames blocks the world loop.
+    """
+
+    def __init__(self, serial, pipeline, config, wrap_frames, ring, on_timeout=None):
+        super().__init__(pipeline, wrap_frames, ring, on_timeout)
+        self.name = "Realsense2 capture " + serial
+        self.serial = serial
+        self.config = config
+        self.profile = None
+
+    def run(self):
+        try:
+            self.profile = self.pipeline.start(self.config)
+        except RuntimeError as re:
+            logger.error("Cannot start pipeline of {}: {}".format(self.serial, re))
+            self.error = re
+            return
+        try:
+            super().run()
+        finally:
+            try:
+                self.pipeline.stop()
+            except RuntimeError:
+                pass  # device is gone
+
+
+class DeviceInventory(object):
+    """Cache of connected devices and their stream modes.
+
+    Filled on first use and invalidated by librealsense device-change
+    callbacks, so menu redraws, restarts and startup don't hit USB
+    enumeration again.
+    """
+
+    def __init__(self, context, on_change=None):
+        self.context = context
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._devices = None
+        self._modes = {}
+        self.context.set_devices_changed_callback(self._on_devices_changed)
+
+    def _on_devices_changed(self, event):
+        # called from a librealsense thread
+        logger.debug("Realsense devices changed, invalidating inventory.")
+        self.invalidate()
+        if self.on_change is not None:
+            self.on_change()
+
+    def invalidate(self):
+        with self._lock:
+            self._devices = None
+            self._modes = {}
+
+    def close(self):
+        self.on_change = None
+        self.context.set_devices_changed_callback(lambda event: None)
+        self.invalidate()
+
+    def devices(self):
+        """Return {serial: rs.device} of all connected devices."""
+        with self._lock:
+            if self._devices is None:
+                self._devices = {}
+                for d in self.context.query_devices():
+                    try:
+                        serial = d.get_info(rs.camera_info.serial_number)
+                    except RuntimeError as re:
+                        logger.error("Device no longer available " + str(re))
+                    else:
+                        self._devices[serial] = d
+            return self._devices
+
+    def serials(self):
+        return list(self.devices())
+
+    def modes(self, device_id, color_format=rs.format.yuyv):
+        """Return {stream: {resolution: [fps]}} for the given serial, color
+        modes for `color_format` (not every mode offers every format)."""
+        device = self.devices().get(device_id)
+        if device is None:
+            return {}
+        with self._lock:
+            if device_id not in self._modes:
+                self._modes[device_id] = self._query_modes(device)
+            modes = self._modes[device_id]
+        wanted = {rs.stream.depth: rs.format.z16, rs.stream.color: color_format}
+        return {
+            stream: modes[(stream, fmt)]
+            for stream, fmt in wanted.items()
+            if (stream, fmt) in modes
+        }
+
+    @staticmethod
+    def _query_modes(device):
+        formats = {}
+        sensors = device.query_sensors()
+        for s in sensors:
+            stream_profiles = s.get_stream_profiles()
+            for sp in stream_profiles:
+                vp = sp.as_video_stream_profile()
+                stream_type = vp.stream_type()
+
+                if stream_type not in (rs.stream.color, rs.stream.depth):
+                    continue
+                elif vp.format() not in (rs.format.z16, rs.format.yuyv, rs.format.bgr8):
+                    continue
+
+                key = (stream_type, vp.format())
+                formats.setdefault(key, {})
+                stream_resolution = (vp.width(), vp.height())
+                formats[key].setdefault(stream_resolution, []).append(vp.fps())
+
+        return formats
+
+
+class DepthPostProcessor(object):
+    """Runs librealsense depth filters on a worker thread.
+
+    Depth frames are handed over through a single slot (the newest frame
+    wins), the newest processed frame is picked up without blocking. The
+    cost of every filter is tracked as an exponential moving average in ms.
+    """
+
+    def __init__(self, enabled=None, decimation_magnitude=2):
+        self.filters = {
+            "decimation": rs.decimation_filter(),
+            "spatial": rs.spatial_filter(),
+            "temporal": rs.temporal_filter(),
+            "hole_filling": rs.hole_filling_filter(),
+        }
+        self.enabled = {name: name == "decimation" for name in DEPTH_FILTERS}
+        self.enabled.update(enabled or {})
+        self.timings = {name: 0.0 for name in DEPTH_FILTERS}
+        self.decimation_magnitude = decimation_magnitude
+
+        self._input = None
+        self._output = None
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="Realsense2 depth filters", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def decimation_magnitude(self):
+        return self._decimation_magnitude
+
+    @decimation_magnitude.setter
+    def decimation_magnitude(self, value):
+        self._decimation_magnitude = int(value)
+        self.filters["decimation"].set_option(
+            rs.option.filter_magnitude, self._decimation_magnitude
+        )
+
+    def submit(self, frame, timestamp, index):
+        with self._cond:
+            self._input = (frame, timestamp, index)
+            self._cond.notify()
+
+    def poll(self):
+        """Return (depth, timestamp, index) of the newest processed frame or None."""
+        with self._cond:
+            output, self._output = self._output, None
+        return output
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._input is None and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                (frame, timestamp, index), self._input = self._input, None
+
+            for name in DEPTH_FILTERS:
+                if not self.enabled[name]:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    frame = self.filters[name].process(frame)
+                except RuntimeError as re:
+                    logger.error("Depth filter {} failed: {}".format(name, re))
+                    continue
+                elapsed = (time.perf_counter() - t0) * 1000
+                self.timings[name] += FILTER_TIMING_SMOOTHING * (
+                    elapsed - self.timings[name]
+                )
+
+            depth = np.asanyarray(frame.get_data())
+            with self._cond:
+                self._output = (depth, timestamp, index)
+
+
+class MotionCapture(object):
+    """Streams gyro and accel samples of a Realsense device into an ImuRing.
+
+    Uses a sensor callback, i.e. runs on a librealsense thread at the native
+    IMU rates, independent of the color/depth pipeline. Samples are stamped
+    with the Pupil clock, corrected by the capture latency if the timestamp
+    domain allows to measure it.
+    """
+
+    def __init__(self, device, ring, get_timestamp):
+        self.ring = ring
+        self.get_timestamp = get_timestamp
+        self.sensor = device.first_motion_sensor()
+        # fastest motion_xyz32f profile per stream
+        profiles = {}
+        for sp in self.sensor.get_stream_profiles():
+            stream = sp.stream_type()
+            if stream not in (rs.stream.accel, rs.stream.gyro):
+                continue
+            if sp.format() != rs.format.motion_xyz32f:
+                continue
+            if stream not in profiles or sp.fps() > profiles[stream].fps():
+                profiles[stream] = sp
+        if not profiles:
+            raise RuntimeError("Motion sensor offers no gyro/accel streams")
+        self.sensor.open(list(profiles.values()))
+        self.sensor.start(self._on_frame)
+
+    def _on_frame(self, frame):
+        timestamp = self.get_timestamp()
+        latency = _frame_latency(frame, time.time() * 1000)
+        if latency is not None:
+            timestamp -= latency / 1000
+        if frame.get_profile().stream_type() == rs.stream.gyro:
+            kind = IMU_GYRO
+        else:
+            kind = IMU_ACCEL
+        data = frame.as_motion_frame().get_motion_data()
+        self.ring.push(timestamp, kind, data.x, data.y, data.z)
+
+    def stop(self):
+        try:
+            self.sensor.stop()
+            self.sensor.close()
+        except RuntimeError as re:
+            logger.debug("Cannot stop the motion sensor: " + str(re))
+
+
+def _pick_mode(modes, stream, frame_size, fps):
+    """Return (frame_size, fps) for `stream`, falling back to the largest mode.
+
+    None if the device does not offer the stream at all.
+    """
+    sizes = modes.get(stream)
+    if not sizes:
+        return None
+    if frame_size not in sizes:
+        frame_size = max(sizes)
+    if fps not in sizes[frame_size]:
+        fps = max(sizes[frame_size])
+    return frame_size, fps
+
+
+class SecondaryDevice(object):
+    """An additional Realsense camera next to the one providing world frames.
+
+    Runs its own pipeline on a DeviceCaptureThread. Frames are stamped with
+    the Pupil clock on receipt, like the main device's, and picked up by the
+    world loop through a FrameRing without blocking.
+    """
+
+    def __init__(
+        self,
+        serial,
+        pipeline,
+        modes,
+        color_format,
+        get_timestamp,
+        colormap_lut=None,
+        config_factory=rs.config,
+    ):
+        self.serial = serial
+        self.get_timestamp = get_timestamp
+        self.colormap_lut = colormap_lut
+        self.ring = FrameRing(FRAME_RING_SIZE)
+        self.stream_stats = {
+            rs.stream.color: StreamStats("color " + serial),
+            rs.stream.depth: StreamStats("depth " + serial),
+        }
+        self.color_frame_index = 0
+        self.depth_frame_index = 0
+        self._depth_geometry = None
+
+        config = config_factory()
+        config.enable_device(serial)
+        self.streams = []
+        color_mode = _pick_mode(
+            modes, rs.stream.color, DEFAULT_COLOR_SIZE, DEFAULT_COLOR_FPS
+        )
+        if color_mode is not None:
+            (width, height), fps = color_mode
+            config.enable_stream(rs.stream.color, width, height, color_format, fps)
+            self.streams.append(rs.stream.color)
+        depth_mode = _pick_mode(
+            modes, rs.stream.depth, DEFAULT_DEPTH_SIZE, DEFAULT_DEPTH_FPS
+        )
+        if depth_mode is not None:
+            (width, height), fps = depth_mode
+            config.enable_stream(rs.stream.depth, width, height, rs.format.z16, fps)
+            self.streams.append(rs.stream.depth)
+
+        self.thread = DeviceCaptureThread(
+            serial, pipeline, config, self._wrap_frames, self.ring, self._record_timeout
+        )
+        self.thread.start()
+
+    @property
+    def error(self):
+        return self.thread.error
+
+    def poll(self):
+        """Return the newest (color, depth) pair or None, never blocks."""
+        if self.thread.error is not None:
+            raise RuntimeError(self.thread.error)
+        return self.ring.pop_latest()
+
+    def stop(self):
+        self.thread.stop()
+
+    def _record_timeout(self):
+        for stream in self.streams:
+            self.stream_stats[stream].record_timeout()
+
+    def _wrap_frames(self, frames):
+        # runs on the capture thread
+        current_time = self.get_timestamp()
+        receipt_time = time.time() * 1000
+
+        color = None
+        if rs.stream.color in self.streams:
+            color_frame = frames.get_color_frame()
+            if color_frame and self.stream_stats[rs.stream.color].record(
+                color_frame.get_frame_number(),
+                _frame_latency(color_frame, receipt_time),
+            ):
+                if color_frame.get_profile().format() == rs.format.bgr8:
+                    frame_class = BGRFrame
+                else:
+                    frame_class = ColorFrame
+                color = frame_class(
+                    np.asanyarray(color_frame.get_data()),
+                    current_time,
+                    self.color_frame_index,
+                )
+                self.color_frame_index += 1
+
+        depth = None
+        if rs.stream.depth in self.streams:
+            depth_frame = frames.get_depth_frame()
+            if depth_frame and self.stream_stats[rs.stream.depth].record(
+                depth_frame.get_frame_number(),
+                _frame_latency(depth_frame, receipt_time),
+            ):
+                if self._depth_geometry is None:
+                    profile = depth_frame.get_profile().as_video_stream_profile()
+                    depth_sensor = self.thread.profile.get_device().first_depth_sensor()
+                    self._depth_geometry = (
+                        _to_intrinsics(profile.get_intrinsics()),
+                        depth_sensor.get_depth_scale(),
+                    )
+                depth = DepthFrame(
+                    np.asanyarray(depth_frame.get_data()),
+                    current_time,
+                    self.depth_frame_index,
+                    self.colormap_lut,
+                    None,
+                    *self._depth_geometry
+                )
+                self.depth_frame_index += 1
+
+        return color, depth
+
+
 class Realsense2_Source(Old_Base_Source):
     def __init__(
         self,
@@ -222,19 +876,81 @@ class Realsense2_Source(Old_Base_Source):
         preview_depth=False,
         device_options=(),
         record_depth=True,
+        threaded_capture=False,
+        depth_near=DEFAULT_DEPTH_NEAR,
+        depth_far=DEFAULT_DEPTH_FAR,
+        depth_recording_format="mpeg",
+        depth_raw_compression="none",
+        record_color_raw=False,
+        color_format="auto",
+        depth_post_processing=False,
+        depth_filters=None,
+        decimation_magnitude=2,
+        secondary_devices=(),
+        imu_mode="off",
+        pipeline_factory=None,
+        context_factory=None,
+        config_factory=None,
         **kwargs
     ):
         super().__init__(g_pool, **kwargs)
+        # librealsense by default, replaceable by stand-ins without hardware
+        # (see tests/fake_realsense.py)
+        self.pipeline_factory = pipeline_factory or rs.pipeline
+        self.context_factory = context_factory or rs.context
+        self.config_factory = config_factory or rs.config
         self._intrinsics = None
+        self._color_format = color_format
+        self._depth_near = depth_near
+        self._depth_far = depth_far
+        self._depth_colormap_lut = depth_colormap_lut(depth_near, depth_far)
+        self._threaded_capture = threaded_capture
+        self._capture_thread = None
+        self._frame_ring = FrameRing(FRAME_RING_SIZE)
         self.color_frame_index = 0
         self.depth_frame_index = 0
-        self.context = rs.context()
-        self.pipeline = rs.pipeline(self.context)
+        self.stream_stats = {
+            rs.stream.color: StreamStats("color"),
+            rs.stream.depth: StreamStats("depth"),
+        }
+        self.context = self.context_factory()
+        self.inventory = DeviceInventory(
+            self.context, on_change=self._on_devices_changed
+        )
+        self.pipeline = self.pipeline_factory(self.context)
         self.pipeline_profile = None
+        self._device_id = None
+        self._depth_geometry = None
+        self._aligner_params = None
+        self._aligner_key = None
+        self._aligners = {}
+        self._depth_filters = dict(depth_filters or {})
+        self._decimation_magnitude = decimation_magnitude
+        self._post_processor = None
+        if depth_post_processing:
+            self.start_post_processing()
+        self._secondary_serials = list(secondary_devices)
+        self._secondary_devices = {}
+        self._secondary_dirty = True
+        self._imu_mode = imu_mode
+        self._imu_ring = ImuRing()
+        self._imu = None
         self.preview_depth = preview_depth
         self.record_depth = record_depth
         self.depth_video_writer = None
+        self.depth_raw_writer = None
+        self._depth_recording_format = depth_recording_format
+        self.depth_raw_compression = depth_raw_compression
+        self.record_color_raw = record_color_raw
+        self.color_raw_writer = None
         self._needs_restart = False
+        # g_pool.plugins does not exist yet, negotiate again on the first frame
+        self._color_format_settled = False
+        self._state = STATE_STREAMING
+        self._recovery_attempts = 0
+        self._recovery_thread = None
+        self._recovery_stop = threading.Event()
+        self._recovery_wakeup = threading.Event()
         self.frame_size_backup = DEFAULT_COLOR_SIZE
         self.depth_frame_size_backup = DEFAULT_DEPTH_SIZE
         self.frame_rate_backup = DEFAULT_COLOR_FPS
@@ -247,6 +963,8 @@ class Realsense2_Source(Old_Base_Source):
             depth_frame_rate,
             device_options,
         )
+        if self._imu_mode == "synthetic":
+            self.start_imu()
         logger.debug("_init_ completed")
 
     def _initialize_device(
@@ -258,6 +976,7 @@ class Realsense2_Source(Old_Base_Source):
         depth_fps,
         device_options=(),
     ):
+        self.stop_recovery()
         self.stop_pipeline()
         self.last_color_frame_ts = None
         self.last_depth_frame_ts = None
@@ -307,10 +1026,10 @@ class Realsense2_Source(Old_Base_Source):
             self.depth_frame_rate_backup = depth_fps
 
             config = self._prep_configuration(
-                color_frame_size, color_fps, depth_frame_size, depth_fps
+                color_frame_size, color_fps, depth_frame_size, depth_fps, device_id
             )
         else:
-            config = self._get_default_config()
+            config = self._get_default_config(device_id)
             self.frame_size_backup = DEFAULT_COLOR_SIZE
             self.depth_frame_size_backup = DEFAULT_DEPTH_SIZE
             self.frame_rate_backup = DEFAULT_COLOR_FPS
@@ -326,12 +1045,22 @@ class Realsense2_Source(Old_Base_Source):
                 s.stream_type(): s.as_video_stream_profile()
                 for s in self.pipeline_profile.get_streams()
             }
+            self._device_id = self.pipeline_profile.get_device().get_info(
+                rs.camera_info.serial_number
+            )
             logger.debug("Pipeline started for device " + device_id)
             logger.debug("Stream profiles: " + str(self.stream_profiles))
+            self._update_aligner(self.pipeline_profile)
+            self._secondary_dirty = True
+            if self._imu_mode == "device":
+                self.start_imu()
 
             self._intrinsics = Camera_Model.from_file(
                 self.g_pool.user_dir, self.name, self.frame_size
             )
+            if self._threaded_capture:
+                self.start_capture_thread()
+            self._state = STATE_STREAMING
             self.update_menu()
             self._needs_restart = False
 
@@ -341,11 +1070,15 @@ class Realsense2_Source(Old_Base_Source):
         color_fps=None,
         depth_frame_size=None,
         depth_fps=None,
+        device_id=None,
     ):
-        config = rs.config()
+        config = self.config_factory()
+        if device_id is not None:
+            # otherwise librealsense binds any free device, e.g. a secondary one
+            config.enable_device(device_id)
 
-        # only use these two formats
-        color_format = rs.format.yuyv
+        # only use these formats
+        color_format = self._negotiate_color_format()
         depth_format = rs.format.z16
 
         config.enable_stream(
@@ -366,13 +1099,15 @@ class Realsense2_Source(Old_Base_Source):
 
         return config
 
-    def _get_default_config(self):
-        config = rs.config()  # default config is RGB8, we want YUYV
+    def _get_default_config(self, device_id=None):
+        config = self.config_factory()  # default config is RGB8, we want YUYV
+        if device_id is not None:
+            config.enable_device(device_id)
         config.enable_stream(
             rs.stream.color,
             DEFAULT_COLOR_SIZE[0],
             DEFAULT_COLOR_SIZE[1],
-            rs.format.yuyv,
+            self._negotiate_color_format(),
             DEFAULT_COLOR_FPS,
         )
         config.enable_stream(
@@ -384,6 +1119,92 @@ class Realsense2_Source(Old_Base_Source):
         )
         return config
 
+    def _negotiate_color_format(self):
+        """Pick the color stream format for the active consumers.
+
+        BGR8 is converted by librealsense off the world thread, which pays off
+        as soon as a plugin needs `frame.img`/`frame.bgr` (object detection,
+        ROS). If only the GL preview runs YUYV is cheaper, it is uploaded as is.
+        """
+        if self.color_format == "bgr8":
+            return rs.format.bgr8
+        if self.color_format == "yuyv":
+            return rs.format.yuyv
+        if self._bgr_consumers_active():
+            return rs.format.bgr8
+        return rs.format.yuyv
+
+    def _bgr_consumers_active(self):
+        plugins = getattr(self.g_pool, "plugins", None) or ()
+        return any(getattr(p, "uses_bgr_frames", False) and p.alive for p in plugins)
+
+    def _current_color_format(self):
+        try:
+            return self.stream_profiles[rs.stream.color].format()
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def _renegotiate_color_format(self):
+        if not self.online:
+            return
+        if self._negotiate_color_format() != self._current_color_format():
+            logger.debug("Color consumers changed, renegotiating color format.")
+            self.restart_device()
+
+    def _update_aligner(self, pipeline_profile):
+        """Reset the depth geometry and the depth to color reprojection maps.
+
+        Only happens when the stream geometry changed, a restart with the same
+        stream modes keeps the existing maps.
+        """
+        stream_profiles = self.stream_profiles or {}
+        depth_profile = stream_profiles.get(rs.stream.depth)
+        color_profile = stream_profiles.get(rs.stream.color)
+        if depth_profile is None:
+            self._depth_geometry = None
+        else:
+            depth_sensor = pipeline_profile.get_device().first_depth_sensor()
+            self._depth_geometry = (
+                _to_intrinsics(depth_profile.get_intrinsics()),
+                depth_sensor.get_depth_scale(),
+            )
+        if depth_profile is None or color_profile is None:
+            self._aligner_params = None
+            self._aligner_key = None
+            self._aligners = {}
+            return
+        depth_intrinsics, depth_scale = self._depth_geometry
+        color_intrinsics = _to_intrinsics(color_profile.get_intrinsics())
+        key = (self._device_id, depth_intrinsics, color_intrinsics)
+        if key == self._aligner_key:
+            return
+        extrinsics = depth_profile.get_extrinsics_to(color_profile)
+        self._aligner_params = (
+            depth_intrinsics,
+            color_intrinsics,
+            extrinsics.rotation,
+            extrinsics.translation,
+            depth_scale,
+        )
+        self._aligner_key = key
+        self._aligners = {}
+        logger.debug("Depth to color geometry changed, reprojection maps reset.")
+
+    def _aligner_for(self, shape):
+        """Return the reprojection maps for depth images of `shape`.
+
+        Built once per shape, e.g. for the decimated depth stream.
+        """
+        if self._aligner_params is None:
+            return None
+        aligner = self._aligners.get(shape)
+        if aligner is None:
+            depth_intrinsics, color_intrinsics, *extrinsics = self._aligner_params
+            depth_intrinsics = scale_intrinsics(depth_intrinsics, shape[1], shape[0])
+            aligner = DepthAligner(depth_intrinsics, color_intrinsics, *extrinsics)
+            self._aligners[shape] = aligner
+        return aligner
+
     def _get_valid_frame_rate(self, stream_type, frame_size, fps):
         assert stream_type == rs.stream.color or stream_type == rs.stream.depth
 
@@ -430,47 +1251,209 @@ class Realsense2_Source(Old_Base_Source):
         streams:
             resolutions:
                 framerates
+
+        Served from the device inventory cache.
         """
-        formats = {}
+        if self.inventory is None:
+            return {}
+        return self.inventory.modes(device_id, self._negotiate_color_format())
+
+    def start_capture_thread(self):
+        self.stop_capture_thread()
+        self._frame_ring.clear()
+        self._capture_thread = CaptureThread(
+            self.pipeline, self._wrap_frames, self._frame_ring, self._record_timeout
+        )
+        self._capture_thread.start()
+        logger.debug("Capture thread started.")
 
-        if self.context is None:
-            return formats
+    def stop_capture_thread(self):
+        if self._capture_thread is not None:
+            self._capture_thread.stop()
+            self._capture_thread = None
+            logger.debug("Capture thread stopped.")
 
-        devices = self.context.query_devices()
-        current_device = None
+    def start_recovery(self):
+        """Restart the pipeline on a supervisor thread with exponential backoff.
 
-        for d in devices:
-            try:
-                serial = d.get_info(rs.camera_info.serial_number)
-            except RuntimeError as re:
-                logger.error("Device no longer available " + str(re))
-            else:
-                if device_id == serial:
-                    current_device = d
+        The world loop keeps running while the camera reconnects, the result
+        is picked up in `recent_events` once the thread finished.
+        """
+        if self._recovery_thread is not None:
+            return
+        self.stop_capture_thread()
+        if self._imu_mode == "device":
+            self.stop_imu()
+        self._recent_frame = None
+        self._recent_depth_frame = None
+        self._state = STATE_RECOVERING
+        self._recovery_attempts = 0
+        self._recovery_stop.clear()
+        self._recovery_wakeup.clear()
+        self._recovery_thread = threading.Thread(
+            target=self._recover, name="Realsense2 recovery", daemon=True
+        )
+        self._recovery_thread.start()
+        self.update_menu()
 
-        if current_device is None:
-            return formats
-        logger.debug("Found the current device: " + device_id)
+    def stop_recovery(self):
+        if self._recovery_thread is None:
+            return
+        self._recovery_stop.set()
+        self._recovery_wakeup.set()
+        self._recovery_thread.join()
+        self._recovery_thread = None
 
-        sensors = current_device.query_sensors()
-        for s in sensors:
-            stream_profiles = s.get_stream_profiles()
-            for sp in stream_profiles:
-                vp = sp.as_video_stream_profile()
-                stream_type = vp.stream_type()
+    def _wake_recovery(self):
+        # a device was (dis)connected, retry right away
+        self._recovery_wakeup.set()
 
-                if stream_type not in (rs.stream.color, rs.stream.depth):
-                    continue
-                elif vp.format() not in (rs.format.z16, rs.format.yuyv):
-                    continue
+    def _on_devices_changed(self):
+        # called from a librealsense thread
+        self._secondary_dirty = True
+        self._wake_recovery()
 
-                formats.setdefault(stream_type, {})
-                stream_resolution = (vp.width(), vp.height())
-                formats[stream_type].setdefault(stream_resolution, []).append(vp.fps())
+    def _sync_secondary_devices(self):
+        """Start/stop secondary devices to match selection and connected devices.
 
-        return formats
+        Cheap, device start up happens on the devices' capture threads.
+        """
+        self._secondary_dirty = False
+        connected = set(self.inventory.serials())
+        wanted = {
+            serial
+            for serial in self._secondary_serials
+            if serial in connected and serial != self._device_id
+        }
+        running = set(self._secondary_devices)
+        for serial in running - wanted:
+            self._secondary_devices.pop(serial).stop()
+        for serial in wanted - running:
+            self._secondary_devices[serial] = SecondaryDevice(
+                serial,
+                self.pipeline_factory(self.context),
+                self.inventory.modes(serial, self._negotiate_color_format()),
+                self._negotiate_color_format(),
+                self.g_pool.get_timestamp,
+                self._depth_colormap_lut,
+                self.config_factory,
+            )
+            logger.debug("Secondary device {} started.".format(serial))
+        self.update_menu()
+
+    def stop_secondary_devices(self):
+        for device in self._secondary_devices.values():
+            device.stop()
+        self._secondary_devices = {}
+        self._secondary_dirty = True
+
+    def _poll_secondary_devices(self, events):
+        if self._secondary_dirty:
+            self._sync_secondary_devices()
+        for serial, device in list(self._secondary_devices.items()):
+            try:
+                frames = device.poll()
+            except RuntimeError as re:
+                logger.warning("Realsense {} failed: {}".format(serial, re))
+                self._secondary_devices.pop(serial).stop()
+                self.update_menu()
+                continue
+            if frames is None:
+                continue
+            color, depth = frames
+            if color is not None:
+                events["frame/" + serial] = color
+            if depth is not None:
+                events["depth_frame/" + serial] = depth
+
+    def set_secondary_device(self, serial, enabled):
+        if enabled and serial not in self._secondary_serials:
+            self._secondary_serials.append(serial)
+        elif not enabled and serial in self._secondary_serials:
+            self._secondary_serials.remove(serial)
+        self._secondary_dirty = True
+
+    def _recover(self):
+        backoff = RECOVERY_BACKOFF_MIN
+        while not self._recovery_stop.is_set():
+            self._recovery_attempts += 1
+            if self._restart_pipeline():
+                return
+            if self._recovery_attempts >= RECOVERY_MAX_ATTEMPTS:
+                self._state = STATE_FAILED
+            self._recovery_wakeup.wait(backoff)
+            self._recovery_wakeup.clear()
+            backoff = min(backoff * 2, RECOVERY_BACKOFF_MAX)
+
+    def _restart_pipeline(self):
+        # runs on the recovery thread, must not touch the UI
+        self.pipeline_profile = None
+        self.stream_profiles = None
+        try:
+            self.pipeline.stop()
+        except RuntimeError:
+            pass  # was not running
+
+        device_id = self._device_id
+        serials = self.inventory.serials()
+        if device_id not in serials:
+            device_id = serials[0] if serials else None
+        if device_id is None:
+            logger.debug(
+                "Recovery attempt {}: no device.".format(self._recovery_attempts)
+            )
+            return False
+
+        self._available_modes = self._enumerate_formats(device_id)
+        config = self._prep_configuration(
+            self.frame_size_backup,
+            self.frame_rate_backup,
+            self.depth_frame_size_backup,
+            self.depth_frame_rate_backup,
+            device_id,
+        )
+        try:
+            profile = self.pipeline.start(config)
+        except RuntimeError as re:
+            logger.debug(
+                "Recovery attempt {} failed: {}".format(self._recovery_attempts, re)
+            )
+            return False
+
+        self.stream_profiles = {
+            s.stream_type(): s.as_video_stream_profile() for s in profile.get_streams()
+        }
+        self._device_id = device_id
+        self._update_aligner(profile)
+        self.last_color_frame_ts = None
+        self.last_depth_frame_ts = None
+        # set last, this makes the source `online` again
+        self.pipeline_profile = profile
+        return True
+
+    def _finish_recovery(self):
+        self._recovery_thread = None
+        if not self.online:
+            return
+        logger.info(
+            "Realsense recovered after {} attempt(s).".format(self._recovery_attempts)
+        )
+        self._intrinsics = Camera_Model.from_file(
+            self.g_pool.user_dir, self.name, self.frame_size
+        )
+        if self._threaded_capture:
+            self.start_capture_thread()
+        self._state = STATE_STREAMING
+        self._needs_restart = False
+        self._secondary_dirty = True
+        if self._imu_mode == "device":
+            self.start_imu()
+        self.update_menu()
 
     def stop_pipeline(self):
+        self.stop_capture_thread()
+        if self._imu_mode == "device":
+            self.stop_imu()
         if self.online:
             try:
                 self.pipeline_profile = None
@@ -481,9 +1464,14 @@ class Realsense2_Source(Old_Base_Source):
                 logger.error("Cannot stop the pipeline: " + str(re))
 
     def cleanup(self):
-        if self.depth_video_writer is not None:
+        if self.depth_video_writer is not None or self.depth_raw_writer is not None:
             self.stop_depth_recording()
+        self.stop_recovery()
         self.stop_pipeline()
+        self.stop_secondary_devices()
+        self.stop_imu()
+        self.stop_post_processing()
+        self.inventory.close()
         super().cleanup()
 
     def get_init_dict(self):
@@ -496,58 +1484,203 @@ class Realsense2_Source(Old_Base_Source):
                 "depth_frame_rate": self.depth_frame_rate,
                 "preview_depth": self.preview_depth,
                 "record_depth": self.record_depth,
+                "threaded_capture": self.threaded_capture,
+                "depth_near": self.depth_near,
+                "depth_far": self.depth_far,
+                "depth_recording_format": self.depth_recording_format,
+                "depth_raw_compression": self.depth_raw_compression,
+                "record_color_raw": self.record_color_raw,
+                "color_format": self.color_format,
+                "depth_post_processing": self.depth_post_processing,
+                "depth_filters": self.depth_filters,
+                "decimation_magnitude": self.decimation_magnitude,
+                "secondary_devices": list(self._secondary_serials),
+                "imu_mode": self.imu_mode,
             }
         )
         return d
 
     def get_frames(self):
         if self.online:
+            if self._capture_thread is not None:
+                return self._get_frames_from_ring()
             try:
                 frames = self.pipeline.wait_for_frames(TIMEOUT)
             except RuntimeError as e:
                 logger.error("get_frames: Timeout!")
+                self._record_timeout()
                 raise RuntimeError(e)
             else:
-                current_time = self.g_pool.get_timestamp()
-
-                color = None
-                # if we're expecting color frames
-                if rs.stream.color in self.stream_profiles:
-                    color_frame = frames.get_color_frame()
-                    last_color_frame_ts = color_frame.get_timestamp()
-                    if self.last_color_frame_ts != last_color_frame_ts:
-                        self.last_color_frame_ts = last_color_frame_ts
-                        color = ColorFrame(
-                            np.asanyarray(color_frame.get_data()),
-                            current_time,
-                            self.color_frame_index,
-                        )
-                        self.color_frame_index += 1
-
-                depth = None
-                # if we're expecting depth frames
-                if rs.stream.depth in self.stream_profiles:
-                    depth_frame = frames.get_depth_frame()
-                    last_depth_frame_ts = depth_frame.get_timestamp()
-                    if self.last_depth_frame_ts != last_depth_frame_ts:
-                        self.last_depth_frame_ts = last_depth_frame_ts
-                        depth = DepthFrame(
-                            np.asanyarray(depth_frame.get_data()),
-                            current_time,
-                            self.depth_frame_index,
-                        )
-                        self.depth_frame_index += 1
-
-                return color, depth
+                return self._wrap_frames(frames)
         return None, None
 
+    def _get_frames_from_ring(self):
+        # never blocks, returns (None, None) if no new frameset arrived
+        if self._capture_thread.error is not None:
+            raise RuntimeError(self._capture_thread.error)
+        frames = self._frame_ring.pop_latest()
+        if frames is None:
+            return None, None
+        return frames
+
+    def _wrap_frames(self, frames):
+        current_time = self.g_pool.get_timestamp()
+        receipt_time = time.time() * 1000  # ms, host clock as used by librealsense
+
+        color = None
+        # if we're expecting color frames
+        if rs.stream.color in self.stream_profiles:
+            color_frame = frames.get_color_frame()
+            last_color_frame_ts = color_frame.get_timestamp()
+            fresh = self.stream_stats[rs.stream.color].record(
+                color_frame.get_frame_number(),
+                _frame_latency(color_frame, receipt_time),
+            )
+            if fresh and self.last_color_frame_ts != last_color_frame_ts:
+                self.last_color_frame_ts = last_color_frame_ts
+                if color_frame.get_profile().format() == rs.format.bgr8:
+                    frame_class = BGRFrame
+                else:
+                    frame_class = ColorFrame
+                color = frame_class(
+                    np.asanyarray(color_frame.get_data()),
+                    current_time,
+                    self.color_frame_index,
+                )
+                self.color_frame_index += 1
+
+        depth = None
+        # if we're expecting depth frames
+        if rs.stream.depth in self.stream_profiles:
+            depth_frame = frames.get_depth_frame()
+            last_depth_frame_ts = depth_frame.get_timestamp()
+            fresh = self.stream_stats[rs.stream.depth].record(
+                depth_frame.get_frame_number(),
+                _frame_latency(depth_frame, receipt_time),
+            )
+            if fresh and self.last_depth_frame_ts != last_depth_frame_ts:
+                self.last_depth_frame_ts = last_depth_frame_ts
+                if self._post_processor is not None:
+                    self._post_processor.submit(
+                        depth_frame, current_time, self.depth_frame_index
+                    )
+                else:
+                    depth = self._make_depth_frame(
+                        np.asanyarray(depth_frame.get_data()),
+                        current_time,
+                        self.depth_frame_index,
+                    )
+                self.depth_frame_index += 1
+
+        # filtered depth arrives asynchronously, with its capture time and index
+        if self._post_processor is not None:
+            processed = self._post_processor.poll()
+            if processed is not None:
+                depth = self._make_depth_frame(*processed)
+
+        return color, depth
+
+    def _record_timeout(self):
+        for stream in self.stream_profiles or {}:
+            self.stream_stats[stream].record_timeout()
+
+    def reset_stream_stats(self):
+        for stats in self.stream_stats.values():
+            stats.reset()
+        for device in self._secondary_devices.values():
+            for stats in device.stream_stats.values():
+                stats.reset()
+
+    def export_stream_stats(self):
+        path = os.path.join(
+            self.g_pool.user_dir,
+            "realsense_stream_stats_{}.csv".format(
+                datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            ),
+        )
+        stats = list(self.stream_stats.values())
+        for device in self._secondary_devices.values():
+            stats.extend(device.stream_stats.values())
+        write_stats_csv(path, stats)
+        logger.info("Stream statistics exported to {}".format(path))
+
+    def start_imu(self):
+        self.stop_imu()
+        self._imu_ring.clear()
+        if self._imu_mode == "synthetic":
+            self._imu = SyntheticImu(self._imu_ring, self.g_pool.get_timestamp)
+        elif self._imu_mode == "device" and self.online:
+            try:
+                self._imu = MotionCapture(
+                    self.pipeline_profile.get_device(),
+                    self._imu_ring,
+                    self.g_pool.get_timestamp,
+                )
+            except RuntimeError as re:
+                logger.warning("Cannot start the IMU streams: " + str(re))
+
+    def stop_imu(self):
+        if self._imu is not None:
+            self._imu.stop()
+            self._imu = None
+
+    def _poll_imu(self, events):
+        if self._imu is None:
+            return
+        samples = self._imu_ring.drain()
+        if len(samples):
+            events["imu"] = samples
+
+    def _make_depth_frame(self, data, timestamp, index):
+        intrinsics = depth_scale = None
+        if self._depth_geometry is not None:
+            intrinsics, depth_scale = self._depth_geometry
+            intrinsics = scale_intrinsics(intrinsics, data.shape[1], data.shape[0])
+        return DepthFrame(
+            data,
+            timestamp,
+            index,
+            self._depth_colormap_lut,
+            self._aligner_for(data.shape),
+            intrinsics,
+            depth_scale,
+        )
+
+    def start_post_processing(self):
+        self.stop_post_processing()
+        self._post_processor = DepthPostProcessor(
+            self._depth_filters, self._decimation_magnitude
+        )
+
+    def stop_post_processing(self):
+        if self._post_processor is not None:
+            self._depth_filters = dict(self._post_processor.enabled)
+            self._post_processor.stop()
+            self._post_processor = None
+
     def recent_events(self, events):
+        # additional cameras keep streaming while the main device recovers
+        self._poll_secondary_devices(events)
+        self._poll_imu(events)
+
+        if self._recovery_thread is not None:
+            if self._recovery_thread.is_alive():
+                time.sleep(RECOVERY_IDLE_SLEEP)
+                return
+            self._finish_recovery()
+
         if self._needs_restart or not self.online:
-            logger.debug("recent_events -> restarting device")
-            self.restart_device()
-            time.sleep(0.01)
+            logger.debug("recent_events -> recovering device")
+            self.start_recovery()
             return
 
+        if not self._color_format_settled:
+            # all plugins are loaded now, those restored from the session
+            # never sent a start_plugin notification
+            self._color_format_settled = True
+            if self.color_format == "auto":
+                self._renegotiate_color_format()
+
         try:
             color_frame, depth_frame = self.get_frames()
         except RuntimeError as re:
@@ -560,12 +1693,20 @@ class Realsense2_Source(Old_Base_Source):
                 self._recent_frame = color_frame
                 events["frame"] = color_frame
 
+                if self.color_raw_writer is not None:
+                    self.color_raw_writer.write(color_frame.data, color_frame.timestamp)
+
             if depth_frame is not None:
                 self._recent_depth_frame = depth_frame
                 events["depth_frame"] = depth_frame
 
                 if self.depth_video_writer is not None:
                     self.depth_video_writer.write_video_frame(depth_frame)
+                elif self.depth_raw_writer is not None:
+                    # only queues the frame, encoding happens off the world thread
+                    self.depth_raw_writer.write(
+                        depth_frame.depth, depth_frame.timestamp
+                    )
 
     def deinit_ui(self):
         self.remove_menu()
@@ -584,12 +1725,211 @@ class Realsense2_Source(Old_Base_Source):
 
         from pyglui import ui
 
+        self.menu.append(
+            ui.Text_Input(
+                "capture_state",
+                self,
+                label="State",
+                getter=lambda: self.capture_state,
+                setter=lambda _: None,
+            )
+        )
         if not self.online:
-            self.menu.append(ui.Info_Text("Capture initialization failed."))
+            if self._state == STATE_STREAMING:
+                self.menu.append(ui.Info_Text("Capture initialization failed."))
+            else:
+                self.menu.append(
+                    ui.Info_Text("Waiting for the camera, retrying with backoff.")
+                )
             return
 
         self.menu.append(ui.Switch("record_depth", self, label="Record Depth Stream"))
+        self.menu.append(
+            ui.Selector(
+                "depth_recording_format",
+                self,
+                selection=["mpeg", "raw"],
+                labels=["MPEG (colorized)", "Raw z16 (lossless)"],
+                label="Depth Recording Format",
+            )
+        )
+        if self.depth_recording_format == "raw":
+            compressions = available_compressions()
+            self.menu.append(
+                ui.Selector(
+                    "depth_raw_compression",
+                    self,
+                    selection=compressions,
+                    labels=compressions,
+                    label="Raw Depth Compression",
+                )
+            )
+            self.menu.append(
+                ui.Switch(
+                    "record_color_raw",
+                    self,
+                    label="Also record raw color (for replay)",
+                )
+            )
+            self.menu.append(
+                ui.Text_Input(
+                    "depth_raw_dropped",
+                    self,
+                    label="Dropped depth frames",
+                    getter=lambda: str(
+                        self.depth_raw_writer.dropped
+                        if self.depth_raw_writer is not None
+                        else 0
+                    ),
+                    setter=lambda _: None,
+                )
+            )
         self.menu.append(ui.Switch("preview_depth", self, label="Preview Depth"))
+        self.menu.append(
+            ui.Selector(
+                "color_format",
+                self,
+                selection=list(COLOR_FORMATS),
+                labels=["Auto (by active plugins)", "YUYV", "BGR8"],
+                label="Color Format",
+            )
+        )
+
+        depth_colors = ui.Growing_Menu(label="Depth Colorization")
+        depth_colors.append(
+            ui.Info_Text("Depth range mapped onto the colormap (in depth units).")
+        )
+        depth_colors.append(
+            ui.Slider("depth_near", self, min=0, max=10000, step=50, label="Near")
+        )
+        depth_colors.append(
+            ui.Slider("depth_far", self, min=50, max=20000, step=50, label="Far")
+        )
+        self.menu.append(depth_colors)
+
+        post_processing = ui.Growing_Menu(label="Depth Post-Processing")
+        post_processing.append(
+            ui.Switch("depth_post_processing", self, label="Enable (worker thread)")
+        )
+        if self._post_processor is not None:
+            post_processing.append(
+                ui.Slider(
+                    "decimation_magnitude",
+                    self,
+                    min=2,
+                    max=8,
+                    step=1,
+                    label="Decimation Magnitude",
+                )
+            )
+            for name in DEPTH_FILTERS:
+                post_processing.append(
+                    ui.Switch(
+                        name,
+                        self,
+                        label=DEPTH_FILTER_LABELS[name],
+                        getter=lambda name=name: self.depth_filters[name],
+                        setter=lambda value, name=name: self.set_depth_filter(
+                            name, value
+                        ),
+                    )
+                )
+                post_processing.append(
+                    ui.Text_Input(
+                        name + "_timing",
+                        self,
+                        label=DEPTH_FILTER_LABELS[name] + " [ms]",
+                        getter=lambda name=name: "{:.2f}".format(
+                            self._post_processor.timings[name]
+                            if self._post_processor is not None
+                            else 0.0
+                        ),
+                        setter=lambda _: None,
+                    )
+                )
+        self.menu.append(post_processing)
+
+        stream_stats = ui.Growing_Menu(label="Stream Statistics")
+        stream_stats.append(
+            ui.Info_Text(
+                "Received, dropped (frame number gaps), duplicate frames and "
+                "timeouts, followed by the capture to receipt latency "
+                "(p50/p95/max) of the last {} frames.".format(LATENCY_WINDOW)
+            )
+        )
+        all_stats = list(self.stream_stats.values())
+        for device in self._secondary_devices.values():
+            all_stats.extend(device.stream_stats.values())
+        for stats in all_stats:
+            stream_stats.append(
+                ui.Text_Input(
+                    stats.name.replace(" ", "_") + "_stats",
+                    self,
+                    label=stats.name.capitalize(),
+                    getter=stats.summary,
+                    setter=lambda _: None,
+                )
+            )
+        stream_stats.append(ui.Button("Reset statistics", self.reset_stream_stats))
+        stream_stats.append(ui.Button("Export as CSV", self.export_stream_stats))
+        self.menu.append(stream_stats)
+
+        secondary = ui.Growing_Menu(label="Additional Cameras")
+        secondary.append(
+            ui.Info_Text(
+                "Capture further Realsense devices on their own threads. Their "
+                "frames are published as 'frame/<serial>' and "
+                "'depth_frame/<serial>'."
+            )
+        )
+        serials = [s for s in self.inventory.serials() if s != self._device_id]
+        if not serials:
+            secondary.append(ui.Info_Text("No further devices connected."))
+        for serial in serials:
+            secondary.append(
+                ui.Switch(
+                    "secondary_" + serial,
+                    self,
+                    label=serial,
+                    getter=lambda serial=serial: serial in self._secondary_serials,
+                    setter=lambda value, serial=serial: self.set_secondary_device(
+                        serial, value
+                    ),
+                )
+            )
+        self.menu.append(secondary)
+        self.menu.append(
+            ui.Switch("threaded_capture", self, label="Capture in background thread")
+        )
+        if self.threaded_capture:
+            self.menu.append(
+                ui.Text_Input(
+                    "overwritten_frames",
+                    self,
+                    label="Overwritten frames",
+                    getter=lambda: str(self._frame_ring.overwritten),
+                    setter=lambda _: None,
+                )
+            )
+        self.menu.append(
+            ui.Selector(
+                "imu_mode",
+                self,
+                selection=list(IMU_MODES),
+                labels=IMU_MODE_LABELS,
+                label="IMU",
+            )
+        )
+        if self.imu_mode != "off":
+            self.menu.append(
+                ui.Text_Input(
+                    "imu_overwritten",
+                    self,
+                    label="Lost IMU samples",
+                    getter=lambda: str(self._imu_ring.overwritten),
+                    setter=lambda _: None,
+                )
+            )
 
         if self._available_modes is not None:
 
@@ -694,6 +2034,12 @@ class Realsense2_Source(Old_Base_Source):
             gl_utils.glFlush()
             gl_utils.make_coord_system_norm_based()
             self.g_pool.image_tex.draw()
+        elif isinstance(self._recent_frame, BGRFrame):
+            # upload as is, no need to derive a YUV buffer
+            self.g_pool.image_tex.update_from_ndarray(self._recent_frame.bgr)
+            gl_utils.glFlush()
+            gl_utils.make_coord_system_norm_based()
+            self.g_pool.image_tex.draw()
         elif self._recent_frame is not None:
             self.g_pool.image_tex.update_from_yuv_buffer(
                 self._recent_frame.yuv_buffer,
@@ -775,38 +2121,61 @@ class Realsense2_Source(Old_Base_Source):
             )
         elif notification["subject"] == "recording.stopped":
             self.stop_depth_recording()
+        elif notification["subject"] in ("start_plugin", "stop_plugin"):
+            if self.color_format == "auto":
+                self._renegotiate_color_format()
 
     def start_depth_recording(self, rec_loc, start_time_synced):
         if not self.record_depth:
             return
 
-        if self.depth_video_writer is not None:
+        if self.depth_video_writer is not None or self.depth_raw_writer is not None:
             logger.warning("Depth video recording has been started already")
             return
 
-        video_path = os.path.join(rec_loc, "depth.mp4")
-        self.depth_video_writer = MPEG_Writer(video_path, start_time_synced)
+        if self.depth_recording_format == "raw":
+            self.depth_raw_writer = RawStreamWriter(
+                rec_loc, "depth", compression=self.depth_raw_compression
+            )
+            if self.record_color_raw:
+                self.color_raw_writer = RawStreamWriter(
+                    rec_loc, "color", compression=self.depth_raw_compression
+                )
+        else:
+            video_path = os.path.join(rec_loc, "depth.mp4")
+            self.depth_video_writer = MPEG_Writer(video_path, start_time_synced)
+        self.update_menu()
 
     def stop_depth_recording(self):
-        if self.depth_video_writer is None:
+        if self.depth_video_writer is None and self.depth_raw_writer is None:
             logger.warning("Depth video recording was not running")
             return
 
-        self.depth_video_writer.close()
-        self.depth_video_writer = None
+        if self.depth_video_writer is not None:
+            self.depth_video_writer.close()
+            self.depth_video_writer = None
+        if self.depth_raw_writer is not None:
+            if self.depth_raw_writer.dropped:
+                logger.warning(
+                    "Raw depth recording dropped {} frames".format(
+                        self.depth_raw_writer.dropped
+                    )
+                )
+            self.depth_raw_writer.close()
+            self.depth_raw_writer = None
+        if self.color_raw_writer is not None:
+            self.color_raw_writer.close()
+            self.color_raw_writer = None
 
     @property
     def device_id(self):
         if self.online:  # already running
-            return self.pipeline_profile.get_device().get_info(
-                rs.camera_info.serial_number
-            )
+            return self._device_id
         else:
             # set the first available device
-            devices = self.context.query_devices()
-            if devices:
-                logger.info("device_id: first device by default.")
-                return devices[0].get_info(rs.camera_info.serial_number)
+            serials = self.inventory.serials()
+            if serials:
+                return serials[0]
             else:
                 logger.debug("device_id: No device connected.")
                 return None
@@ -882,6 +2251,115 @@ class Realsense2_Source(Old_Base_Source):
         if new_rate != self.depth_frame_rate:
             self.restart_device(depth_fps=new_rate)
 
+    @property
+    def color_format(self):
+        return self._color_format
+
+    @color_format.setter
+    def color_format(self, value):
+        self._color_format = value
+        self._renegotiate_color_format()
+
+    @property
+    def depth_post_processing(self):
+        return self._post_processor is not None
+
+    @depth_post_processing.setter
+    def depth_post_processing(self, value):
+        if value:
+            self.start_post_processing()
+        else:
+            self.stop_post_processing()
+        self.update_menu()
+
+    @property
+    def depth_filters(self):
+        if self._post_processor is not None:
+            return dict(self._post_processor.enabled)
+        return dict(self._depth_filters)
+
+    def set_depth_filter(self, name, enabled):
+        self._depth_filters[name] = enabled
+        if self._post_processor is not None:
+            self._post_processor.enabled[name] = enabled
+
+    @property
+    def decimation_magnitude(self):
+        return self._decimation_magnitude
+
+    @decimation_magnitude.setter
+    def decimation_magnitude(self, value):
+        self._decimation_magnitude = int(value)
+        if self._post_processor is not None:
+            self._post_processor.decimation_magnitude = self._decimation_magnitude
+
+    @property
+    def depth_near(self):
+        return self._depth_near
+
+    @depth_near.setter
+    def depth_near(self, value):
+        self._depth_near = int(value)
+        self._depth_far = max(self._depth_far, self._depth_near + 1)
+        self._depth_colormap_lut = depth_colormap_lut(
+            self._depth_near, self._depth_far
+        )
+
+    @property
+    def depth_far(self):
+        return self._depth_far
+
+    @depth_far.setter
+    def depth_far(self, value):
+        self._depth_far = int(value)
+        self._depth_near = min(self._depth_near, self._depth_far - 1)
+        self._depth_colormap_lut = depth_colormap_lut(
+            self._depth_near, self._depth_far
+        )
+
+    @property
+    def depth_recording_format(self):
+        return self._depth_recording_format
+
+    @depth_recording_format.setter
+    def depth_recording_format(self, value):
+        self._depth_recording_format = value
+        # show/hide the raw recording options
+        self.update_menu()
+
+    @property
+    def threaded_capture(self):
+        return self._threaded_capture
+
+    @threaded_capture.setter
+    def threaded_capture(self, value):
+        self._threaded_capture = value
+        if not self.online:
+            return
+        if value:
+            self.start_capture_thread()
+        else:
+            self.stop_capture_thread()
+        self.update_menu()
+
+    @property
+    def imu_mode(self):
+        return self._imu_mode
+
+    @imu_mode.setter
+    def imu_mode(self, value):
+        self.stop_imu()
+        self._imu_mode = value
+        if value != "off":
+            self.start_imu()
+        self.update_menu()
+
+    @property
+    def capture_state(self):
+        if self._state == STATE_STREAMING:
+            return self._state
+        return "{} (attempt {})".format(self._state, self._recovery_attempts)
+
     @property
     def jpeg_support(self):
         return False
@@ -898,4 +2376,445 @@ class Realsense2_Source(Old_Base_Source):
             logger.debug(
                 "self.name: Realsense2 not online. Falling back to Ghost capture"
             )
-            return "Ghost capture"
\ No newline at end of file
+            return "Ghost capture"
+
+
+class BagReader(object):
+    """Reads librealsense .bag files through a playback device.
+
+    Frames are addressed by index like `RawRecordingReader`. The file is read
+    once on open (without real-time pacing) to index the timestamp and the
+    playback position of every frame of the primary stream. Reading the next
+    frame is sequential, any other index seeks to the indexed position first.
+    Playback always runs as fast as possible, pacing is up to the caller.
+    """
+
+    def __init__(self, path):
+        self._config = rs.config()
+        self._config.enable_device_from_file(path, repeat_playback=False)
+        self.pipeline = rs.pipeline()
+        profile = self._start()
+        self.device_name = profile.get_device().get_info(rs.camera_info.name)
+
+        streams = {
+            s.stream_type(): s.as_video_stream_profile() for s in profile.get_streams()
+        }
+        color = streams.get(rs.stream.color)
+        self._color_format = None if color is None else color.format()
+        if self._color_format not in (None, rs.format.yuyv, rs.format.bgr8):
+            if self._color_format != rs.format.rgb8:
+                logger.warning(
+                    "BagReader: color format {} not supported, color disabled.".format(
+                        self._color_format
+                    )
+                )
+                color = None
+        self._has_color = color is not None
+        self._has_depth = rs.stream.depth in streams
+        primary = color if self._has_color else streams.get(rs.stream.depth)
+        if primary is None:
+            raise ValueError("No color or depth stream in " + path)
+        self.frame_size = primary.width(), primary.height()
+
+        self._build_index()
+        if not self._timestamps:
+            raise ValueError("No frames in " + path)
+        self.timestamps = np.array(self._timestamps) / 1000
+        if len(self.timestamps) > 1:
+            duration = self.timestamps[-1] - self.timestamps[0]
+            self.frame_rate = (len(self.timestamps) - 1) / duration
+        else:
+            self.frame_rate = primary.fps()
+
+        # the indexing pass played the file to its end
+        self.pipeline.stop()
+        self._start()
+        self._next_index = 0
+
+    def _start(self):
+        profile = self.pipeline.start(self._config)
+        self.playback = profile.get_device().as_playback()
+        # never drop frames, so sequential reads stay in step with the index
+        self.playback.set_real_time(False)
+        # frames played before real-time pacing was off may have been dropped
+        self.playback.seek(datetime.timedelta(0))
+        return profile
+
+    def _build_index(self):
+        self._timestamps = []
+        self._positions = []
+        while True:
+            frames = self._wait_for_frames()
+            if frames is None:
+                return
+            frame = self._primary_frame(frames)
+            if not frame:
+                continue
+            timestamp = frame.get_timestamp()
+            # the syncer repeats the last frame of a stream in later framesets
+            if self._timestamps and timestamp <= self._timestamps[-1]:
+                continue
+            self._timestamps.append(timestamp)
+            self._positions.append(self.playback.get_position())
+
+    def _primary_frame(self, frames):
+        if self._has_color:
+            return frames.get_color_frame()
+        return frames.get_depth_frame()
+
+    def _wait_for_frames(self):
+        """Next frameset, None at the end of the file."""
+        deadline = time.perf_counter() + TIMEOUT / 1000
+        while time.perf_counter() < deadline:
+            success, frames = self.pipeline.try_wait_for_frames(BAG_POLL_TIMEOUT)
+            if success:
+                return frames
+            if self.playback.current_status() == rs.playback_status.stopped:
+                return None
+        raise RuntimeError("Playback stalled")
+
+    def _seek(self, index):
+        if self.playback.current_status() == rs.playback_status.stopped:
+            # a stopped playback device ignores seeks
+            self.pipeline.stop()
+            self._start()
+        # the position is indexed after the frame was read, so start from the
+        # previous frame's position and read forward to the wanted one
+        position = self._positions[index - 1] if index > 0 else 0
+        self.playback.seek(datetime.timedelta(microseconds=position / 1000))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def read(self, index):
+        if index != self._next_index:
+            self._seek(index)
+        target = self._timestamps[index]
+        for _ in range(BAG_MAX_SKIPPED_FRAMES):
+            frames = self._wait_for_frames()
+            if frames is None:
+                raise RuntimeError("End of file")
+            frame = self._primary_frame(frames)
+            # skips repeated frames and frames queued before a seek
+            if frame and frame.get_timestamp() == target:
+                break
+        else:
+            raise RuntimeError("Cannot find frame {}".format(index))
+        self._next_index = index + 1
+
+        color = None
+        if self._has_color:
+            color = np.asanyarray(frame.get_data())
+            if self._color_format == rs.format.rgb8:
+                color = cv2.cvtColor(color, cv2.COLOR_RGB2BGR)
+        depth = None
+        if self._has_depth:
+            depth_frame = frames.get_depth_frame()
+            if depth_frame:
+                depth = np.asanyarray(depth_frame.get_data())
+        return color, depth, self.timestamps[index]
+
+    def close(self):
+        try:
+            self.pipeline.stop()
+        except RuntimeError as re:
+            logger.error("Cannot stop the playback pipeline: " + str(re))
+
+
+class Realsense2_Replay_Source(Old_Base_Source):
+    """Replays .bag files or raw recordings made by Realsense2_Source.
+
+    Emits the same `frame`/`depth_frame` events as the live source, so the
+    whole plugin chain can run (and be benchmarked reproducibly) without a
+    camera attached. Playback modes:
+        real-time:  frames are spaced like they were recorded
+        fixed-rate: frames are spaced by 1 / playback_rate
+        fast:       one frame per world loop iteration, as fast as possible
+    """
+
+    def __init__(
+        self,
+        g_pool,
+        source_path="",
+        playback_mode="real-time",
+        playback_rate=DEFAULT_COLOR_FPS,
+        loop=True,
+        depth_near=DEFAULT_DEPTH_NEAR,
+        depth_far=DEFAULT_DEPTH_FAR,
+        **kwargs
+    ):
+        super().__init__(g_pool, **kwargs)
+        self.playback_rate = playback_rate
+        self.loop = loop
+        self._depth_near = depth_near
+        self._depth_far = depth_far
+        self._depth_colormap_lut = depth_colormap_lut(depth_near, depth_far)
+        self._playback_mode = playback_mode
+        self._reader = None
+        self._source_path = ""
+        self._position = 0
+        self._played = 0
+        self._clock_start = 0.0
+        self._clock_start_ts = 0.0
+        self._recent_depth_frame = None
+        self.color_frame_index = 0
+        self.depth_frame_index = 0
+        self.source_path = source_path
+
+    def _load(self, path):
+        self._close_reader()
+        if not path:
+            return
+        try:
+            if os.path.isdir(path):
+                self._reader = RawRecordingReader(path)
+            else:
+                self._reader = BagReader(path)
+        except (OSError, RuntimeError, ValueError) as e:
+            logger.error("Cannot open replay source {}: {}".format(path, e))
+            self._reader = None
+            return
+        logger.debug(
+            "Replaying {} ({} frames @ {:.1f} fps)".format(
+                path, len(self._reader), self._reader.frame_rate
+            )
+        )
+        self._intrinsics = Camera_Model.from_file(
+            self.g_pool.user_dir, self.name, self.frame_size
+        )
+        self.seek(0)
+
+    def _close_reader(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def cleanup(self):
+        self._close_reader()
+        super().cleanup()
+
+    def get_init_dict(self):
+        d = super().get_init_dict()
+        d.update(
+            {
+                "source_path": self.source_path,
+                "playback_mode": self.playback_mode,
+                "playback_rate": self.playback_rate,
+                "loop": self.loop,
+                "depth_near": self.depth_near,
+                "depth_far": self.depth_far,
+            }
+        )
+        return d
+
+    def seek(self, index):
+        """Jump to frame `index`, O(1) for raw recordings."""
+        if self._reader is None:
+            return
+        self._position = min(max(int(index), 0), max(len(self._reader) - 1, 0))
+        self._reset_clock()
+
+    def _reset_clock(self):
+        self._played = 0
+        self._clock_start = time.perf_counter()
+        if self._reader is None or self._reader.timestamps is None:
+            return
+        if self._position < len(self._reader.timestamps):
+            self._clock_start_ts = self._reader.timestamps[self._position]
+
+    def _time_until_due(self):
+        if self.playback_mode == "fixed-rate":
+            due = self._clock_start + self._played / max(self.playback_rate, 1)
+        elif self.playback_mode == "real-time" and self._reader.timestamps is not None:
+            recorded = self._reader.timestamps[self._position] - self._clock_start_ts
+            due = self._clock_start + recorded
+        else:
+            return 0.0
+        return due - time.perf_counter()
+
+    def recent_events(self, events):
+        if not self.online:
+            time.sleep(MAX_PLAYBACK_SLEEP)
+            return
+
+        if self._position >= len(self._reader):
+            if not self.loop or not len(self._reader):
+                time.sleep(MAX_PLAYBACK_SLEEP)
+                return
+            self.seek(0)
+
+        # block like a camera would, but never for long
+        delay = self._time_until_due()
+        if delay > MAX_PLAYBACK_SLEEP:
+            time.sleep(MAX_PLAYBACK_SLEEP)
+            return
+        elif delay > 0:
+            time.sleep(delay)
+
+        try:
+            color, depth, _ = self._reader.read(self._position)
+        except RuntimeError as re:
+            # end of a .bag file or broken recording
+            logger.debug("Replay stopped at frame {}: {}".format(self._position, re))
+            self._position = len(self._reader)
+            return
+        self._position += 1
+        self._played += 1
+
+        current_time = self.g_pool.get_timestamp()
+        if color is not None:
+            if color.ndim == 3 and color.shape[2] == 3:
+                frame_class = BGRFrame
+            else:
+                frame_class = ColorFrame
+                if color.ndim == 3:
+                    # raw recordings store the (h, w, 2) byte view of the YUYV data
+                    color = np.ascontiguousarray(color).view(np.uint16)[:, :, 0]
+            color_frame = frame_class(color, current_time, self.color_frame_index)
+            self.color_frame_index += 1
+            self._recent_frame = color_frame
+            events["frame"] = color_frame
+
+        if depth is not None:
+            depth_frame = DepthFrame(
+                depth, current_time, self.depth_frame_index, self._depth_colormap_lut
+            )
+            self.depth_frame_index += 1
+            self._recent_depth_frame = depth_frame
+            events["depth_frame"] = depth_frame
+
+    def deinit_ui(self):
+        self.remove_menu()
+
+    def init_ui(self):
+        self.add_menu()
+        self.menu.label = "Realsense Replay"
+        self.update_menu()
+
+    def update_menu(self):
+        try:
+            del self.menu[:]
+        except AttributeError:
+            return
+
+        from pyglui import ui
+
+        self.menu.append(
+            ui.Info_Text("Path to a .bag file or a raw Realsense recording folder.")
+        )
+        self.menu.append(ui.Text_Input("source_path", self, label="Source"))
+        if not self.online:
+            self.menu.append(ui.Info_Text("Replay source could not be opened."))
+            return
+
+        self.menu.append(
+            ui.Selector(
+                "playback_mode",
+                self,
+                selection=list(PLAYBACK_MODES),
+                labels=["Real-time", "Fixed rate", "As fast as possible"],
+                label="Playback Mode",
+            )
+        )
+        self.menu.append(
+            ui.Slider(
+                "playback_rate", self, min=1, max=120, step=1, label="Fixed Rate [fps]"
+            )
+        )
+        self.menu.append(ui.Switch("loop", self, label="Loop"))
+        self.menu.append(
+            ui.Slider(
+                "position",
+                self,
+                min=0,
+                max=len(self._reader) - 1,
+                step=1,
+                label="Frame",
+            )
+        )
+
+        depth_colors = ui.Growing_Menu(label="Depth Colorization")
+        depth_colors.append(
+            ui.Slider("depth_near", self, min=0, max=10000, step=50, label="Near")
+        )
+        depth_colors.append(
+            ui.Slider("depth_far", self, min=50, max=20000, step=50, label="Far")
+        )
+        self.menu.append(depth_colors)
+
+    @property
+    def source_path(self):
+        return self._source_path
+
+    @source_path.setter
+    def source_path(self, path):
+        self._source_path = path
+        self._load(path)
+        self.update_menu()
+
+    @property
+    def playback_mode(self):
+        return self._playback_mode
+
+    @playback_mode.setter
+    def playback_mode(self, mode):
+        self._playback_mode = mode
+        self._reset_clock()
+
+    @property
+    def depth_near(self):
+        return self._depth_near
+
+    @depth_near.setter
+    def depth_near(self, value):
+        self._depth_near = int(value)
+        self._depth_far = max(self._depth_far, self._depth_near + 1)
+        self._depth_colormap_lut = depth_colormap_lut(
+            self._depth_near, self._depth_far
+        )
+
+    @property
+    def depth_far(self):
+        return self._depth_far
+
+    @depth_far.setter
+    def depth_far(self, value):
+        self._depth_far = int(value)
+        self._depth_near = min(self._depth_near, self._depth_far - 1)
+        self._depth_colormap_lut = depth_colormap_lut(
+            self._depth_near, self._depth_far
+        )
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, index):
+        self.seek(index)
+
+    @property
+    def frame_size(self):
+        if self._reader is None:
+            return DEFAULT_COLOR_SIZE
+        return self._reader.frame_size
+
+    @property
+    def frame_rate(self):
+        if self._reader is None:
+            return DEFAULT_COLOR_FPS
+        if self.playback_mode == "fixed-rate":
+            return self.playback_rate
+        return self._reader.frame_rate
+
+    @property
+    def jpeg_support(self):
+        return False
+
+    @property
+    def online(self):
+        return self._reader is not None
+
+    @property
+    def name(self):
+        return getattr(self._reader, "device_name", "Realsense2 Replay")
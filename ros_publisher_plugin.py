@@ -16,8 +16,9 @@
 #    | || |  | |  __/| |_| |  _ < | |  ___) |
 #   |___|_|  |_|_|    \___/|_| \_\|_| |____/ 
 import sys
+import array
 import cv2
-# import numpy as np
+import numpy as np
 import pathlib
 
 # pupil 
@@ -28,11 +29,13 @@ from pyglui.pyfontstash import fontstash
 
 # custom
 from event_handler.event_handler import EventHandler
+from frame_utils.imu import IMU_ACCEL, IMU_DTYPE, IMU_GYRO
 
 # ROS
 import rclpy
 from rclpy.node import Node
-from sensor_msgs.msg import Image, Imu, CameraInfo
+from rclpy.time import Time
+from sensor_msgs.msg import Image, Imu, CameraInfo, PointCloud2, PointField
 from yolo_ros2.msg import Detections, Detection
 from pupil_labs_ros2_msgs.msg import GazeStamped
 from cv_bridge import CvBridge
@@ -42,6 +45,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 class ROS_Publisher_Pugin(Plugin):
+    # ask capture sources (e.g. Realsense2_Source) for BGR frames
+    uses_bgr_frames = True
 
     #    ___       _ _    
     #   |_ _|_ __ (_) |_  
@@ -78,8 +83,15 @@ class ROS_Publisher_Pugin(Plugin):
         # TODO: use config file for settings
         self.publish_frame_bool = True
         self.publish_depth_frame_bool = True
+        self.publish_point_cloud_bool = False
+        self.voxel_size = 0.0 # [m], 0 publishes every depth pixel
         self.publish_gaze_bool = True
         self.publish_imu_bool = False
+        # the Imu message carries both: accel is interpolated to every gyro sample,
+        # gyro samples newer than the last accel sample wait for the next batch
+        self.last_accel = None
+        self.pending_gyro = np.zeros(0, dtype=IMU_DTYPE)
+        self.max_pending_gyro = 400 # samples (~1 s), if the accel stream stops
         self.publish_objects_bool = True
 
     #    ____  _             _         _____                 _   _                 
@@ -141,6 +153,23 @@ class ROS_Publisher_Pugin(Plugin):
                     label='Depth Image',
                 )
             )
+            self.__sub_menu.append(
+                ui.Switch(
+                    'publish_point_cloud_bool', 
+                    self, 
+                    label='Point Cloud',
+                )
+            )
+            self.__sub_menu.append(
+                ui.Slider(
+                    'voxel_size', 
+                    self, 
+                    min=0.0,
+                    step=0.005,
+                    max=0.1,
+                    label='Voxel Size [m]',
+                )
+            )
             self.__sub_menu.append(
                 ui.Switch(
                     'publish_gaze_bool', 
@@ -152,7 +181,7 @@ class ROS_Publisher_Pugin(Plugin):
                 ui.Switch(
                     'publish_imu_bool', 
                     self, 
-                    label='IMU (Not implemented)',
+                    label='IMU',
                 )
             )
             self.__sub_menu.append(
@@ -196,16 +225,21 @@ class ROS_Publisher_Pugin(Plugin):
             depth_frame = self.event_handler.get_depth_frame(events)
             self.publish_depth_frame(depth_frame)
 
+        if self.publish_point_cloud_bool:
+            # get the point cloud of the depth frame from the events
+            points = self.event_handler.get_point_cloud(events, self.voxel_size)
+            timestamp = self.event_handler.get_depth_timestamp(events)
+            self.publish_point_cloud(points, timestamp)
+
         if self.publish_gaze_bool:
             # get the gaze data from the events
             gaze = self.event_handler.get_highest_conf_gaze(events)
             self.publish_gaze(gaze)
 
         if self.publish_imu_bool:
-            print("IMU publishing is not implemented yet.")
             # get the imu data from the events
-            # imu = self.event_handler.get_imu(events)
-            # self.publish_imu(imu)
+            imu = self.event_handler.get_imu(events)
+            self.publish_imu(imu)
 
         if self.publish_objects_bool:
             # get the object data from the events
@@ -249,6 +283,88 @@ class ROS_Publisher_Pugin(Plugin):
         #   publish the frame
         self.ros_node.pub.frame.depth_image.publish(depth_frame_msg)
     
+    def publish_point_cloud(self, points, timestamp) -> None:
+        """
+        Publish the point cloud (n x 3 float32 array) to the ROS2 topic,
+        stamped with the capture time of its depth frame.
+        """
+        if points is None:
+            print("No point cloud data available.")
+            return
+        points = np.ascontiguousarray(points, dtype=np.float32)
+        #   unorganized cloud: one row, x/y/z packed as float32
+        cloud_msg = PointCloud2()
+        stamp = int(self.to_ros_time(np.array([timestamp]))[0])
+        cloud_msg.header.stamp = Time(nanoseconds=stamp).to_msg()
+        cloud_msg.header.frame_id = 'depth_camera'
+        cloud_msg.height = 1
+        cloud_msg.width = len(points)
+        cloud_msg.fields = self.ros_node.point_fields
+        cloud_msg.is_bigendian = sys.byteorder == 'big'
+        cloud_msg.point_step = points.itemsize * 3
+        cloud_msg.row_step = cloud_msg.point_step * cloud_msg.width
+        cloud_msg.is_dense = True
+        #   the array memory already is the message layout, no per point packing
+        # array.array passes the uint8[] check in C, bytes would be checked per byte
+        # (filled straight from a memoryview, so the points are copied only once)
+        cloud_msg.data = array.array('B')
+        cloud_msg.data.frombytes(memoryview(points).cast('B'))
+        #   publish the cloud
+        self.ros_node.pub.frame.point_cloud.publish(cloud_msg)
+
+    def publish_imu(self, imu) -> None:
+        """
+        Publish one message per gyro sample to the ROS2 topic, with the accel
+        interpolated to the gyro sample's time and stamped with its own
+        capture time (not the time of the world frame).
+        """
+        if imu is None:
+            print("No imu data available.")
+            return
+        accel = imu[imu['kind'] == IMU_ACCEL]
+        gyro = np.concatenate([self.pending_gyro, imu[imu['kind'] == IMU_GYRO]])
+        if self.last_accel is not None:
+            accel = np.concatenate([self.last_accel, accel])
+        if not len(accel):
+            self.pending_gyro = gyro[-self.max_pending_gyro:]
+            return
+        #   keep the newest accel sample to interpolate across batches
+        self.last_accel = accel[-1:]
+        #   samples after the newest accel sample can't be interpolated yet
+        ready = gyro['timestamp'] <= accel['timestamp'][-1]
+        self.pending_gyro = gyro[~ready][-self.max_pending_gyro:]
+        #   (samples before the first accel sample only occur at startup)
+        gyro = gyro[ready & (gyro['timestamp'] >= accel['timestamp'][0])]
+        if not len(gyro):
+            return
+        accel_xyz = np.stack(
+            [np.interp(gyro['timestamp'], accel['timestamp'], accel['xyz'][:, i]) for i in range(3)],
+            axis=1,
+        )
+        stamps = self.to_ros_time(gyro['timestamp'])
+        for gyro_xyz, accel_sample, stamp in zip(gyro['xyz'].tolist(), accel_xyz.tolist(), stamps.tolist()):
+            imu_msg = Imu()
+            imu_msg.header.stamp = Time(nanoseconds=stamp).to_msg()
+            imu_msg.header.frame_id = 'imu'
+            #   no orientation estimate
+            imu_msg.orientation_covariance[0] = -1.0
+            imu_msg.angular_velocity.x = gyro_xyz[0]
+            imu_msg.angular_velocity.y = gyro_xyz[1]
+            imu_msg.angular_velocity.z = gyro_xyz[2]
+            imu_msg.linear_acceleration.x = accel_sample[0]
+            imu_msg.linear_acceleration.y = accel_sample[1]
+            imu_msg.linear_acceleration.z = accel_sample[2]
+            #   publish the sample
+            self.ros_node.pub.imu.publish(imu_msg)
+
+    def to_ros_time(self, timestamps) -> np.ndarray:
+        """
+        Convert pupil timestamps [s] to ROS time [ns], with one clock offset
+        for the whole array.
+        """
+        now = self.ros_node.get_clock().now().nanoseconds
+        return now - ((self.g_pool.get_timestamp() - timestamps) * 1e9).astype(np.int64)
+
     def publish_gaze(self, gaze) -> None:
         """
         Publish the gaze data to the ROS2 topic.
@@ -281,15 +397,20 @@ class ROS_Publisher_Pugin(Plugin):
         obj_msg = Detections()
         obj_msg.header.stamp = self.ros_node.get_clock().now().to_msg()
         obj_msg.header.frame_id = 'object_detection'
-        # iterate over object events
-        for obj in objects:
+        # iterate over the detection arrays (see detection/batch.py)
+        track_ids = objects.track_ids.tolist() if objects.track_ids is not None else [None] * len(objects)
+        boxes = zip(objects.names.tolist(), objects.conf.tolist(), objects.xyxy.tolist(), track_ids)
+        for name, conf, (x1, y1, x2, y2), track_id in boxes:
             detection = Detection() 
-            detection.prediction = obj['cls']
-            detection.confidence = float(obj['conf'])
-            detection.bbox.top_left.x = float(obj['xyxy'][0])
-            detection.bbox.top_left.y = float(obj['xyxy'][1])
-            detection.bbox.bottom_right.x = float(obj['xyxy'][2])
-            detection.bbox.bottom_right.y = float(obj['xyxy'][3])
+            detection.prediction = name
+            detection.confidence = conf
+            detection.bbox.top_left.x = x1
+            detection.bbox.top_left.y = y1
+            detection.bbox.bottom_right.x = x2
+            detection.bbox.bottom_right.y = y2
+            # persistent track id (if tracking is enabled and the message has the field)
+            if track_id is not None and hasattr(detection, 'id'):
+                detection.id = track_id
             # fit together with final message
             obj_msg.detections.append(detection)
         # TODO: add the object data to the message
@@ -333,6 +454,7 @@ class PupilRosNode(Node):
         """
         Init publishers for:
             - Frame
+            - Point Cloud
             - Gaze
             - IMU
         """
@@ -343,6 +465,12 @@ class PupilRosNode(Node):
         self.pub.frame.image = self.create_publisher(Image, self.node_name + '/frame/image', 10)
         #   publisher for depth images
         self.pub.frame.depth_image = self.create_publisher(Image, self.node_name + '/frame/depth_image', 10)
+        #   publisher for the depth point cloud
+        self.pub.frame.point_cloud = self.create_publisher(PointCloud2, self.node_name + '/frame/point_cloud', 10)
+        self.point_fields = [
+            PointField(name=axis, offset=4 * i, datatype=PointField.FLOAT32, count=1)
+            for i, axis in enumerate('xyz')
+        ]
         #   publisher for the camera info
         self.pub.frame.info = self.create_publisher(CameraInfo, self.node_name + '/frame/info', 10)
         #   publisher for the gaze data
@@ -363,4 +491,5 @@ class RosCameraPublisher():
     def __init__(self):
         self.image      = None
         self.depth_image= None
+        self.point_cloud= None
         self.info       = None
\ No newline at end of file
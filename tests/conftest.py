@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# the plugins live flat in the plugin folder (like in pupil_capture_settings/plugins)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,251 @@
+"""
+Minimal stand-ins for the librealsense objects Realsense2_Source and
+SecondaryDevice talk to (context, config, pipeline, frameset, frames), so the
+capture paths can run without a camera. Constants (rs.stream, rs.format, ...)
+come from pyrealsense2 if it is installed, else a stand-in module is
+registered as `pyrealsense2` (import this module before the plugin).
+"""
+
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+
+class _Constant(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+class _Constants(object):
+    """Enum stand-in (rs.stream, rs.format, ...), every member exists."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, member):
+        if member.startswith("__"):
+            raise AttributeError(member)
+        constant = _Constant("{}.{}".format(self._name, member))
+        setattr(self, member, constant)
+        return constant
+
+
+def _fake_pyrealsense2():
+    module = types.ModuleType("pyrealsense2")
+    module.__version__ = "fake"
+    for name in (
+        "stream",
+        "format",
+        "camera_info",
+        "timestamp_domain",
+        "frame_metadata_value",
+        "option",
+    ):
+        setattr(module, name, _Constants(name))
+    # librealsense classes, filled in below where there is a stand-in
+    for name in ("frame", "composite_frame", "device", "config", "pipeline", "context"):
+        setattr(module, name, type(name, (object,), {}))
+    return module
+
+
+try:
+    import pyrealsense2 as rs
+except ImportError:
+    rs = sys.modules["pyrealsense2"] = _fake_pyrealsense2()
+    FAKE_PYREALSENSE2 = True
+else:
+    FAKE_PYREALSENSE2 = False
+
+
+class FakeIntrinsics(object):
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.fx = self.fy = 600.0
+        self.ppx = width / 2
+        self.ppy = height / 2
+
+
+class FakeProfile(object):
+    def __init__(self, stream, fmt, size, fps):
+        self._stream = stream
+        self._format = fmt
+        self._size = size
+        self._fps = fps
+
+    def stream_type(self):
+        return self._stream
+
+    def format(self):
+        return self._format
+
+    def width(self):
+        return self._size[0]
+
+    def height(self):
+        return self._size[1]
+
+    def fps(self):
+        return self._fps
+
+    def as_video_stream_profile(self):
+        return self
+
+    def get_intrinsics(self):
+        return FakeIntrinsics(*self._size)
+
+    def get_extrinsics_to(self, other):
+        return types.SimpleNamespace(
+            rotation=[1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0],
+            translation=[0.015, 0.0, 0.0],
+        )
+
+
+class FakeFrame(object):
+    def __init__(self, profile, data, number):
+        self._profile = profile
+        self._data = data
+        self._number = number
+
+    def get_data(self):
+        return self._data
+
+    def get_profile(self):
+        return self._profile
+
+    def get_frame_number(self):
+        return self._number
+
+    def get_frame_timestamp_domain(self):
+        return rs.timestamp_domain.system_time
+
+    def get_timestamp(self):
+        return time.time() * 1000
+
+    def supports_frame_metadata(self, value):
+        return False
+
+
+class FakeFrameset(object):
+    def __init__(self, color=None, depth=None):
+        self._color = color
+        self._depth = depth
+
+    def get_color_frame(self):
+        return self._color
+
+    def get_depth_frame(self):
+        return self._depth
+
+
+def make_frameset(number, color_size=(640, 480), depth_size=(640, 480)):
+    """Frameset `number` with a BGR8 color and a z16 depth frame."""
+    color = np.full(color_size[::-1] + (3,), number % 256, dtype=np.uint8)
+    depth = np.full(depth_size[::-1], 1000 + number, dtype=np.uint16)
+    color_profile = FakeProfile(rs.stream.color, rs.format.bgr8, color_size, 30)
+    depth_profile = FakeProfile(rs.stream.depth, rs.format.z16, depth_size, 30)
+    return FakeFrameset(
+        FakeFrame(color_profile, color, number),
+        FakeFrame(depth_profile, depth, number),
+    )
+
+
+class FakeConfig(object):
+    def __init__(self):
+        self.device = None
+        self.streams = []
+
+    def enable_device(self, serial):
+        self.device = serial
+
+    def enable_stream(self, *args):
+        self.streams.append(args)
+
+
+class FakeDepthSensor(object):
+    def get_depth_scale(self):
+        return 0.001
+
+
+class FakeDevice(object):
+    def __init__(self, serial, profiles=()):
+        self.serial = serial
+        self.profiles = list(profiles)
+
+    def get_info(self, info):
+        return self.serial
+
+    def query_sensors(self):
+        return [self]
+
+    def get_stream_profiles(self):
+        return self.profiles
+
+    def first_depth_sensor(self):
+        return FakeDepthSensor()
+
+
+class FakePipelineProfile(object):
+    def __init__(self, device, streams=()):
+        self._device = device
+        self._streams = list(streams)
+
+    def get_device(self):
+        return self._device
+
+    def get_streams(self):
+        return self._streams
+
+
+class FakePipeline(object):
+    """Delivers the given framesets in order, then times out like a
+    disconnected camera. `fail_start` makes `start` raise."""
+
+    def __init__(self, framesets=(), serial="fake", fail_start=False):
+        self.framesets = list(framesets)
+        self.serial = serial
+        self.fail_start = fail_start
+        self.config = None
+        self.stopped = threading.Event()
+
+    def start(self, config=None):
+        if self.fail_start:
+            raise RuntimeError("No device connected")
+        self.config = config
+        streams = [
+            FakeProfile(stream, fmt, (width, height), fps)
+            for stream, width, height, fmt, fps in getattr(config, "streams", ())
+        ]
+        return FakePipelineProfile(FakeDevice(self.serial), streams)
+
+    def wait_for_frames(self, timeout_ms=5000):
+        if self.framesets:
+            return self.framesets.pop(0)
+        time.sleep(timeout_ms / 1000)
+        raise RuntimeError("Frame didn't arrive within {}".format(timeout_ms))
+
+    def stop(self):
+        self.stopped.set()
+
+
+class FakeContext(object):
+    def __init__(self, devices=()):
+        self.devices = list(devices)
+        self.callback = None
+
+    def set_devices_changed_callback(self, callback):
+        self.callback = callback
+
+    def query_devices(self):
+        return list(self.devices)
+
+
+if FAKE_PYREALSENSE2:
+    rs.config = FakeConfig
+    rs.context = FakeContext
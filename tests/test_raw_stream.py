@@ -0,0 +1,143 @@
+import json
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from frame_utils.raw_stream import (
+    INDEX_DTYPE,
+    RawRecordingReader,
+    RawStreamWriter,
+    available_compressions,
+)
+
+FRAMES = 25
+CHUNK_SIZE = 10  # the recording spans three chunk files
+DEPTH_SHAPE = (48, 64)
+COLOR_SHAPE = (48, 64, 3)
+
+
+def depth_image(n):
+    return np.arange(np.prod(DEPTH_SHAPE), dtype=np.uint16).reshape(DEPTH_SHAPE) + n
+
+
+def color_image(n):
+    return np.full(COLOR_SHAPE, n, dtype=np.uint8)
+
+
+def record(directory, compression="none", frames=FRAMES, depth_offset=0.0):
+    color = RawStreamWriter(directory, "color", compression, chunk_size=CHUNK_SIZE)
+    depth = RawStreamWriter(directory, "depth", compression, chunk_size=CHUNK_SIZE)
+    for n in range(frames):
+        timestamp = 10.0 + n / 30
+        assert color.write(color_image(n), timestamp)
+        assert depth.write(depth_image(n), timestamp + depth_offset)
+    color.close()
+    depth.close()
+
+
+@pytest.mark.parametrize("compression", available_compressions())
+def test_round_trip_random_access(tmp_path, compression):
+    record(str(tmp_path), compression, depth_offset=0.004)
+    reader = RawRecordingReader(str(tmp_path))
+    try:
+        assert len(reader) == FRAMES
+        assert reader.frame_size == (64, 48)
+        assert reader.frame_rate == pytest.approx(30.0)
+        order = np.random.default_rng(0).permutation(FRAMES)
+        for n in order.tolist():
+            color, depth, timestamp = reader.read(n)
+            np.testing.assert_array_equal(color, color_image(n))
+            # every color frame is paired with the depth frame closest in time
+            np.testing.assert_array_equal(depth, depth_image(n))
+            assert timestamp == pytest.approx(10.0 + n / 30)
+    finally:
+        reader.close()
+
+
+def test_frame_rate_of_identical_timestamps(tmp_path):
+    writer = RawStreamWriter(str(tmp_path), "depth")
+    for n in range(3):
+        writer.write(depth_image(n), 5.0)
+    writer.close()
+    reader = RawRecordingReader(str(tmp_path))
+    assert len(reader) == 3
+    assert reader.frame_rate == 0.0
+    reader.close()
+
+
+def write_empty_stream(directory, name):
+    # what a writer leaves behind if every frame was dropped
+    np.save(directory / (name + "_raw_index.npy"), np.zeros(0, dtype=INDEX_DTYPE))
+    info = {"shape": list(DEPTH_SHAPE), "dtype": "<u2", "compression": "none"}
+    (directory / (name + "_raw_info.json")).write_text(json.dumps(info))
+
+
+def test_empty_streams(tmp_path):
+    write_empty_stream(tmp_path, "depth")
+    with pytest.raises(FileNotFoundError):
+        RawRecordingReader(str(tmp_path))
+
+    # an empty depth stream next to a color stream is ignored
+    color = RawStreamWriter(str(tmp_path), "color")
+    color.write(color_image(1), 1.0)
+    color.close()
+    reader = RawRecordingReader(str(tmp_path))
+    assert reader.depth is None
+    color, depth, _ = reader.read(0)
+    assert depth is None
+    reader.close()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    pytest.importorskip("fake_realsense")
+    # Pupil's shared modules (plugin, gl_utils, ...) must be importable
+    backend = pytest.importorskip("realsense2_backend_plugin")
+    # no camera intrinsics files in the test user dir
+    monkeypatch.setattr(
+        backend, "Camera_Model", types.SimpleNamespace(from_file=lambda *args: None)
+    )
+    return backend
+
+
+def make_replay(backend, path):
+    g_pool = types.SimpleNamespace(
+        get_timestamp=lambda: 7.0, user_dir=str(path), capture=None
+    )
+    return backend.Realsense2_Replay_Source(
+        g_pool, source_path=str(path), playback_mode="fast", loop=False
+    )
+
+
+def test_replay_seek(tmp_path, backend):
+    record(str(tmp_path))
+    source = make_replay(backend, tmp_path)
+    try:
+        assert source.online
+        for n in (17, 3, FRAMES - 1, 0):
+            source.seek(n)
+            events = {}
+            source.recent_events(events)
+            np.testing.assert_array_equal(events["depth_frame"].depth, depth_image(n))
+            assert source.position == n + 1
+        # seeking is clamped to the recording
+        source.seek(FRAMES + 5)
+        assert source.position == FRAMES - 1
+        source.recent_events({})
+        events = {}
+        source.recent_events(events)
+        assert not events
+    finally:
+        source.cleanup()
+
+
+def test_replay_of_empty_recording(tmp_path, backend):
+    write_empty_stream(tmp_path, "depth")
+    source = make_replay(backend, tmp_path)
+    try:
+        assert not source.online
+        source.seek(3)
+        source.recent_events({})
+    finally:
+        source.cleanup()
@@ -0,0 +1,158 @@
+import tempfile
+import time
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+# registers a stand-in pyrealsense2 if the real one is not installed
+from fake_realsense import (
+    FakeConfig,
+    FakeContext,
+    FakeDevice,
+    FakePipeline,
+    FakeProfile,
+    make_frameset,
+    rs,
+)
+
+# Pupil's shared modules (plugin, gl_utils, ...) must be importable
+backend = pytest.importorskip("realsense2_backend_plugin")
+
+MODES = {
+    rs.stream.color: {(640, 480): [30]},
+    rs.stream.depth: {(640, 480): [30]},
+}
+PROFILES = [
+    FakeProfile(rs.stream.color, rs.format.bgr8, (640, 480), 30),
+    FakeProfile(rs.stream.color, rs.format.yuyv, (1280, 720), 30),
+    FakeProfile(rs.stream.depth, rs.format.z16, (640, 480), 30),
+]
+
+
+def wait_for(poll, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = poll()
+        if result:
+            return result
+        time.sleep(0.01)
+    return None
+
+
+def test_secondary_device_wraps_frames():
+    pipeline = FakePipeline([make_frameset(n) for n in range(3)], serial="SN2")
+    device = backend.SecondaryDevice(
+        "SN2", pipeline, MODES, rs.format.bgr8, lambda: 42.0, config_factory=FakeConfig
+    )
+    try:
+        color, depth = wait_for(device.poll)
+        assert pipeline.config.device == "SN2"
+        color_stream = (rs.stream.color, 640, 480, rs.format.bgr8, 30)
+        assert color_stream in pipeline.config.streams
+        assert isinstance(color, backend.BGRFrame)
+        assert color.timestamp == 42.0
+        assert depth.depth.dtype.name == "uint16"
+        assert depth.depth_scale == 0.001
+        assert device.stream_stats[rs.stream.color].received >= 1
+    finally:
+        device.stop()
+    assert pipeline.stopped.is_set()
+
+
+def make_source(pipelines, secondary=("SN2",)):
+    """Realsense2_Source with just the state the secondary device path needs
+    (the main device is not started)."""
+    source = object.__new__(backend.Realsense2_Source)
+    source.g_pool = types.SimpleNamespace(get_timestamp=lambda: 7.0, plugins=())
+    source.context = FakeContext(
+        [FakeDevice("SN1", PROFILES), FakeDevice("SN2", PROFILES)]
+    )
+    source.inventory = backend.DeviceInventory(source.context)
+    source.pipeline_factory = lambda context: pipelines.pop(0)
+    source.config_factory = FakeConfig
+    source._color_format = "bgr8"
+    source._device_id = "SN1"
+    source._depth_colormap_lut = None
+    source._secondary_serials = list(secondary)
+    source._secondary_devices = {}
+    source._secondary_dirty = True
+    source.update_menu = lambda: None
+    return source
+
+
+def test_poll_secondary_devices_emits_events():
+    pipeline = FakePipeline([make_frameset(n) for n in range(3)], serial="SN2")
+    source = make_source([pipeline])
+    try:
+        def poll():
+            events = {}
+            source._poll_secondary_devices(events)
+            return events
+
+        events = wait_for(poll)
+        assert set(events) == {"frame/SN2", "depth_frame/SN2"}
+        assert events["frame/SN2"].timestamp == 7.0
+        # the main device is never started as a secondary one
+        assert list(source._secondary_devices) == ["SN2"]
+    finally:
+        source.stop_secondary_devices()
+
+
+def test_failed_secondary_device_is_dropped():
+    pipeline = FakePipeline(fail_start=True)
+    source = make_source([pipeline])
+
+    def dropped():
+        source._poll_secondary_devices({})
+        return not source._secondary_devices
+
+    assert wait_for(dropped)
+    assert not source._secondary_dirty  # no restart loop
+
+
+def test_pipelines_are_pinned_to_their_serials(monkeypatch):
+    # no camera intrinsics files in the test user dir
+    monkeypatch.setattr(
+        backend, "Camera_Model", types.SimpleNamespace(from_file=lambda *args: None)
+    )
+    main = FakePipeline(serial="SN1")
+    secondary = FakePipeline([make_frameset(n) for n in range(3)], serial="SN2")
+    pipelines = [main, secondary]
+    g_pool = types.SimpleNamespace(
+        get_timestamp=lambda: 7.0, plugins=(), user_dir=tempfile.mkdtemp(), capture=None
+    )
+    source = backend.Realsense2_Source(
+        g_pool,
+        device_id="SN1",
+        frame_size=(640, 480),
+        frame_rate=30,
+        depth_frame_size=(640, 480),
+        depth_frame_rate=30,
+        color_format="bgr8",
+        secondary_devices=("SN2",),
+        pipeline_factory=lambda context: pipelines.pop(0),
+        context_factory=lambda: FakeContext(
+            [FakeDevice("SN1", PROFILES), FakeDevice("SN2", PROFILES)]
+        ),
+        config_factory=FakeConfig,
+    )
+    try:
+        assert main.config.device == "SN1"
+
+        def poll():
+            events = {}
+            source._poll_secondary_devices(events)
+            return events
+
+        assert wait_for(poll)
+        assert secondary.config.device == "SN2"
+
+        # a restart (e.g. another frame rate) must not bind any free device
+        source._initialize_device(None, (640, 480), 30, (640, 480), 30)
+        assert main.config.device == "SN1"
+        # the default configuration as well
+        source._initialize_device(None, None, None, None, None)
+        assert main.config.device == "SN1"
+    finally:
+        source.cleanup()